@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Post-run financial and timing analytics for the Olympic production model.
+
+During a run the model only records raw facts (lot start/end, order start/end and sampled ship
+time, COGS events, and in traced runs the request, grant and release time of every machine and
+tester visit). Every derived column (lot and order process times, late-penalty revenue, the cash
+ledger with its cumulative P&L, wait and service times) is computed here once per run with NumPy
+operations over whole columns instead of row-wise apply calls.
+"""
+
+import numpy as np
+
+
+def order_revenue(order_process_time, g):
+    """Function that returns the revenue earned for orders with the given process times (scalar or array).
+       On-time orders earn the full order revenue, late orders forfeit hourly_penalty for every hour late, down to zero."""
+
+    late_hours = np.asarray(order_process_time, dtype = float) - g.quoted_lead
+    return np.where(late_hours <= 0, g.order_revenue, np.maximum(0, g.order_revenue - late_hours*g.hourly_penalty))
+
+
+def add_lot_columns(lots):
+    """Function that adds Lot_Process_Time to the lots dataframe."""
+
+    lots["Lot_Process_Time"] = lots["End_Time"].to_numpy() - lots["Start_Time"].to_numpy()
+    return lots
+
+
+STEPS = ["Etch", "Etch_Test", "Assembly", "Assembly_Test", "Finishing", "Final_Test"]   #Stage steps in the order of 2*Stage + Step
+
+
+def add_trace_columns(trace):
+    """Function that adds Step_Name, Pass (1 for the first visit of a lot to a step, 2 for its first rework, ...),
+       Wait_Time (requested to granted) and Service_Time (granted to released) to a trace dataframe."""
+
+    steps = 2*trace["Stage"].to_numpy().astype(np.int64) + trace["Step"].to_numpy()
+    trace["Step_Name"] = np.array(STEPS, dtype = object)[steps]
+    trace["Pass"] = trace.groupby(["Unique_ID", "Stage", "Step"]).cumcount().to_numpy() + 1
+    trace["Wait_Time"] = trace["Granted"].to_numpy() - trace["Requested"].to_numpy()
+    trace["Service_Time"] = trace["Released"].to_numpy() - trace["Granted"].to_numpy()
+    return trace
+
+
+def step_times(trace, quantiles = (0.5, 0.9, 0.99)):
+    """Function that summarizes the waiting and service time distributions of every stage step in a traced run,
+       one row per step: visits, reworks, mean and quantiles of the wait and service times and the step's share
+       of all waiting. The step with the largest share of waiting is the line's bottleneck."""
+
+    import pandas as pd
+
+    grouped = trace.groupby("Step_Name", sort = False)
+    summary = pd.DataFrame({"Visits": grouped.size(), "Reworks": (trace["Pass"] > 1).groupby(trace["Step_Name"]).sum()})
+    for column, name in [("Wait_Time", "Wait"), ("Service_Time", "Service")]:
+        summary[f"{name}_Mean"] = grouped[column].mean()
+        for q in quantiles:
+            summary[f"{name}_P{100*q:g}"] = grouped[column].quantile(q)
+        summary[f"{name}_Max"] = grouped[column].max()
+    summary["Wait_Share"] = grouped["Wait_Time"].sum()/trace["Wait_Time"].sum()
+    return summary.reindex([step for step in STEPS if step in summary.index])
+
+
+def add_order_columns(orders, g):
+    """Function that adds Order_Process_Time (production time plus sampled ship time) and Revenue_Generated to the orders dataframe."""
+
+    process_time = orders["End_Time"].to_numpy() - orders["Start_Time"].to_numpy() + orders["Ship_Time"].to_numpy()
+    orders["Order_Process_Time"] = process_time
+    orders["Revenue_Generated"] = order_revenue(process_time, g)
+    return orders
+
+
+def add_cumulative_pnl(cash):
+    """Function that adds the running totals of revenue, COGS, wages and profit to the cash dataframe."""
+
+    revenue = np.cumsum(cash["Revenue"].to_numpy())
+    cogs = np.cumsum(cash["COGS_Expense"].to_numpy())
+    wages = np.cumsum(cash["Wage_Expense"].to_numpy())
+    cash["Cumulative_Revenue"] = revenue
+    cash["Cumulative_COGS"] = cogs
+    cash["Cumulative_Wage_Expense"] = wages
+    cash["Cumulative_Profits"] = revenue - cogs - wages
+    return cash
+
+
+def cash_ledger(cash_events, orders, wage_times, wage_amounts):
+    """Function that builds the complete cash ledger of a run: the cash events logged during the run (COGS),
+       one revenue row per completed order at its completion time and the materialized wage rows,
+       merged in time order (stable, so simultaneous rows keep that order) with the cumulative P&L columns."""
+
+    import pandas as pd
+
+    n_orders, n_wages = len(orders), len(wage_times)
+    times = np.concatenate([cash_events["Time"].to_numpy(dtype = float), orders["End_Time"].to_numpy(), wage_times])
+    order = np.argsort(times, kind = "stable")
+    columns = {"Time": times,
+               "Revenue": [cash_events["Revenue"].to_numpy(dtype = float), orders["Revenue_Generated"].to_numpy(), np.zeros(n_wages)],
+               "COGS_Expense": [cash_events["COGS_Expense"].to_numpy(dtype = float), np.zeros(n_orders), np.zeros(n_wages)],
+               "Wage_Expense": [cash_events["Wage_Expense"].to_numpy(dtype = float), np.zeros(n_orders), wage_amounts],
+               "Note": [cash_events["Note"].to_numpy(dtype = object), np.full(n_orders, "Order Revenue", dtype = object),
+                        np.full(n_wages, "Wage_Expense", dtype = object)]}
+    ledger = pd.DataFrame({name: (parts if name == "Time" else np.concatenate(parts))[order] for name, parts in columns.items()})
+    return add_cumulative_pnl(ledger)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent, content-addressed cache of Olympic production model runs.
+
+A run is fully determined by its scenario parameters, the model code and its random seed, so its
+results can be stored under a hash of the three and returned instead of simulating again. The
+key hashes every scenario parameter, MODEL_VERSION of Olympic_Model (bumped whenever the model's
+results change), the seed and the run options that change the results (streaming, warmup,
+antithetic, trace, wage resolution). The engine is left out because both engines produce the
+same results. Runs without a seed draw fresh entropy and are never cached.
+
+Entries are pickled into one file each under the cache directory. Writes go through a temporary
+file and an atomic rename, so worker processes can share a cache. Reading an entry marks it as
+recently used, and once the cache grows past its size limit the least recently used entries are
+deleted, down to 90% of the limit. Every process keeps an index of the entries in least recently
+used order with their total size, loaded from the directory once and updated as entries are read
+and written, so a write does not list the directory. Every write also appends the size of its
+entry to a journal file in the directory, which the other processes read on their next write, so
+the total of every process includes the writes of all processes sharing the cache. The directory
+is only listed again when the total goes over the size limit, and an eviction starts a new
+journal, which makes every other process list the directory again on its next write.
+Only load caches written by these tools: pickles can run code when they are loaded.
+
+Full RunResults are cached by cached_run, for repeated notebook and command line runs. Sweeps,
+replications, ranking and selection and the optimizer only cache the summary KPIs of every
+replication (see Olympic_Replications.run_replication), which keeps their entries small.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+
+CACHE_DIR = ".olympic_cache"
+CACHE_BYTES = 1024**3           #Default size limit of a cache (1 GB)
+#Run options that change the results, with their defaults so leaving one out gives the same key as passing its default
+RUN_OPTIONS = {"streaming": False, "warmup": 0, "antithetic": False, "trace": False, "wage_resolution": 1}
+EVICT_TO = 0.9                  #Share of the size limit eviction brings a cache down to
+JOURNAL = "sizes.log"           #File in the cache directory every write appends the size of its entry to
+_INDEXES = {}                   #Index of every cache directory used by this process, by absolute path
+
+
+class CacheIndex:
+    """Class that holds the entries of a cache directory in least recently used order with their total size, and the
+       journal (its inode and how far it has been read) the sizes of later writes are added from."""
+
+    def __init__(self, entries, journal, offset):
+        self.sizes = OrderedDict((path, size) for _, size, path in sorted(entries))
+        self.total = sum(self.sizes.values())
+        self.journal = journal
+        self.offset = offset
+
+    def used(self, path):
+        if path in self.sizes:
+            self.sizes.move_to_end(path)
+
+    def added(self, path, size):
+        #The size is added to the total from the journal
+        self.sizes.pop(path, None)
+        self.sizes[path] = size
+
+    def removed(self, path):
+        self.total -= self.sizes.pop(path, 0)
+
+
+class ResultCache:
+    """Class of an on-disk cache of run results keyed by scenario, model version, seed and run options,
+       limited to max_bytes by least recently used eviction."""
+
+    def __init__(self, directory = CACHE_DIR, max_bytes = CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, scenario, seed, kind = "run", **options):
+        """Function that returns the content hash of a run: kind ("run" for RunResults, "kpis" for summary KPIs),
+           the scenario parameters, the model version, the seed and the options that change the results."""
+
+        from Olympic_Model import MODEL_VERSION
+
+        options = {**RUN_OPTIONS, **{name: value for name, value in options.items() if name not in ("engine", "rng")}}
+        content = {"kind": kind, "scenario": scenario.as_dict(), "model_version": MODEL_VERSION, "seed": seed, "options": options}
+        return hashlib.sha256(json.dumps(content, sort_keys = True).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.pkl")
+
+    def journal_path(self):
+        return os.path.join(self.directory, JOURNAL)
+
+    def journal_state(self):
+        """Function that returns the inode and size of the journal, (None, 0) if there is none yet."""
+
+        try:
+            stat = os.stat(self.journal_path())
+        except FileNotFoundError:
+            return None, 0
+        return stat.st_ino, stat.st_size
+
+    def index(self, reload = False):
+        """Function that returns the index of the cache directory, listing the directory the first time (or on reload).
+           The journal is read up to its end before listing, so the writes listed after are not missed."""
+
+        directory = os.path.abspath(self.directory)
+        if reload or directory not in _INDEXES:
+            journal, offset = self.journal_state()
+            _INDEXES[directory] = CacheIndex(self.entries(), journal, offset)
+        return _INDEXES[directory]
+
+    def read_journal(self):
+        """Function that adds the sizes written by every process since the index last read the journal to its total,
+           and returns the index. When an eviction has started a new journal the directory is listed again instead."""
+
+        index = self.index()
+        try:
+            with open(self.journal_path(), "rb") as file:
+                if os.fstat(file.fileno()).st_ino != index.journal:
+                    return self.index(reload = True)
+                file.seek(index.offset)
+                written = file.read()
+        except FileNotFoundError:
+            return self.index(reload = True)
+        written = written[:written.rfind(b"\n") + 1]     #Leaves out a line still being appended
+        index.offset += len(written)
+        index.total += sum(int(size) for size in written.split())
+        return index
+
+    def get(self, key):
+        """Function that returns the cached value under the key, or None, and marks it as recently used."""
+
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                value = pickle.load(file)
+            os.utime(path)
+            if os.path.abspath(self.directory) in _INDEXES:
+                self.index().used(path)
+        except FileNotFoundError:
+            return None
+        except (EOFError, pickle.UnpicklingError):
+            #Damaged on disk
+            self.remove(path)
+            return None
+        return value
+
+    def put(self, key, value):
+        """Function that stores a value under the key, then evicts the least recently used entries if the cache has
+           grown past its size limit."""
+
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        handle, temporary = tempfile.mkstemp(dir = os.path.dirname(path), suffix = ".tmp")
+        with os.fdopen(handle, "wb") as file:
+            pickle.dump(value, file, protocol = pickle.HIGHEST_PROTOCOL)
+            size = file.tell()
+        os.replace(temporary, path)
+        index = self.index()
+        index.added(path, size)
+        with open(self.journal_path(), "ab") as file:
+            file.write(f"{size}\n".encode())
+        if self.read_journal().total > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        """Function that returns (last used time, size, path) of every entry."""
+
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for folder in os.scandir(self.directory):
+            if folder.is_dir():
+                for entry in os.scandir(folder.path):
+                    if entry.name.endswith(".pkl"):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self):
+        """Function that returns the bytes used by the cache entries."""
+
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Function that deletes the least recently used entries of the cache, listed again from the directory, until
+           it is down to EVICT_TO of its size limit, then starts a new journal so that every process lists the
+           directory again on its next write."""
+
+        index = self.index(reload = True)
+        for path in list(index.sizes):
+            if index.total <= EVICT_TO*self.max_bytes:
+                break
+            self.remove(path)
+        handle, temporary = tempfile.mkstemp(dir = self.directory, suffix = ".tmp")
+        os.close(handle)
+        os.replace(temporary, self.journal_path())
+        index.journal, index.offset = self.journal_state()[0], 0
+
+    def clear(self):
+        """Function that deletes every entry."""
+
+        for _, _, path in self.entries():
+            self.remove(path)
+        self.remove(self.journal_path())
+        _INDEXES.pop(os.path.abspath(self.directory), None)
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass    #Another process evicted it first
+        if os.path.abspath(self.directory) in _INDEXES:
+            self.index().removed(path)
+
+
+def cached_run(cache, run_number, scenario = None, engine = "simpy", sink = None, wage_resolution = 1, **options):
+    """Function that returns the RunResults of a run from the cache, or runs the model (see Olympic_Model.make_model)
+       and caches them. Runs without a seed or with their own rng are always simulated. A cached run is still written
+       by the sink if one is given."""
+
+    from Olympic_Model import Scenario, make_model
+
+    scenario = Scenario() if scenario is None else scenario
+    seed = options.get("seed")
+    key = None
+    if cache is not None and seed is not None and options.get("rng") is None:
+        key = cache.key(scenario, seed, "run", wage_resolution = wage_resolution,
+                        **{name: value for name, value in options.items() if name != "seed"})
+        results = cache.get(key)
+        if results is not None:
+            results.replication = run_number
+            if sink is not None:
+                sink.write(results)
+            return results
+    results = make_model(run_number, scenario, engine, **options).run(sink, wage_resolution)
+    if key is not None:
+        cache.put(key, results)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description = "Show or clear an Olympic results cache")
+    parser.add_argument("--dir", default = CACHE_DIR)
+    parser.add_argument("--clear", action = "store_true", help = "delete every entry")
+    args = parser.parse_args()
+    cache = ResultCache(args.dir)
+    if args.clear:
+        cache.clear()
+    print(f"{len(cache.entries())} entries, {cache.size()/1024**2:,.1f} MB in {args.dir}")
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fast simulation kernel for the Olympic production line.
+
+The factory is a fixed line of multi-server FIFO stations (etch machines, etch testers, assembly,
+assembly testers, finishing, finishing testers, then shipping). Olympic_Kernel runs exactly this
+topology on its own event heap, with stations as plain counters and FIFO queues and lots as small
+records moving through a few event kinds, instead of SimPy processes, resources and events.
+
+The kernel follows SimPy's scheduling rules (time, then urgent before normal, then scheduling
+order; a released server is handed to the next waiting lot when the release is processed), so
+with the same random streams it draws every sampled duration in the same order and produces the
+same lot, order, cash and queue tables as Olympic_Model. cross_validate checks exactly that.
+It is still one Python step per event, so it runs about 2.5-3.5x faster than SimPy (60 and 365 day
+runs of every scenario and rework policy), not orders of magnitude: the stations share the etch
+machines and lots loop back for rework, so the stages cannot be run as separate vectorized FIFO
+recursions without giving up identical results.
+
+Because its whole state is plain data, a kernel run can be stopped at any time with run_until,
+snapshotted and restored any number of times (see Snapshot). Every restore is an exact copy that
+continues like the original run, unless it is reseeded with new random streams, and interventions
+applied to a restored model before it continues make what-if branches that share the simulation
+of their common prefix. SimPy runs cannot be snapshotted, their snapshot raises ValueError: their
+processes are Python generators, which cannot be copied. Nor can runs given an rng.
+
+Example, cross-validate every scenario and compare run times:
+    python Olympic_Kernel.py
+
+Example, snapshot every kernel run on day 30 and check that the restored runs continue identically:
+    python Olympic_Kernel.py --snapshot 30
+
+Example, fork a what-if branch with 40 final testers and a replication on new random numbers from day 30 of a run:
+    snapshot = Olympic_Kernel(1, Scenario(), seed = 60).run_until(30*24).snapshot()
+    what_if = snapshot.restore(run_number = 2)
+    what_if.intervene(what_if.now, "capacity", "Test3", 40)
+    base, what_if, other = snapshot.restore().run(), what_if.run(), snapshot.restore(run_number = 3, seed = 61).run()
+"""
+
+import argparse
+import heapq
+import pickle
+import time
+from collections import deque
+
+import numpy as np
+
+from Olympic_Model import Olympic_Model, Scenario, SCENARIOS
+from Olympic_Recorder import Lot
+from Olympic_Streams import RandomStreams
+
+URGENT, NORMAL = 0, 1       #Event priorities, as in SimPy
+
+#Event kinds
+ORDER, WARMUP, LOT_START, GRANT, DONE, RELEASE, INTERVENE, SHIFT = range(8)
+
+
+class Station:
+    """Class that holds the state of one multi-server FIFO station: its servers in use and the lots waiting for one,
+       and the StationMonitor it reports every change to."""
+
+    __slots__ = ("capacity", "count", "queue", "monitor")
+
+    def __init__(self, capacity, monitor):
+        self.capacity = capacity
+        self.count = 0
+        self.queue = deque()
+        self.monitor = monitor
+
+
+class KernelLot(Lot):
+    """Class that tracks a lot through the kernel: a Lot handle that also holds its release time, the stage it is at,
+       whether it is being tested and when it requested and was granted its current server."""
+
+    __slots__ = ("released", "stage", "testing", "requested", "granted")
+
+    def __init__(self, store, unique_id, order_id, lot_id):
+        super().__init__(store, unique_id, order_id, lot_id)
+        self.released = 0
+        self.stage = 0
+        self.testing = False
+        self.requested = 0
+        self.granted = 0
+
+
+class Olympic_Kernel(Olympic_Model):
+    """This class runs the Olympic model on the fast kernel. It takes the same arguments and returns the same
+       RunResults as Olympic_Model, whose recording, reporting and random streams it shares."""
+
+    engine = "kernel"
+
+    def build_resources(self):
+        """Function that creates the event heap and the machines and testers of every stage as plain stations."""
+
+        g = self.scenario
+        self.now = 0.0
+        self.heap = []              #Events due later, or urgent, as (time, priority, sequence, kind, target)
+        self.immediate = deque()    #Normal events due now as (kind, target), in scheduling order
+        self.sequence = 0
+        self.stages = None          #Stations, samplers and failure probability of every stage, bound when the run starts
+        self.until = 0.0            #Time the run was advanced to
+        self.etch_machine = self.station("Etch", g.machines1)
+        if g.pooled_testers:
+            self.assembly_machine = self.station("Assembly", g.machines2)
+            self.finishing_machine = self.station("Finishing", g.machines3)
+            self.tester = self.station("Testers", g.testers)
+            self.etch_tester = self.assembly_tester = self.finishing_tester = self.tester
+        else:
+            self.etch_tester = self.station("Test1", g.testers1)
+            self.assembly_machine = self.station("Assembly", g.machines2)
+            self.assembly_tester = self.station("Test2", g.testers2)
+            self.finishing_machine = self.station("Finishing", g.machines3)
+            self.finishing_tester = self.station("Test3", g.testers3)
+
+    def station(self, name, capacity):
+        """Function that creates a plain station reporting to the monitor of the named station."""
+
+        self.resources[name] = Station(capacity, self.monitor(name, capacity))
+        return self.resources[name]
+
+    def set_capacity(self, name, capacity):
+        """Function that sets the number of servers of the named station in place. Like MonitoredResource.set_capacity,
+           lots keep the servers they hold and added servers are granted to the first waiting lots straight away."""
+
+        station = self.resources[name]
+        station.capacity = capacity
+        station.monitor.change_capacity(self.now, capacity)
+        while station.queue and station.count < capacity:
+            station.count += 1
+            self.immediate.append((GRANT, station.queue.popleft()))
+            station.monitor.record(self.now, len(station.queue), station.count)
+
+    def schedule(self, time, priority, kind, target):
+        """Function that schedules an event. Normal events due now go to the immediate queue, where they keep their
+           scheduling order and come after every event already on the heap for this time."""
+
+        if time == self.now and priority == NORMAL:
+            self.immediate.append((kind, target))
+        else:
+            self.sequence += 1
+            heapq.heappush(self.heap, (time, priority, self.sequence, kind, target))
+
+    def request(self, station, lot):
+        """Function that queues a lot for a server of the station. Like a SimPy request, the first lot in the queue
+           is granted a server straight away if one is free."""
+
+        lot.requested = self.now
+        station.queue.append(lot)
+        if station.count < station.capacity:
+            station.count += 1
+            self.immediate.append((GRANT, station.queue.popleft()))
+        station.monitor.record(self.now, len(station.queue), station.count)
+
+    def release(self, station):
+        """Function that frees a server of the station. Like a SimPy release, the server is only handed to the next
+           waiting lot when the release event is processed."""
+
+        station.count -= 1
+        station.monitor.record(self.now, len(station.queue), station.count)
+        self.immediate.append((RELEASE, station))
+
+    def start_orders(self):
+        """Function that releases one order into the factory and schedules the next one (see generate_orders)."""
+
+        g = self.scenario
+        self.order_counter += 1
+        self.orders_monitor.record(self.now, self.order_counter)
+        self.lot_counter = 1
+        self.open_orders.open(self.order_counter, g.lots_per_order)
+        for x in range(g.lots_per_order):
+            lot = KernelLot(self.lot_store, self.unique_id_counter, self.order_counter, self.lot_counter)
+            self.unique_id_counter += 1
+            self.lot_counter += 1
+            self.log_cash(self.now, 0, self.cost_per_lot, 0, "COGS")
+            self.schedule(self.now, URGENT, LOT_START, lot)
+        self.schedule(self.now + self.sample_interarrival(), NORMAL, ORDER, None)
+
+    def finish_test(self, lot, machine, tester, p_fail):
+        """Function that ends a test: the tester is released and the lot moves on, is reworked or is scrapped
+           under the scenario's rework policy (see machine_and_test)."""
+
+        g = self.scenario
+        fail_test = self.stages[lot.stage][4]()
+        if self.lot_store.trace is not None:
+            lot.visited(lot.stage, 1, lot.requested, lot.granted, self.now)
+        self.release(tester)
+        if fail_test >= p_fail:
+            lot.passed(lot.stage, self.now)
+            if lot.stage == 2:
+                order_times = self.open_orders.lot_finished(lot.order_id, lot.released, lot.end_time)
+                if order_times is not None:
+                    self.store_order_results(lot.order_id, *order_times)
+                self.store_lot_results(lot)
+            else:
+                lot.stage += 1
+                lot.testing = False
+                self.request(self.stages[lot.stage][0], lot)
+            return
+        self.failed_tests +=1
+        self.failures_monitor.record(self.now, self.failed_tests)
+        lot.failures += 1
+        if g.rework_policy == "scrap" and lot.failures >= g.scrap_after:
+            self.lot_store.scrap(lot.slot)
+            replacement = KernelLot(self.lot_store, self.unique_id_counter, lot.order_id, lot.id)
+            self.unique_id_counter += 1
+            self.scrapped_lots += 1
+            self.log_cash(self.now, 0, self.cost_per_lot, 0, "Replacement COGS")
+            replacement.released = lot.released
+            replacement.start_time = self.now
+            self.request(self.stages[0][0], replacement)
+        elif g.rework_policy == "retest":
+            self.request(tester, lot)
+        else:
+            lot.testing = False
+            self.request(machine, lot)
+
+    def start(self):
+        """Function that binds the samplers of every stage and schedules the first order (and the warm-up) at time 0."""
+
+        self.bind_stages()
+        self.schedule(0.0, URGENT, ORDER, None)
+        if self.kpis is not None and self.kpis.warmup > 0:
+            self.schedule(0.0, URGENT, WARMUP, None)
+        if self.scenario.interventions:
+            self.schedule(0.0, URGENT, INTERVENE, 0)
+        if self.calendar is not None:
+            self.start_shifts()
+
+    def start_shifts(self):
+        """Function that starts following the testers' shift calendar, like Olympic_Model.change_shifts."""
+
+        self.schedule(self.now, URGENT, SHIFT, (self.calendar, None))
+
+    def bind_stages(self):
+        """Function that binds the stations, samplers and failure probability of every stage for the event loop."""
+
+        g = self.scenario
+        #Machine, tester, machine time, test time and test outcome samplers and failure probability of every stage
+        self.stages = [(self.etch_machine, self.etch_tester, self.etch_time, self.etch_test_time, self.etch_failure, g.p_fail_test1),
+                       (self.etch_machine, self.assembly_tester, self.assembly_time, self.assembly_test_time, self.assembly_failure, g.p_fail_test2),
+                       (self.finishing_machine, self.finishing_tester, self.finishing_time, self.finishing_test_time, self.finishing_failure, g.p_fail_test3)]
+
+    def reseed(self, seed):
+        """Function that replaces the random streams of the run with new ones spawned from the seed, from the current time
+           on. The samplers keep their distributions (including a changed demand), only the random numbers change."""
+
+        self.seed = seed
+        self.streams = RandomStreams(seed, self.streams.antithetic)
+        self.bind_samplers()
+        if self.stages is not None:
+            self.bind_stages()
+
+    def run_until(self, until):
+        """Function that runs the simulation up to the until time (at most the simulation duration), processing every
+           event before it, and returns the model. A run can be continued with run_until or run, and snapshotted in
+           between to fork continuations from that time (see snapshot)."""
+
+        if self.stages is None:
+            self.start()
+        self.until = max(self.until, min(until, self.scenario.sim_duration))
+        self.advance(self.until)
+        return self
+
+    def simulate(self):
+        """Function that runs the event loop until the simulation duration."""
+
+        self.run_until(self.scenario.sim_duration)
+
+    def snapshot(self):
+        """Function that saves the full state of the run at the time it was run until: the clock, the event heap,
+           the station queues, the lots in production, the random stream states, the monitors and every result
+           recorded so far. Every restore of the Snapshot is an exact copy of the run at that time, unless reseeded.
+           Runs given an rng instead of a seed raise ValueError."""
+
+        if self.rng is not None:
+            raise ValueError("Snapshots need the seeded streams, not an rng")
+        return Snapshot(self)
+
+    def advance(self, until):
+        """Function that processes every event scheduled before the until time.
+           The heap goes first while it holds events for the current time, which were all scheduled before the
+           events in the immediate queue or are urgent, then the immediate queue is worked off in order."""
+
+        heap, immediate, stages = self.heap, self.immediate, self.stages
+        trace = self.lot_store.trace is not None
+        pop, push, next_immediate = heapq.heappop, heapq.heappush, immediate.popleft
+        now = self.now
+        while True:
+            if heap and (not immediate or heap[0][0] == now):
+                if heap[0][0] >= until:
+                    break
+                now, priority, _, kind, target = pop(heap)
+                self.now = now
+            elif immediate:
+                kind, target = next_immediate()
+                priority = NORMAL
+            else:
+                break
+            if kind == GRANT:
+                #The lot holds a machine or tester for a sampled time
+                target.granted = now
+                stage = stages[target.stage]
+                done = now + (stage[3]() if target.testing else stage[2]())
+                if done == now:
+                    immediate.append((DONE, target))
+                else:
+                    self.sequence += 1
+                    push(heap, (done, NORMAL, self.sequence, DONE, target))
+            elif kind == RELEASE:
+                if target.queue and target.count < target.capacity:
+                    target.count += 1
+                    immediate.append((GRANT, target.queue.popleft()))
+                    target.monitor.record(now, len(target.queue), target.count)
+            elif kind == DONE:
+                machine, tester, _, _, _, p_fail = stages[target.stage]
+                if target.testing:
+                    self.finish_test(target, machine, tester, p_fail)
+                else:
+                    if trace:
+                        target.visited(target.stage, 0, target.requested, target.granted, now)
+                    machine.count -= 1
+                    machine.monitor.record(now, len(machine.queue), machine.count)
+                    immediate.append((RELEASE, machine))
+                    target.testing = True
+                    target.requested = now
+                    tester.queue.append(target)
+                    if tester.count < tester.capacity:
+                        tester.count += 1
+                        immediate.append((GRANT, tester.queue.popleft()))
+                    tester.monitor.record(now, len(tester.queue), tester.count)
+            elif kind == LOT_START:
+                target.released = target.start_time = now
+                self.request(stages[0][0], target)
+            elif kind == ORDER:
+                self.start_orders()
+            elif kind == INTERVENE:
+                #Start of the intervention process (urgent), or its wait for intervention target is over (normal)
+                interventions = self.scenario.interventions
+                if priority == NORMAL:
+                    self.intervene(now, *interventions[target][1:])
+                    target += 1
+                if target < len(interventions):
+                    self.schedule(now + max(0, interventions[target][0] - now), NORMAL, INTERVENE, target)
+            elif kind == SHIFT:
+                #Start of a shift calendar's process (urgent), or its wait for the next change of shift is over (normal),
+                #which ends once the calendar has been replaced
+                calendar, change = target
+                if calendar is self.calendar:
+                    if priority == NORMAL:
+                        self.change_shift(change)
+                    change = calendar.next_change(now if change is None else change)
+                    self.schedule(now + (change - now), NORMAL, SHIFT, (calendar, change))
+            elif priority == URGENT:
+                #Start of the warm-up process, which waits until the end of the warm-up period
+                self.schedule(now + self.kpis.warmup, NORMAL, WARMUP, None)
+            else:
+                self.kpis.end_warmup(self.order_counter, self.failed_tests)
+                for monitor in self.monitors.values():
+                    monitor.reset(now)
+
+
+class Snapshot:
+    """Class of the saved state of a kernel run part way through, taken by Olympic_Kernel.snapshot at its time.
+       The model is pickled, so restore returns a new model each time, which continues exactly like the original run
+       would unless it is given a seed for new random streams. Interventions applied to restored models make what-if
+       branches that share the simulation of the common prefix.
+       A snapshot can be saved to a file and loaded again with the same version of the model code."""
+
+    def __init__(self, model):
+        self.time = model.until
+        self.state = pickle.dumps(model, protocol = pickle.HIGHEST_PROTOCOL)
+
+    def restore(self, run_number = None, seed = None):
+        """Function that returns a new model in the saved state, optionally with another run number, and reseeded with
+           new random streams from the seed if one is given (see Olympic_Kernel.reseed)."""
+
+        model = pickle.loads(self.state)
+        if run_number is not None:
+            model.run_number = run_number
+        if seed is not None:
+            model.reseed(seed)
+        return model
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            pickle.dump(self, file, protocol = pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as file:
+            return pickle.load(file)
+
+
+def compare(reference, other):
+    """Function that compares two RunResults table by table. Returns a dict of the tables that differ (empty when
+       every table and the streaming KPIs are identical)."""
+
+    differences = {}
+    for name, table in reference.tables.items():
+        table2 = other.tables[name]
+        if list(table.columns) != list(table2.columns) or len(table) != len(table2) or not table.index.equals(table2.index):
+            differences[name] = f"shape {table.shape} vs {table2.shape}"
+            continue
+        for column in table.columns:
+            a, b = table[column].to_numpy(), table2[column].to_numpy()
+            if not (np.array_equal(a, b) if a.dtype == object else np.array_equal(a, b, equal_nan = True)):
+                differences.setdefault(name, []).append(column)
+    if reference.kpis is not None and vars(reference.kpis).keys() != vars(other.kpis).keys():
+        differences["kpis"] = "accumulators differ"
+    elif reference.kpis is not None:
+        from Olympic_Report import summarize
+        a, b = summarize(reference), summarize(other)
+        differing = [kpi for kpi in a if not (a[kpi] == b[kpi] or (a[kpi] != a[kpi] and b[kpi] != b[kpi]))]
+        if differing:
+            differences["kpis"] = differing
+    return differences
+
+
+def cross_validate(scenario = None, seed = 60, **options):
+    """Function that runs a scenario on both engines with the same seed and checks that every result table is identical.
+       Returns a dict of the tables that differ (empty when the engines agree) and the run time of each engine."""
+
+    scenario = Scenario() if scenario is None else scenario
+    results, seconds = {}, {}
+    for engine in (Olympic_Model, Olympic_Kernel):
+        start = time.perf_counter()
+        results[engine.engine] = engine(1, scenario, seed = seed, **options).run()
+        seconds[engine.engine] = time.perf_counter() - start
+    return compare(results["simpy"], results["kernel"]), seconds
+
+
+def check_snapshot(scenario = None, seed = 60, at = None, **options):
+    """Function that runs a scenario on the kernel straight through, and again up to the at time (default half the
+       simulation duration), where it is snapshotted and restored twice. Returns a dict of the tables that differ
+       between the straight run and each continuation (empty when they all agree)."""
+
+    scenario = Scenario() if scenario is None else scenario
+    reference = Olympic_Kernel(1, scenario, seed = seed, **options).run()
+    snapshot = Olympic_Kernel(1, scenario, seed = seed, **options).run_until(scenario.sim_duration/2 if at is None else at).snapshot()
+    differences = {}
+    for fork in range(2):
+        for name, tables in compare(reference, snapshot.restore().run()).items():
+            differences[f"{name} (fork {fork + 1})"] = tables
+    return differences
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Cross-validate the fast kernel against the SimPy model")
+    parser.add_argument("--scenario", nargs = "*", default = list(SCENARIOS), choices = SCENARIOS)
+    parser.add_argument("--seed", type = int, default = 60)
+    parser.add_argument("--days", type = float, default = None, help = "simulated days (default: the scenario's duration)")
+    parser.add_argument("--trace", action = "store_true", help = "also compare the traces of every machine and tester visit")
+    parser.add_argument("--snapshot", type = float, default = None, metavar = "DAY",
+                        help = "also check that kernel runs snapshotted on this day and restored continue like the straight run")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<16} {'rework':<8} {'simpy (s)':>10} {'kernel (s)':>11} {'speedup':>8}  result")
+    for name in args.scenario:
+        for policy in ["full", "retest", "scrap"]:
+            scenario = SCENARIOS[name].replace(rework_policy = policy)
+            if args.days:
+                scenario = scenario.replace(sim_duration = 24*args.days)
+            differences, seconds = cross_validate(scenario, args.seed, trace = args.trace)
+            if args.snapshot is not None:
+                differences.update(check_snapshot(scenario, args.seed, 24*args.snapshot, trace = args.trace))
+            print(f"{name:<16} {policy:<8} {seconds['simpy']:>10.2f} {seconds['kernel']:>11.2f} "
+                  f"{seconds['simpy']/seconds['kernel']:>7.1f}x  {differences or 'identical'}")
@@ -0,0 +1,740 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parameterized Olympic production model.
+
+One importable model for every scenario in the notebook. Tester pooling topology, lot sizing
+and staffing are inputs of a Scenario object that is passed to the model, instead of being
+edited into a class-level g in a separate copy of the script per variant. Changes during a run
+(capacity changes, breakdowns and repairs, demand changes and shift calendars) are scheduled as
+interventions of the Scenario and applied by a scheduler process, so long runs with changing
+conditions run in one pass.
+"""
+
+import simpy
+import hashlib
+import json
+import numpy as np
+from Olympic_Recorder import Recorder, OrderRegistry, Lot, LotStore
+from Olympic_Wages import WageSchedule, ShiftCalendar, staff_on_shift
+from Olympic_Analytics import add_lot_columns, add_order_columns, add_trace_columns, cash_ledger, step_times
+from Olympic_Results import RunResults, SINKS, CsvSink
+from Olympic_Report import StreamingKpis, print_report
+from Olympic_Streams import RandomStreams, SharedStream
+from Olympic_Monitor import MonitoredResource, StationMonitor, StepMonitor, sample_grid, utilization
+from Olympic_Cache import CACHE_DIR, ResultCache, cached_run
+
+REWORK_POLICIES = ["full", "retest", "scrap"]
+#Interventions a scenario can schedule during a run, as (time, kind, *arguments) tuples:
+#   (time, "capacity", station, servers)    sets the servers of a station, testers are hired or let go at tester stations
+#   (time, "breakdown", station, servers)   takes servers of a station out of service, each after the lot it holds
+#   (time, "repair", station, servers)      puts servers of a station that broke down back in service
+#   (time, "demand", d_arr, d_std)          changes the customer demand (orders/day and its standard deviation)
+#   (time, "shifts", tester_shifts)         changes the shift calendar of the testers (None = on shift around the clock)
+INTERVENTIONS = ["capacity", "breakdown", "repair", "demand", "shifts"]
+TESTER_STATIONS = ["Test1", "Test2", "Test3", "Testers"]
+MODEL_VERSION = 3       #Raised whenever a change to either engine changes the results of a run, which invalidates cached runs (see Olympic_Cache)
+
+
+class Scenario:
+    """Class to establish scenario parameters. Every parameter can be overridden as a keyword argument,
+       e.g. Scenario(lots_per_order = 10, pooled_testers = True, tester_pool = 50).
+       Derived parameters (interarrival times, units per lot, order revenue) follow the inputs."""
+
+    def __init__(self, **params):
+       ##Customer Demand
+        self.d_arr = 10                #Average customer demand in orders per day (orders/day)
+        self.d_std = 5                 #Standard deviation of customer demand (orders/day)
+
+       ##Order Processing Parameters
+        self.units_per_order= 50       #How many units are purchased in every order
+        self.lots_per_order = 5        #How many lots is the order broken into
+
+       ##Contract Financial Parameters
+        self.cogs = 75                  #Average cost per unit (sum of cost of raw goods of one unit) ($)
+        self.wholesale_price = 180      #The contractually agreed upon wholesale unit price that the customer is paying for finished units ($)
+        self.quoted_lead = 60           #Contractually agreed upon lead time for one order (hrs)
+        self.hourly_penalty = 600       #How much revenue you will forfeit for every hour late (in $)
+
+       ##Factory Management Parameters
+        self.tester_hr_wage = 17        #Hourly wage of one tester
+        self.tester_shifts = None       #Daily shift calendar of the testers as (start hour, end hour, fraction on shift) tuples, None = on shift around the clock
+        self.pooled_testers = False     #If True, one pool of cross-trained testers serves all three test stages
+        self.tester_pool = None         #Number of testers in the pool when pooled_testers is True (default: testers1 + testers2 + testers3)
+
+       ##Stages 1-4 Parameters
+        #Stage 1
+        self.lot_time1 = 0.5            #How many hours it takes to set up one lot to go through an etching machine
+        self.mean_etching = 0.15        #How many hours on average it takes for the etching machine to etch one unit
+        self.std_etching = 0.02         #Standard deviation of etching time per unit (in hrs/unit)
+        self.machines1 = 20             #Number of etching machines the plant can use
+
+        #Stage 1 Testing
+        self.mean_test1 = 0.4           #How many hours on average it takes for one tester to ensure the unit etchings are within specification
+        self.std_test1 = 0.15           #Standard deviation of test duration (hrs/unit)
+        self.p_fail_test1 = 0.05        #Probability of a unit failing the etch testing
+        self.testers1 = 15              #Number of etch testers
+
+        #Stage 2 Assembly
+        self.mean_assembly = 0.5        #How many hours on average it takes for one machine to do assembly stage (hrs/unit)
+        self.std_assembly = 0.15        #Standard deviation of asembly stage time per unit (hrs/unit)
+        self.machines2 = 10             #Number of assembly machines
+
+        #Stage 2 Testing
+        self.mean_test2 = 0.5           #How many hours on average it takes one tester to conduct a functions check on one unit (hrs/unit)
+        self.std_test2 = 0.1            #Standard deviation of average assembly test
+        self.p_fail_test2 = 0.015       #Probaiblity of a unit failing the assembly test
+        self.testers2 = 15              #Number of assembly testers
+
+        #Stage 3 Finishing
+        self.lot__time3 = 0.5           #How many hours on it takes to set up one lot on the finishing machines (hrs/lot)
+        self.mean_finishing = 0.2       #How many hours on average it takes for one machine to conduct finishing on one unit (hrs/unit)
+        self.std_finishing = 0.15       #Standard deviation of average finishing time (hrs/unit)
+        self.machines3 = 7              #Number of finishing machines
+
+        #Stage 3 Testing
+        self.mean_test3 = 0.15          #How many hours on average it takes one tester to conduct final testing on a unit (hrs/unit)
+        self.std_test3 = 0.1            #Standard deviation of average final testing (hrs/unit)
+        self.p_fail_test3 = 0.015       #Probability of a unit failing the final functions testing
+        self.testers3 = 30              #Number of final functions check testers
+
+        #Rework of failed tests
+        self.rework_policy = "full"     #"full" reruns the stage's machine and test, "retest" only repeats the test, "scrap" scraps the lot after scrap_after failures
+        self.scrap_after = 3            #Failed tests after which a lot is scrapped and replaced under the "scrap" policy
+
+        #Stage 4 Packaging and Shipping
+        self.mean_ship = 7              #How many hours on average it takes to package and ship a single order to the customer (hrs/order)
+        self.std_ship = .5              #Standard deviation of average time for packaging and shipping of a single order (hrs/order)
+
+        self.order_service_level = 0.95 #Metric used later to show order fill time at a specific service level
+
+        self.sim_duration = 60*24       #Simulation duration (hrs)
+
+        self.interventions = None       #Changes made at set times during the run as (time, kind, *arguments) tuples (see INTERVENTIONS)
+
+        for name, value in params.items():
+            if name not in self.__dict__:
+                raise TypeError(f"Scenario got an unexpected parameter '{name}'")
+            setattr(self, name, value)
+        if self.rework_policy not in REWORK_POLICIES:
+            raise ValueError(f"Unknown rework_policy '{self.rework_policy}', choose from {REWORK_POLICIES}")
+        if self.tester_shifts is not None:
+            self.tester_shifts = [tuple(shift) for shift in self.tester_shifts]
+        if self.interventions is not None:
+            interventions = []
+            for time, kind, *arguments in self.interventions:
+                if kind not in INTERVENTIONS:
+                    raise ValueError(f"Unknown intervention '{kind}', choose from {INTERVENTIONS}")
+                if time < 0:
+                    raise ValueError(f"Intervention '{kind}' is scheduled before the start of the run ({time})")
+                if kind == "shifts" and arguments[0] is not None:
+                    arguments = [[tuple(shift) for shift in arguments[0]]]
+                interventions.append((time, kind, *arguments))
+            #Applied in time order, interventions at the same time in the order given
+            self.interventions = sorted(interventions, key = lambda intervention: intervention[0])
+
+    @property
+    def d_intarrival(self):
+        """Translates demand in orders per day to hours between orders"""
+        return 24/self.d_arr
+
+    @property
+    def d_int_std(self):
+        """Translates standard deviation of demand to std_dev of demand interarrival times"""
+        return 24/self.d_std
+
+    @property
+    def units_per_lot(self):
+        """Converts units per order to units per lot"""
+        return self.units_per_order/self.lots_per_order
+
+    @property
+    def order_revenue(self):
+        """Revenue for one order ($)"""
+        return self.wholesale_price * self.units_per_order
+
+    @property
+    def testers(self):
+        """Number of testers on the payroll, which is also the pool size when testers are pooled"""
+        if self.pooled_testers and self.tester_pool is not None:
+            return self.tester_pool
+        return self.testers1 + self.testers2 + self.testers3
+
+    def as_dict(self):
+        """Function that returns the input parameters of the scenario as a plain dictionary."""
+        return dict(self.__dict__)
+
+    def digest(self):
+        """Function that returns a short hash of the scenario parameters, used to key stored results."""
+        return hashlib.sha256(json.dumps(self.as_dict(), sort_keys = True).encode()).hexdigest()[:16]
+
+    def replace(self, **changes):
+        """Function that returns a copy of the scenario with some parameters changed."""
+        params = self.as_dict()
+        params.update(changes)
+        return Scenario(**params)
+
+    def __eq__(self, other):
+        return isinstance(other, Scenario) and self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        default = Scenario().as_dict()
+        changed = ", ".join(f"{name}={value!r}" for name, value in self.as_dict().items() if default[name] != value)
+        return f"Scenario({changed})"
+
+
+#The scenarios compared in the notebook
+SCENARIOS = {"base": Scenario(),
+             "pooled_testers": Scenario(pooled_testers = True, tester_pool = 56),
+             "lot_size": Scenario(lots_per_order = 10),
+             "combined": Scenario(lots_per_order = 10, pooled_testers = True, tester_pool = 50)}
+
+
+class Olympic_Model:
+    """This class is the model itself, it will run until the simulation duration of its scenario is complete.
+       The scenario is never changed when the model is executed, so one Scenario can be shared by many runs.
+       With streaming = True no lot, order or cash rows are kept: the summary KPIs are accumulated online as events
+       occur, leaving out the first warmup hours, so memory does not grow with the length of the run.
+       Every purpose draws from its own block-sampled stream spawned from the seed (see Olympic_Streams), so runs of
+       different scenarios with the same seed are synchronized; antithetic = True runs the antithetic twin.
+       Given an rng instead, every value is drawn from it one at a time like the original model.
+       With trace = True every machine and tester visit of every lot is recorded in a trace table (see LotStore).
+       The scenario's interventions are applied at their times by a scheduler process (see intervene)."""
+
+    engine = "simpy"
+
+    def __init__(self, run_number, scenario = None, rng = None, seed = None, streaming = False, warmup = 0, antithetic = False,
+                 trace = False):
+        g = self.scenario = Scenario() if scenario is None else scenario
+        self.run_number = run_number
+        self.seed = seed
+        if rng is not None and antithetic:
+            raise ValueError("Antithetic runs need the seeded streams, not an rng")
+        if streaming and trace:
+            raise ValueError("Tracing records every machine and tester visit, which a streaming run does not keep")
+        self.rng = rng      #Single random.Random-like generator of this run if one was given
+        self.interarrival = (g.d_intarrival, g.d_int_std)      #Order interarrival time mean and std, changed by demand interventions
+        #Source of every random draw, one stream per purpose (or all purposes from rng)
+        self.streams = RandomStreams(seed, antithetic) if rng is None else SharedStream(rng)
+        self.bind_samplers()
+        self.unique_id_counter = 1
+        self.order_counter = 0
+        self.lot_counter = 1
+        self.cost_per_lot = g.units_per_lot*g.cogs
+        self.failed_tests = 0
+        self.scrapped_lots = 0
+        #Times of the queue table rows. Every station and counter samples its step function at these times as it changes
+        self.queue_grid = sample_grid(g.sim_duration, g.sim_duration/100)
+        #Monitors of every station by name, in the column order of the queue table. Full step logs are kept with the tables
+        self.monitors = {}
+        self.resources = {}     #Resources of every station by name
+        self.keep_steps = not streaming
+        self.orders_monitor = StepMonitor(1, self.queue_grid, weighted = False)
+        self.failures_monitor = StepMonitor(1, self.queue_grid, weighted = False)
+        self.build_resources()
+        #Servers staffed at every station and servers broken down. Breakdowns and repairs only change the servers in service
+        self.staffed = {name: resource.capacity for name, resource in self.resources.items()}
+        self.broken = dict.fromkeys(self.resources, 0)
+        for time, kind, *arguments in g.interventions or []:
+            if kind in ("capacity", "breakdown", "repair") and arguments[0] not in self.resources:
+                raise ValueError(f"Intervention '{kind}' at {time} names an unknown station '{arguments[0]}', choose from {list(self.resources)}")
+        self.testers = g.testers
+        self.hrly_test_expense = self.testers * g.tester_hr_wage
+        #Shift calendar of the testers, None when they are on shift around the clock. Testers off shift are neither in
+        #service nor paid
+        self.calendar = None if g.tester_shifts is None else ShiftCalendar(g.tester_shifts)
+        self.change_shift(0.0)
+        #Wage expense accrues as a continuous rate and is only turned into cash ledger rows at the end of run()
+        self.wages = WageSchedule(self.hrly_test_expense, self.wage_calendar())
+
+        #Online KPI accumulators of a streaming run, None when every table is recorded
+        self.kpis = StreamingKpis(g, warmup) if streaming else None
+        #Columnar recorder that every table is written into during the run, converted to dataframes at the end of run()
+        self.recorder = Recorder()
+        #Registry of orders still in production, updated as each lot finishes
+        self.open_orders = OrderRegistry()
+        #Columns of every lot, which Lot handles read and write. Streaming runs reuse the slots of finished lots
+        self.lot_store = LotStore(reuse = streaming, trace = trace)
+        if not streaming:
+            #The finished lots in the store are the lots table, process times are derived after the run
+            self.recorder.add("lots", self.lot_store)
+            #Table to store information about every completed order, process times and revenue are derived after the run
+            self.orders_log = self.recorder.table("orders", [("Order_ID", np.int64), ("Start_Time", float), ("End_Time", float),
+                                                             ("Ship_Time", float)])
+            #Table to store the cash events of the run (COGS), order revenue and wages are added to the ledger after the run
+            self.cash_log = self.recorder.table("cash", [("Time", float), ("Revenue", float), ("COGS_Expense", float),
+                                                         ("Wage_Expense", float), ("Note", object)])
+        if trace:
+            #Table of every machine and tester visit, wait and service times are derived after the run
+            self.recorder.add("trace", self.lot_store.trace)
+
+    def monitor(self, name, capacity):
+        """Function that creates the monitor of the named station and adds it to the model's monitors."""
+
+        self.monitors[name] = StationMonitor(capacity, self.queue_grid, self.keep_steps)
+        return self.monitors[name]
+
+    def station(self, name, capacity):
+        """Function that creates a monitored FIFO resource for the named station."""
+
+        self.resources[name] = MonitoredResource(self.env, capacity, self.monitor(name, capacity))
+        return self.resources[name]
+
+    def set_capacity(self, name, capacity):
+        """Function that sets the number of servers of the named station in place (see MonitoredResource.set_capacity)."""
+
+        self.resources[name].set_capacity(capacity)
+
+    def build_resources(self):
+        """Function that creates the simulation environment and the machines and testers of every stage as monitored
+           FIFO resources, named by their queue table columns."""
+
+        g = self.scenario
+        self.env = simpy.Environment()
+        self.etch_machine = self.station("Etch", g.machines1)
+        if g.pooled_testers:
+            #Every test stage draws from the same pool of testers
+            self.assembly_machine = self.station("Assembly", g.machines2)
+            self.finishing_machine = self.station("Finishing", g.machines3)
+            self.tester = self.station("Testers", g.testers)
+            self.etch_tester = self.assembly_tester = self.finishing_tester = self.tester
+        else:
+            self.etch_tester = self.station("Test1", g.testers1)
+            self.assembly_machine = self.station("Assembly", g.machines2)
+            self.assembly_tester = self.station("Test2", g.testers2)
+            self.finishing_machine = self.station("Finishing", g.machines3)
+            self.finishing_tester = self.station("Test3", g.testers3)
+
+    def bind_samplers(self):
+        """Function that binds the samplers of every random quantity to the scenario's distribution parameters.
+           Process and test times are truncated at zero and scaled to a whole lot (plus the etch set-up time)."""
+
+        g, streams = self.scenario, self.streams
+        self.sample_interarrival = streams.normal("interarrival", *self.interarrival)
+        self.sample_ship = streams.normal("ship", g.mean_ship, g.std_ship, truncate = False)
+        self.etch_time = streams.normal("etch_process", g.mean_etching, g.std_etching, scale = g.units_per_lot, shift = g.lot_time1)
+        self.etch_test_time = streams.normal("etch_test", g.mean_test1, g.std_test1, scale = g.units_per_lot)
+        self.etch_failure = streams.uniform("etch_failure")
+        self.assembly_time = streams.normal("assembly_process", g.mean_assembly, g.std_assembly, scale = g.units_per_lot)
+        self.assembly_test_time = streams.normal("assembly_test", g.mean_test2, g.std_test2, scale = g.units_per_lot)
+        self.assembly_failure = streams.uniform("assembly_failure")
+        self.finishing_time = streams.normal("finishing_process", g.mean_finishing, g.std_finishing, scale = g.units_per_lot)
+        #The final test time is scaled by units per lot twice, like the original model
+        self.finishing_test_time = streams.normal("finishing_test", g.mean_test3, g.std_test3, scale = g.units_per_lot*g.units_per_lot)
+        self.finishing_failure = streams.uniform("finishing_failure")
+
+    def intervene(self, time, kind, *arguments):
+        """Function that applies one of the scenario's interventions (see INTERVENTIONS) at the given time.
+           Capacity changes set the servers staffed at a station, and testers hired or let go change the wage bill.
+           Breakdowns and repairs only change how many of the staffed servers are in service. The servers in service
+           are set in place (see set_capacity). A change of demand rebinds the interarrival sampler to the new
+           distribution, from the next order on. A change of shifts is booked in the wage schedule, puts the testers
+           on shift in service and starts following the new calendar (see change_shifts)."""
+
+        g = self.scenario
+        if kind == "demand":
+            d_arr, d_std = arguments
+            self.interarrival = (24/d_arr, 24/d_std)
+            self.sample_interarrival = self.streams.normal("interarrival", *self.interarrival)
+        elif kind == "shifts":
+            self.calendar = None if arguments[0] is None else ShiftCalendar(arguments[0])
+            self.wages.change_calendar(time, self.wage_calendar())
+            self.change_shift(time)
+            if self.calendar is not None:
+                self.start_shifts()
+        else:
+            name, servers = arguments
+            staffed, broken = self.staffed[name], self.broken[name]
+            if kind == "capacity":
+                staffed = servers
+            elif kind == "breakdown":
+                broken += servers
+            else:
+                broken -= servers
+            if servers < 0 or not 0 <= broken <= staffed:
+                raise ValueError(f"Intervention '{kind}' at {time} leaves station '{name}' with {broken} of {staffed} servers broken down")
+            hired = staffed - self.staffed[name]
+            self.staffed[name], self.broken[name] = staffed, broken
+            if kind == "capacity" and name in TESTER_STATIONS:
+                self.testers += hired
+                self.hrly_test_expense = self.testers * g.tester_hr_wage
+                self.wages.change(time, self.hrly_test_expense, self.wage_calendar())
+            self.set_capacity(name, self.in_service(name))
+
+    def in_service(self, name):
+        """Function that returns the servers of the named station in service: the servers staffed (at tester stations
+           the share of them on shift, rounded half up, see staff_on_shift), less those broken down."""
+
+        servers = self.staffed[name]
+        if name in TESTER_STATIONS:
+            servers = staff_on_shift(servers, self.on_shift)
+        return max(0, servers - self.broken[name])
+
+    def wage_calendar(self):
+        """Function that returns the shift calendar the wages are paid by, which pays the testers on shift at every
+           tester station rounded like in_service, so the wages pay for the testers put in service."""
+
+        if self.calendar is None:
+            return None
+        return self.calendar.rounded([self.staffed[name] for name in TESTER_STATIONS if name in self.staffed])
+
+    def change_shift(self, time):
+        """Function that puts the testers on shift at the given time in service (all of them without a shift calendar)."""
+
+        self.on_shift = 1.0 if self.calendar is None else self.calendar.on_shift(time)
+        for name in TESTER_STATIONS:
+            if name in self.resources and self.resources[name].capacity != self.in_service(name):
+                self.set_capacity(name, self.in_service(name))
+
+    def log_cash(self, time, revenue, cogs, wages, note):
+        """Function that, when called, logs the change in cash position to the firm's books.
+           For this model, only revenue generated from completed orders,
+           cost of goods sold, and wage expenses are logged as cash expenses."""
+
+        if self.kpis is not None:
+            self.kpis.log_cash(time, revenue, cogs, wages)
+        else:
+            self.cash_log.append(time, revenue, cogs, wages, note)
+
+    def queue_table(self):
+        """Function that returns the queue table: the order counter, the queue length and utilization of every station
+           and the failed test counter at every time of the queue grid, sampled from their step functions."""
+
+        import pandas as pd
+
+        table = {"Time": np.array(self.queue_grid, dtype = float), "Total_Orders": self.orders_monitor.sampled()}
+        for name, monitor in self.monitors.items():
+            table[f"{name}_Q_Length"] = monitor.sampled(0)
+        for name, monitor in self.monitors.items():
+            table[f"{name}_Utilization"] = utilization(monitor.sampled(1), monitor.capacity_at(self.queue_grid))
+        table["Failed_Tests"] = self.failures_monitor.sampled()
+        return pd.DataFrame(table)
+
+    def station_table(self):
+        """Function that returns the exact time-weighted queue length and utilization statistics of every station
+           over the run (after the warm-up period of a streaming run), one row per station."""
+
+        import pandas as pd
+
+        return pd.DataFrame.from_dict({name: monitor.summary(self.scenario.sim_duration) for name, monitor in self.monitors.items()},
+                                      orient = "index").rename_axis("Station")
+
+    def step_table(self):
+        """Function that returns the full step log of every station: its queue length, busy servers and utilization
+           from every time one of them changed."""
+
+        import pandas as pd
+
+        return pd.concat([monitor.step_frame(name) for name, monitor in self.monitors.items()], ignore_index = True)
+
+    def store_lot_results(self,lot):
+        """Function that marks a lot as finished in the lot store once it completes the production process"""
+
+        self.lot_store.finish(lot.slot)
+
+    def store_order_results(self, order_id, start_time, end_time):
+        """Function that stores the attribute data of every completed order.
+           This function is called only when all lots of an order have completed
+           the production process and the order was packaged and delivered to the customer.
+           Its revenue is booked in the cash ledger at this time once the run is complete."""
+
+        ship_time = self.sample_ship()
+        if self.kpis is not None:
+            self.kpis.order_filled(end_time, end_time - start_time + ship_time)
+        else:
+            self.orders_log.append(order_id, start_time, end_time, ship_time)
+
+    def end_warmup(self):
+        """Function that marks the end of the warm-up period of a streaming run in its KPI accumulators."""
+
+        yield self.env.timeout(self.kpis.warmup)
+        self.kpis.end_warmup(self.order_counter, self.failed_tests)
+        for monitor in self.monitors.values():
+            monitor.reset(self.env.now)
+
+    def apply_interventions(self):
+        """Scheduler process that applies the scenario's interventions at their times (see intervene)."""
+
+        for time, kind, *arguments in self.scenario.interventions:
+            yield self.env.timeout(max(0, time - self.env.now))
+            self.intervene(self.env.now, kind, *arguments)
+
+    def start_shifts(self):
+        """Function that starts following the testers' shift calendar (see change_shifts)."""
+
+        self.env.process(self.change_shifts(self.calendar))
+
+    def change_shifts(self, calendar):
+        """Process that changes the testers in service at every start and end of a shift of the calendar, until the
+           calendar is replaced by a shifts intervention."""
+
+        change = calendar.next_change(self.env.now)
+        while self.calendar is calendar:
+            yield self.env.timeout(change - self.env.now)
+            if self.calendar is calendar:
+                self.change_shift(change)
+            change = calendar.next_change(change)
+
+    def machine_and_test(self, lot, stage, machine, tester, machine_time, test_time, test_failure, p_fail):
+        """This is the function that models one production stage (0 etch, 1 assembly, 2 finishing): the lot is processed on a machine, then tested.
+           machine_time and test_time sample the hours the lot holds the machine and the tester, the test fails when
+           test_failure samples a uniform value below p_fail.
+           A failed test is reworked in a loop within the lot's own process under the scenario's rework_policy:
+           "full" runs the machine and the test again, "retest" only queues the lot for another test and
+           "scrap" reworks like "full" until the lot has failed scrap_after tests, then scraps it.
+           The tester is released before the lot waits for rework. Returns False if the lot was scrapped."""
+
+        g = self.scenario
+        trace = self.lot_store.trace is not None
+        rerun_machine = True
+        while True:
+            if rerun_machine:
+                with machine.request() as req:
+                    requested = self.env.now
+                    yield req
+                    granted = self.env.now
+                    yield self.env.timeout(machine_time())
+                    if trace:
+                        lot.visited(stage, 0, requested, granted, self.env.now)
+            with tester.request() as req:
+                requested = self.env.now
+                yield req
+                granted = self.env.now
+                yield self.env.timeout(test_time())
+                fail_test = test_failure()
+                if trace:
+                    lot.visited(stage, 1, requested, granted, self.env.now)
+            if fail_test >= p_fail:
+                lot.passed(stage, self.env.now)
+                return True
+            self.failed_tests +=1
+            self.failures_monitor.record(self.env.now, self.failed_tests)
+            lot.failures += 1
+            if g.rework_policy == "scrap" and lot.failures >= g.scrap_after:
+                return False
+            rerun_machine = g.rework_policy != "retest"
+
+    def etch_and_test(self,lot):
+        """This is the function that models the etching and etch testing stages.
+           If a lot fails a test, it is reworked until it passes the etch test (see machine_and_test)."""
+
+        g = self.scenario
+        return self.machine_and_test(lot, 0, self.etch_machine, self.etch_tester, self.etch_time, self.etch_test_time,
+                                     self.etch_failure, g.p_fail_test1)
+
+    def assembly_and_test(self,lot):
+        """This is the function that models the assembly and assembly testing stages.
+           If a lot fails a test, it is reworked until it passes the assembly test (see machine_and_test).
+           Assembly is run on the etching machines, like the original model."""
+
+        g = self.scenario
+        return self.machine_and_test(lot, 1, self.etch_machine, self.assembly_tester, self.assembly_time, self.assembly_test_time,
+                                     self.assembly_failure, g.p_fail_test2)
+
+    def finishing_and_test(self,lot):
+        """This is the function that models the finishing and final testing stages.
+           If a lot fails a test, it is reworked until it passes the final test (see machine_and_test)."""
+
+        g = self.scenario
+        return self.machine_and_test(lot, 2, self.finishing_machine, self.finishing_tester, self.finishing_time, self.finishing_test_time,
+                                     self.finishing_failure, g.p_fail_test3)
+
+    def replace_lot(self, lot):
+        """Function that replaces a scrapped lot with a new lot of the same order, which is charged its COGS again."""
+
+        self.lot_store.scrap(lot.slot)
+        replacement = Lot(self.lot_store, self.unique_id_counter, lot.order_id, lot.id)
+        self.unique_id_counter += 1
+        self.scrapped_lots += 1
+        self.log_cash(self.env.now, 0, self.cost_per_lot, 0, "Replacement COGS")
+        return replacement
+
+    def generate_orders(self):
+        """First generator function in the simpy environment. This function simulates order demand arriving to the factory.
+           Demand is modeled as following a normal distribution, demand is inputted into the system as an interarrival time.
+           Orders are then split into lots and lots are send through the production process."""
+
+        g = self.scenario
+        while True:
+            self.order_counter += 1
+            self.orders_monitor.record(self.env.now, self.order_counter)
+            self.lot_counter = 1
+            self.open_orders.open(self.order_counter, g.lots_per_order)
+            #print(f"Order {self.order_counter} has been requested at {self.env.now:.5f}")
+            for x in range(g.lots_per_order):
+                l = Lot(self.lot_store, self.unique_id_counter,self.order_counter, self.lot_counter)
+                self.unique_id_counter += 1
+                self.lot_counter += 1
+                self.log_cash(self.env.now, 0, self.cost_per_lot,0,"COGS")
+                self.env.process(self.lot_flow(l))
+                #print(f"Lot {self.lot_counter} of order {self.order_counter} has been created")
+            sampled_interarrival = self.sample_interarrival()
+            yield self.env.timeout(sampled_interarrival)
+
+    def lot_flow(self,lot):
+        """This function instantiates the flow of a single lot as it flows through the production process.
+           Lot attributes, like start time and end time, are logged through this process.
+           Once a lot is completed in the system, a function within the lot_flow function checks whether or not all lots of the order are completed.
+           If all lots of the order have completed the process flow, then the order is logged as being complete and revenue is recorded in the cash dataframe.
+           The stages run within this one process, and a lot scrapped by the rework policy is replaced by a new lot that starts over at etching."""
+
+        released = self.env.now
+        while True:
+            lot.start_time = self.env.now
+            if ((yield from self.etch_and_test(lot)) and (yield from self.assembly_and_test(lot))
+                    and (yield from self.finishing_and_test(lot))):
+                break
+            lot = self.replace_lot(lot)
+        #print(f"Lot {lot.id} of order {lot.order_id} finished at {self.env.now}")
+        #The order's production starts when its lots were released, also if one of them had to be replaced.
+        #The end time was recorded when the lot passed the final test
+        order_times = self.open_orders.lot_finished(lot.order_id, released, lot.end_time)
+        if order_times is not None:
+            #print(f"*****Order {lot.order_id} finished at {self.env.now}")
+            self.store_order_results(lot.order_id, *order_times)
+        self.store_lot_results(lot)
+
+    def simulate(self):
+        """Function that starts the order, warm-up, intervention and shift processes and runs SimPy until the simulation duration."""
+
+        self.env.process(self.generate_orders())
+        if self.kpis is not None and self.kpis.warmup > 0:
+            self.env.process(self.end_warmup())
+        if self.scenario.interventions:
+            self.env.process(self.apply_interventions())
+        if self.calendar is not None:
+            self.start_shifts()
+        self.env.run(until = self.scenario.sim_duration)
+
+    def snapshot(self):
+        """Function that saves the state of a run part way through. Only the kernel engine supports snapshots
+           (see Olympic_Kernel.snapshot), SimPy runs raise ValueError: their processes are Python generators,
+           which cannot be copied."""
+
+        raise ValueError("Snapshots need the kernel engine (engine = \"kernel\"), SimPy processes cannot be copied")
+
+    def run(self, sink = None, wage_resolution = 1):
+        """Function that when called, instantiates the model for a single run.
+           When the model is complete, the recorder tables are converted to pandas dataframes once, the derived columns
+           and the cash ledger (with wages booked every wage_resolution hours) are computed and returned in memory
+           as RunResults. Nothing is written to disk unless a results sink is given.
+           The queue table samples the monitored step functions 100 times over the run, the station table holds their
+           exact time-weighted statistics and the step table their full log.
+           A streaming run only returns the queue and station tables, with the KPI accumulators as RunResults.kpis."""
+        if self.kpis is not None and sink is not None:
+            raise ValueError("Results sinks store the full tables, which a streaming run does not keep")
+        self.simulate()
+        frames = self.recorder.to_frames()
+        self.q_df = self.queue_table()
+        self.stations_df = self.station_table()
+        if self.kpis is not None:
+            self.kpis.wage_expense += self.wages.accrued(min(self.kpis.warmup, self.scenario.sim_duration), self.scenario.sim_duration)
+            self.results = RunResults(self.scenario, {"queue": self.q_df, "stations": self.stations_df}, self.run_number, self.seed, self.kpis)
+            return self.results
+        self.lots_df = add_lot_columns(frames["lots"])
+        self.orders_df = add_order_columns(frames["orders"], self.scenario)
+        self.cash_df = cash_ledger(frames["cash"], self.orders_df, *self.wages.ledger(self.scenario.sim_duration, wage_resolution))
+        self.steps_df = self.step_table()
+        tables = {"cash": self.cash_df, "queue": self.q_df, "lots": self.lots_df, "orders": self.orders_df,
+                  "stations": self.stations_df, "steps": self.steps_df}
+        if "trace" in frames:
+            tables["trace"] = add_trace_columns(frames["trace"])
+        self.results = RunResults(self.scenario, tables, self.run_number, self.seed)
+        if sink is not None:
+            sink.write(self.results)
+        return self.results
+
+
+ENGINES = ["simpy", "kernel"]
+
+
+def make_model(run_number, scenario = None, engine = "simpy", **options):
+    """Function that creates a model on the chosen engine: "simpy" for Olympic_Model, "kernel" for the fast event-heap
+       kernel of Olympic_Kernel, which produces the same results. Other keyword arguments go to the model."""
+
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}, got '{engine}'")
+    if engine == "kernel":
+        from Olympic_Kernel import Olympic_Kernel
+        return Olympic_Kernel(run_number, scenario, **options)
+    return Olympic_Model(run_number, scenario, **options)
+
+
+def parse_intervention(text):
+    """Function that reads time,kind,arguments into an intervention (see INTERVENTIONS), e.g. 720,capacity,Test3,35,
+       1440,demand,12,5 or 720,shifts,6:14:1,14:22:0.5 (shifts as start:end:fraction, none for paid around the clock)."""
+
+    time, kind, *arguments = text.split(",")
+    if kind not in INTERVENTIONS:
+        raise ValueError(f"Unknown intervention '{kind}', choose from {INTERVENTIONS}")
+    if kind == "shifts":
+        arguments = [[tuple(float(value) for value in shift.split(":")) for shift in arguments] or None]
+    elif kind == "demand":
+        arguments = [float(value) for value in arguments]
+    else:
+        arguments = [arguments[0], int(arguments[1])]
+    return (float(time), kind, *arguments)
+
+
+def main(argv = None):
+    """Command line entry point. Runs one scenario, prints the report and shows the plots like the original
+       scenario scripts, optionally exporting the .csv files or storing the run in a binary format.
+       With --cache a run made before is loaded from the results cache instead. Returns the RunResults.
+       The plotting module is only imported here."""
+
+    import argparse
+    parser = argparse.ArgumentParser(description = "Run the Olympic production model for one scenario")
+    parser.add_argument("--scenario", default = "base", choices = SCENARIOS)
+    parser.add_argument("--seed", type = int, default = 60)
+    parser.add_argument("--csv", action = "store_true", help = "export the four .csv files to the working directory")
+    parser.add_argument("--output", choices = SINKS, help = "also store the run under --output-dir in this format")
+    parser.add_argument("--output-dir", default = "results")
+    parser.add_argument("--wage-resolution", type = float, default = 1, help = "hours per wage expense row in the cash ledger")
+    parser.add_argument("--streaming", action = "store_true", help = "accumulate the KPIs online instead of keeping lot, order and cash rows")
+    parser.add_argument("--warmup", type = float, default = 0, help = "hours left out of the KPIs of a streaming run")
+    parser.add_argument("--antithetic", action = "store_true", help = "run the antithetic twin of the seeded streams")
+    parser.add_argument("--engine", default = "simpy", choices = ENGINES, help = "simulation engine (kernel: fast, same results)")
+    parser.add_argument("--trace", action = "store_true", help = "record every machine and tester visit and report wait and service times per step")
+    parser.add_argument("--cache", nargs = "?", const = CACHE_DIR, default = None, metavar = "DIR",
+                        help = f"return the run from the results cache if it was run before, else run and cache it (default DIR: {CACHE_DIR})")
+    parser.add_argument("--intervene", type = parse_intervention, action = "append", metavar = "TIME,KIND,ARGS",
+                        help = "change the line at a simulated hour, e.g. 720,capacity,Test3,35 or 240,breakdown,Etch,2 or 1440,demand,12,5")
+    parser.add_argument("--plots", nargs = "*", default = None,
+                        help = "plots to show: queues, utilization, lead_times, profit (default: all, none if the flag is given without names)")
+    args = parser.parse_args(argv)
+    if args.streaming and (args.csv or args.output):
+        parser.error("--csv and --output need the full tables, which --streaming does not keep")
+    if args.warmup and not args.streaming:
+        parser.error("--warmup only applies to --streaming runs")
+    if args.trace and args.streaming:
+        parser.error("--trace records every visit, which --streaming does not keep")
+    if args.streaming:
+        if args.plots is None:
+            args.plots = ["queues", "utilization"]
+        elif set(args.plots) & {"lead_times", "profit"}:
+            parser.error("lead_times and profit plots need the order and cash tables, which --streaming does not keep")
+
+    scenario = SCENARIOS[args.scenario]
+    if args.intervene:
+        scenario = scenario.replace(interventions = (scenario.interventions or []) + args.intervene)
+    results = cached_run(ResultCache(args.cache) if args.cache else None, 1, scenario, args.engine,
+                         wage_resolution = args.wage_resolution, seed = args.seed, streaming = args.streaming,
+                         warmup = args.warmup, antithetic = args.antithetic, trace = args.trace)
+    if args.csv:
+        CsvSink(".", legacy_names = True).write(results)
+    if args.output:
+        print("Results written to", ", ".join(SINKS[args.output](args.output_dir).write(results)))
+    print_report(results)
+    print("\nExact time-weighted queue length (lots) and utilization (%) per station:")
+    print(results.stations_df.to_string(float_format = lambda x: f"{x:,.2f}"))
+    if args.trace:
+        print("\nWait and service hours per step, with each step's share of all waiting:")
+        print(step_times(results.trace_df).to_string(float_format = lambda x: f"{x:,.2f}"))
+    if args.plots != []:
+        import Olympic_Plots
+        Olympic_Plots.show(results, Olympic_Plots.PLOTS if args.plots is None else args.plots)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Event-driven monitoring of the Olympic production line.
+
+Queue lengths, busy servers and the order and failed test counters are step functions of time.
+Instead of polling them at fixed times, every station records its queue length and busy servers
+whenever they may have changed, which gives exact time-weighted statistics: the time-average
+queue length and utilization, and the share of time spent at every queue length, from which
+queue length percentiles follow.
+
+Recording a change only appends a tuple to a buffer. Full buffers are processed with NumPy: the
+time spent at every value is accumulated with bincount and the step functions are sampled on the
+grid of queue table times, so no sampling events are scheduled and memory does not grow with the
+run. Runs that keep their tables also keep the full step log of every station, which can be
+downsampled at any resolution after the run.
+"""
+
+import numpy as np
+import simpy
+
+BUFFER_SIZE = 65536     #Changes buffered before they are processed
+
+
+class StepMonitor:
+    """Class that follows one or more integer-valued step functions of time that start at 0, e.g. a counter.
+       record is called with the time and the new values after every possible change. The buffered changes give the
+       time spent at every value (exact time-weighted mean, percentiles and maximum, unless weighted is False),
+       the value of every step function at each grid time (after every change at or before that time) and, with
+       keep_log, the log of every change."""
+
+    def __init__(self, series = 1, grid = (), keep_log = False, weighted = True, buffer_size = BUFFER_SIZE):
+        self.series = series
+        self.grid = np.asarray(grid, dtype = float)
+        self.weighted = weighted
+        self.buffer_size = buffer_size
+        self.changes = []
+        self.start = 0.0                            #Time of the last reset
+        self.last = (0.0,) + (0,)*series            #Time and values of the last processed change
+        self.durations = [np.zeros(16) for _ in range(series)]
+        self.maximum = [0]*series
+        self.samples = [[] for _ in range(series)]
+        self.log = [] if keep_log else None         #Blocks of processed changes
+
+    def record(self, time, value):
+        self.changes.append((time, value))
+        if len(self.changes) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Function that processes the buffered changes."""
+
+        if not self.changes:
+            return
+        block = np.array(self.changes, dtype = float).reshape(-1, self.series + 1)
+        self.changes.clear()
+        times = np.concatenate([[self.last[0]], block[:, 0]])
+        #Grid times before the last change are settled: later changes cannot happen at or before them
+        settled = np.searchsorted(self.grid, times[-1], side = "left")
+        at = np.searchsorted(times, self.grid[len(self.samples[0]):settled], side = "right") - 1
+        elapsed = np.diff(times)
+        for i in range(self.series):
+            values = np.concatenate([[self.last[i + 1]], block[:, i + 1]]).astype(np.int64)
+            self.samples[i].extend(values[at].tolist())
+            self.maximum[i] = max(self.maximum[i], int(values.max()))
+            if self.weighted:
+                time_at = np.bincount(values[:-1], weights = elapsed)
+                if len(time_at) > len(self.durations[i]):
+                    self.durations[i] = np.concatenate([self.durations[i], np.zeros(len(time_at) - len(self.durations[i]))])
+                self.durations[i][:len(time_at)] += time_at
+        if self.log is not None:
+            self.log.append(block)
+        self.last = (float(block[-1, 0]),) + tuple(int(v) for v in block[-1, 1:])
+
+    def reset(self, time):
+        """Function that restarts the time-weighted statistics at the given time, e.g. at the end of a warm-up period."""
+
+        self.flush()
+        self.start = time
+        self.last = (time,) + self.last[1:]
+        self.durations = [np.zeros_like(durations) for durations in self.durations]
+        self.maximum = list(self.last[1:])
+
+    def time_at(self, until, i = 0):
+        """Function that returns the time spent at every value of step function i from the last reset up to the given time."""
+
+        self.flush()
+        durations = self.durations[i].copy()
+        value = self.last[i + 1]
+        if value >= len(durations):
+            durations = np.concatenate([durations, np.zeros(value + 1 - len(durations))])
+        durations[value] += until - self.last[0]
+        return durations
+
+    def mean(self, until, i = 0):
+        """Function that returns the exact time-weighted mean of step function i up to the given time."""
+
+        durations = self.time_at(until, i)
+        return float(durations @ np.arange(len(durations))/durations.sum()) if durations.sum() > 0 else float(self.last[i + 1])
+
+    def quantile(self, p, until, i = 0):
+        """Function that returns the smallest value step function i stays at or below for a share p of the time."""
+
+        durations = self.time_at(until, i)
+        if durations.sum() <= 0:
+            return self.last[i + 1]
+        return int(np.searchsorted(np.cumsum(durations), p*durations.sum()))
+
+    def sampled(self, i = 0):
+        """Function that returns the values of step function i at every grid time."""
+
+        self.flush()
+        return np.array(self.samples[i] + [self.last[i + 1]]*(len(self.grid) - len(self.samples[i])), dtype = np.int64)
+
+    def steps(self):
+        """Function that returns the logged changes as (times, values of every step function) arrays,
+           leaving out records where no value changed."""
+
+        self.flush()
+        block = np.concatenate(self.log) if self.log else np.empty((0, self.series + 1))
+        values = block[:, 1:]
+        changed = np.any(values != np.vstack([np.zeros((1, self.series)), values[:-1]]), axis = 1)
+        return block[changed, 0], [values[changed, i].astype(np.int64) for i in range(self.series)]
+
+
+def sample_grid(duration, interval):
+    """Function that returns the times 0, interval, 2*interval, ... before duration, accumulated like repeated timeouts."""
+
+    times, time = [], 0.0
+    while time < duration:
+        times.append(time)
+        time += interval
+    return times
+
+
+def utilization(busy, capacity):
+    """Function that returns the busy servers as a percentage of the servers in service, NaN while none is in service
+       (a station broken down or off shift as a whole). busy and capacity may be arrays."""
+
+    busy, capacity = np.asarray(busy, dtype = float), np.asarray(capacity, dtype = float)
+    return np.divide(100*busy, capacity, out = np.full(np.broadcast(busy, capacity).shape, np.nan), where = capacity > 0)
+
+
+class StationMonitor(StepMonitor):
+    """Class that follows the queue length (step function 0) and busy servers (step function 1) of one station,
+       and its number of servers, which only changes when an intervention or a shift changes it. Utilization is the
+       share of the servers in service that are busy (see utilization)."""
+
+    def __init__(self, capacity, grid = (), keep_log = False, buffer_size = BUFFER_SIZE):
+        super().__init__(2, grid, keep_log, True, buffer_size)
+        self.capacity = capacity
+        self.capacity_times = [0.0]         #Times the number of servers changed
+        self.capacities = [capacity]
+
+    def change_capacity(self, time, capacity):
+        self.capacity = capacity
+        self.capacity_times.append(time)
+        self.capacities.append(capacity)
+
+    def capacity_at(self, times):
+        """Function that returns the number of servers at every time (after every change at or before it)."""
+
+        times = np.asarray(times, dtype = float)
+        if len(self.capacities) == 1:
+            return np.full(times.shape, self.capacity)
+        return np.array(self.capacities)[np.searchsorted(self.capacity_times, times, side = "right") - 1]
+
+    def mean_capacity(self, until):
+        """Function that returns the time-weighted mean number of servers from the last reset up to the given time."""
+
+        if len(self.capacities) == 1 or until <= self.start:
+            return self.capacity
+        times = np.clip(np.append(self.capacity_times, until), self.start, until)
+        return float(np.diff(times) @ np.array(self.capacities)/(until - self.start))
+
+    def record(self, time, queue_length, busy):
+        self.changes.append((time, queue_length, busy))
+        if len(self.changes) >= self.buffer_size:
+            self.flush()
+
+    def summary(self, until, quantiles = (0.5, 0.9, 0.99)):
+        """Function that returns the exact time-weighted statistics of the station from the last reset (or the start of
+           the run) until the given time as a dict."""
+
+        row = {"Mean_Queue": self.mean(until, 0)}
+        for q in quantiles:
+            row[f"Queue_P{100*q:g}"] = self.quantile(q, until, 0)
+        row["Max_Queue"] = self.maximum[0]
+        row["Utilization"] = float(utilization(self.mean(until, 1), self.mean_capacity(until)))
+        row["Max_Busy"] = self.maximum[1]
+        return row
+
+    def step_frame(self, name):
+        """Function that returns the full step log of the station as a dataframe."""
+
+        import pandas as pd
+
+        times, (queue_length, busy) = self.steps()
+        return pd.DataFrame({"Station": name, "Time": times, "Queue_Length": queue_length, "Busy": busy,
+                             "Utilization": utilization(busy, self.capacity_at(times))})
+
+
+class MonitoredResource(simpy.Resource):
+    """Class of a FIFO SimPy resource that reports its queue length and busy servers to a StationMonitor on every change.
+       SimPy tries to grant the first waiting request in _do_put whenever a request arrives or a release is processed,
+       and frees a server in _do_get, so the state is recorded after each. A granted request is only removed from the
+       queue after _do_put returns, so it is not counted as waiting."""
+
+    def __init__(self, env, capacity, monitor):
+        super().__init__(env, capacity)
+        self.monitor = monitor
+
+    def set_capacity(self, capacity):
+        """Function that changes the number of servers in place, without rebuilding the resource. Lots holding a server
+           when servers are taken away keep it until they release it; added servers are handed to the first waiting
+           lots straight away, one SimPy put at a time like releases."""
+
+        self._capacity = capacity
+        self.monitor.change_capacity(self._env.now, capacity)
+        while self.put_queue and len(self.users) < capacity:
+            self._trigger_put(None)
+
+    def _do_put(self, event):
+        super()._do_put(event)
+        self.monitor.record(self._env.now, len(self.put_queue) - event.triggered, len(self.users))
+
+    def _do_get(self, event):
+        super()._do_get(event)
+        self.monitor.record(self._env.now, len(self.put_queue), len(self.users))
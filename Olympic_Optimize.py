@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Simulation-based optimization of staffing and lot size against gross profit.
+
+optimize runs a simulated annealing search over integer scenario parameters (by default the
+testers of every test stage, or the tester pool when testers are pooled, and lots_per_order) to
+maximize the expected gross profit subject to a minimum on-time fill rate. Every candidate is
+scored by its mean gross profit over replications, less a penalty for every fill rate point short
+of the target.
+
+Replication noise is handled in three ways: every point runs on the same replication seeds
+(common random numbers), so neighbours are compared on the same demand and durations; the number
+of replications per point grows as the temperature falls, so late, fine-grained moves are decided
+on more replications; and the best few points are run again with more replications before the
+best feasible one is chosen. Evaluated replications are cached by scenario, so a point that is
+visited again, or re-evaluated with more replications, only runs the replications it is missing;
+with --cache the replications are also kept on disk for later searches (see Olympic_Cache).
+The candidate moves of every iteration and their replications run in parallel on one process pool.
+
+Example, pooled testers and lot size with a 95% on-time fill rate:
+    python Olympic_Optimize.py --base pooled_testers --min-fill-rate 95 --engine kernel
+"""
+
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from Olympic_Model import Scenario, SCENARIOS
+from Olympic_Replications import add_run_arguments, replication_seeds, run_options, run_replication
+from Olympic_Sweep import parse_param
+
+#Integer parameters searched by default and their (low, high) bounds, for separate and pooled testers
+SPACE = {"testers1": (5, 30), "testers2": (5, 30), "testers3": (10, 50), "lots_per_order": (1, 10)}
+POOLED_SPACE = {"tester_pool": (20, 100), "lots_per_order": (1, 10)}
+
+
+class Evaluator:
+    """Class that runs replications of variants of a base scenario on a process pool and caches their KPIs
+       by scenario and replication, so every replication of a point is only run once."""
+
+    def __init__(self, base, seeds, processes = None, **options):
+        self.base = base
+        self.seeds = seeds
+        self.options = options      #Extra make_model keyword arguments (engine, streaming, warmup)
+        self.runs = {}              #KPIs of every replication run, by scenario digest and replication
+        self.points = {}            #Parameters of every point evaluated, by scenario digest
+        self.processes = processes or os.cpu_count()
+        self.pool = ProcessPoolExecutor(self.processes) if self.processes > 1 else None
+
+    def evaluate(self, points, replications):
+        """Function that returns the mean KPIs of every point (a dict of parameter overrides) over replications 1..n,
+           running the replications that are not cached yet in parallel."""
+
+        keys, jobs = [], {}
+        for point in points:
+            scenario = self.base.replace(**point)
+            key = scenario.digest()
+            self.points.setdefault(key, dict(point))
+            runs = self.runs.setdefault(key, {})
+            keys.append(key)
+            for r in range(1, replications + 1):
+                if r not in runs:
+                    jobs.setdefault((key, r), (scenario, r, self.seeds[r - 1], None, self.options))
+        work = list(jobs.values())
+        results = self.pool.map(run_replication, work) if self.pool is not None else map(run_replication, work)
+        for (key, r), kpis in zip(jobs, results):
+            self.runs[key][r] = kpis
+        return [pd.DataFrame([self.runs[key][r] for r in range(1, replications + 1)]).mean() for key in keys]
+
+    def table(self):
+        """Function that returns every point evaluated with its replications and mean KPIs."""
+
+        rows = []
+        for key, point in self.points.items():
+            runs = pd.DataFrame(self.runs[key].values())
+            rows.append({**point, "Replications": len(runs), **runs.drop(columns = "Replication").mean()})
+        return pd.DataFrame(rows)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures = True)
+
+
+def score(kpis, min_fill_rate, penalty):
+    """Function that returns the objective of a point: its mean gross profit less penalty for every point of
+       on-time fill rate below min_fill_rate."""
+
+    return kpis["Gross_Profit"] - penalty*max(0.0, min_fill_rate - kpis["On_Time_Fill_Rate"])
+
+
+def neighbour(point, space, rng):
+    """Function that returns a random neighbour of a point: one parameter moved up or down by up to a tenth of its range,
+       kept within its bounds."""
+
+    name = list(space)[rng.integers(len(space))]
+    low, high = space[name]
+    step = int(rng.integers(1, max(1, (high - low)//10) + 1))*(1 if rng.random() < 0.5 else -1)
+    moved = min(high, max(low, point[name] + step))
+    if moved == point[name]:
+        moved = min(high, max(low, point[name] - step))
+    return {**point, name: moved}
+
+
+def optimize(base = None, space = None, min_fill_rate = 95, penalty = 50000, iterations = 40, candidates = 4,
+             replications = (5, 20), final_replications = 50, finalists = 5, temperature = None, cooling = 0.9,
+             seed = 60, processes = None, **options):
+    """Function that searches the integer parameters in space ({name: (low, high)}, default SPACE or POOLED_SPACE)
+       with simulated annealing for the largest expected gross profit with an on-time fill rate of at least min_fill_rate
+       (percent). Every iteration evaluates candidates random neighbours of the current point and moves to the best one
+       if it scores higher, or with probability exp(difference/temperature) if it does not. Replications per point grow
+       from replications[0] to replications[1] over the iterations. The starting temperature defaults to the standard
+       deviation of the gross profit of the starting point between replications, and it is multiplied by cooling every
+       iteration. The finalists best points are then run for final_replications and the feasible one with the largest
+       mean gross profit is chosen (the best scoring one when none is feasible).
+       options are extra make_model keyword arguments (engine, streaming, warmup) and the results cache
+       (see Olympic_Replications.run_replication).
+       Returns the best parameters, the final table of the finalists and the table of every point evaluated."""
+
+    base = Scenario() if base is None else base
+    space = (POOLED_SPACE if base.pooled_testers else SPACE) if space is None else space
+    rng = np.random.default_rng(seed)
+    evaluator = Evaluator(base, replication_seeds(seed, max(max(replications), final_replications)), processes, **options)
+    #Start from the base scenario, with the tester pool at the number of testers when it is not set
+    current = {name: min(high, max(low, base.testers if getattr(base, name) is None else getattr(base, name)))
+               for name, (low, high) in space.items()}
+    try:
+        evaluator.evaluate([current], replications[0])
+        runs = pd.DataFrame(evaluator.runs[base.replace(**current).digest()].values())
+        temperature = temperature or max(1.0, float(runs["Gross_Profit"].std()))
+        for iteration in range(iterations):
+            n = round(replications[0] + (replications[1] - replications[0])*iteration/max(1, iterations - 1))
+            moves = [neighbour(current, space, rng) for _ in range(candidates)]
+            current_kpis, *move_kpis = evaluator.evaluate([current] + moves, n)
+            scores = [score(kpis, min_fill_rate, penalty) for kpis in move_kpis]
+            best = int(np.argmax(scores))
+            change = scores[best] - score(current_kpis, min_fill_rate, penalty)
+            if change >= 0 or rng.random() < math.exp(change/temperature):
+                current = moves[best]
+            temperature *= cooling
+
+        explored = evaluator.table()
+        explored["Score"] = [score(row, min_fill_rate, penalty) for _, row in explored.iterrows()]
+        top = explored.sort_values("Score", ascending = False).head(finalists)
+        points = [{name: int(row[name]) for name in space} for _, row in top.iterrows()]
+        final = pd.DataFrame(evaluator.evaluate(points, final_replications))
+        final = pd.concat([pd.DataFrame(points), final.drop(columns = "Replication")], axis = 1)
+        final["Replications"] = final_replications
+        final["Score"] = [score(row, min_fill_rate, penalty) for _, row in final.iterrows()]
+        final["Feasible"] = final["On_Time_Fill_Rate"] >= min_fill_rate
+        choice = final[final["Feasible"]]["Gross_Profit"].idxmax() if final["Feasible"].any() else final["Score"].idxmax()
+        return points[choice], final, explored
+    finally:
+        evaluator.close()
+
+
+def parse_bounds(text):
+    """Function that reads name=low:high into (name, (low, high)) for an integer parameter."""
+
+    name, values = parse_param(text)
+    if len(values) != 2 or not all(isinstance(value, int) for value in values):
+        raise argparse.ArgumentTypeError(f"Expected name=low:high with integer bounds, got '{text}'")
+    return name, tuple(values)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Optimize Olympic staffing and lot size for gross profit with simulated annealing")
+    parser.add_argument("--base", default = "base", choices = SCENARIOS, help = "scenario the searched parameters override")
+    parser.add_argument("--param", type = parse_bounds, action = "append", help = "name=low:high integer bounds (default: testers and lot size)")
+    parser.add_argument("--min-fill-rate", type = float, default = 95, help = "smallest acceptable on-time fill rate (%%)")
+    parser.add_argument("--penalty", type = float, default = 50000, help = "gross profit lost per fill rate point short of the minimum")
+    parser.add_argument("--iterations", type = int, default = 40)
+    parser.add_argument("--candidates", type = int, default = 4, help = "neighbours evaluated in parallel every iteration")
+    parser.add_argument("--replications", type = int, nargs = 2, default = [5, 20], metavar = ("FIRST", "LAST"),
+                        help = "replications per point in the first and last iteration")
+    parser.add_argument("--final-replications", type = int, default = 50)
+    parser.add_argument("--finalists", type = int, default = 5)
+    parser.add_argument("--seed", type = int, default = 60)
+    parser.add_argument("--processes", type = int, default = None, help = "worker processes (default: all cores)")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
+    options = run_options(parser, args)
+    best, final, explored = optimize(SCENARIOS[args.base], dict(args.param) if args.param else None, args.min_fill_rate, args.penalty,
+                                     args.iterations, args.candidates, tuple(args.replications), args.final_replications,
+                                     args.finalists, seed = args.seed, processes = args.processes, **options)
+    print(f"{len(explored)} points evaluated, {explored['Replications'].sum()} replications before the final runs")
+    print(final.to_string(index = False, float_format = lambda x: f"{x:,.2f}"))
+    print(f"Best: {best}")
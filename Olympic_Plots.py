@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plots of a completed Olympic production model run.
+Only imported when plots are requested, so running the model never pays for the matplotlib import.
+"""
+
+import matplotlib.pyplot as plt
+
+PLOTS = ["queues", "utilization", "lead_times", "profit"]
+
+
+def series(model, station, column):
+    """Function that returns the times, values and line draw style of a station's Queue_Length or Utilization:
+       the exact step function from the run's step log if it kept one, otherwise the samples of the queue table."""
+
+    steps = getattr(model, "steps_df", None)
+    if steps is None:
+        q_plot = model.q_df
+        return q_plot.Time, q_plot[f"{station}_{'Q_Length' if column == 'Queue_Length' else column}"], "default"
+    rows = steps[steps.Station == station]
+    return rows.Time, rows[column], "steps-post"
+
+
+def plot_line(ax, model, station, column, **style):
+    """Function that draws one station series on the axes (see series)."""
+
+    times, values, drawstyle = series(model, station, column)
+    ax.plot(times, values, drawstyle = drawstyle, **style)
+
+
+def plot_queues(model):
+    """Queue length by stage over time. Dedicated testers show each test stage, pooled testers show the machine stages and the tester pool."""
+
+    g = model.scenario
+    fig, ax = plt.subplots()
+    if g.pooled_testers:
+        plot_line(ax, model, "Etch", "Queue_Length", label = "Etching Stage", color = 'g', linestyle = 'dashed')
+        plot_line(ax, model, "Assembly", "Queue_Length", label = "Assembly Stage", color = 'b', linestyle = 'dashed')
+        plot_line(ax, model, "Finishing", "Queue_Length", label = "Finishing Stage,", color = 'r',linestyle = 'dashed')
+        plot_line(ax, model, "Testers", "Queue_Length", label = "Pooled Testing", color = 'k')
+    else:
+        plot_line(ax, model, "Test1", "Queue_Length", label = "Etch Quality Testing", color = 'g', )
+        plot_line(ax, model, "Test2", "Queue_Length", label = "Assembly Testing", color = 'b')
+        plot_line(ax, model, "Test3", "Queue_Length", label = "Finishing Testing,", color = 'r')
+    plt.xlabel('Simulation Time (hrs)')
+    plt.ylabel('Queue Length (lots)')
+    plt.title(f'Queue Length by Stage when Demand = {g.d_arr} orders/day')
+    plt.legend()
+    plt.grid()
+    plt.show()
+
+
+def plot_utilization(model):
+    """Tester utilization over time, per test stage or for the tester pool."""
+
+    g = model.scenario
+    fig, ax = plt.subplots()
+    if g.pooled_testers:
+        plot_line(ax, model, "Testers", "Utilization", label = "Pooled Testing", color = 'r', linewidth = 1)
+        plt.title('Testers Utilization vs. Time')
+    else:
+        plot_line(ax, model, "Test1", "Utilization", label = "Etch Quality Testing", color = 'g', linewidth = 1)
+        plot_line(ax, model, "Test2", "Utilization", label = "Assembly Testing", color = 'b', linewidth = 1)
+        plot_line(ax, model, "Test3", "Utilization", label = "Finishing Testing,", color = 'r', linewidth = 1)
+        plt.title(f'Utilization by Stage vs. Time when Demand = {g.d_arr} orders/day')
+    plt.xlabel('Simulation Time (hrs)')
+    plt.ylabel('Utilization (%)')
+    plt.grid()
+    plt.show()
+
+
+def plot_lead_times(model):
+    """Lead time of every filled order against the time it was completed."""
+
+    order_plot = model.orders_df
+    fig, cx = plt.subplots()
+    cx.scatter(order_plot.End_Time, order_plot.Order_Process_Time, color = 'k', s=5)
+    plt.tight_layout()
+    plt.xlabel('Simulation Time (hrs)')
+    plt.ylabel('Order Process Time (hrs)')
+    plt.title('Filled Order Lead Times vs Simulation Time')
+    plt.grid()
+    plt.show()
+
+
+def plot_profit(model):
+    """Cumulative revenue, COGS, wage expense and profit over time."""
+
+    profit_plot = model.cash_df
+    fig, dx = plt.subplots()
+    dx.plot(profit_plot.Time, profit_plot.Cumulative_Revenue, label = "Revenue", color = 'g', linewidth = 1)
+    dx.plot(profit_plot.Time, profit_plot.Cumulative_COGS, label = "COGS", color = 'r', linewidth = 1)
+    dx.plot(profit_plot.Time, profit_plot.Cumulative_Wage_Expense, label = "Wage Expense", color = 'm', linewidth = 1)
+    dx.plot(profit_plot.Time, profit_plot.Cumulative_Profits, label = "Cumulative Profit", color = 'k', linewidth = 3)
+    dx.yaxis.set_major_formatter('${x:,.0f}')
+    plt.legend()
+    plt.xlabel('Simulation Time (hrs)')
+    plt.ylabel('USD ($)')
+    plt.title('Profit/Loss vs Time')
+    plt.grid()
+    plt.show()
+
+
+def show(model, plots = PLOTS):
+    """Function that draws the requested plots of a completed run, in the order given."""
+
+    functions = {"queues": plot_queues, "utilization": plot_utilization,
+                 "lead_times": plot_lead_times, "profit": plot_profit}
+    unknown = [name for name in plots if name not in functions]
+    if unknown:
+        raise ValueError(f"Unknown plots {unknown}, choose from {PLOTS}")
+    for name in plots:
+        functions[name](model)
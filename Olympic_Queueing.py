@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Analytic queueing-network approximation of the Olympic production line, for screening scenarios.
+
+Every station of the line (the etch machines, which also run assembly like the model does, the
+finishing machines and the testers) is treated as a G/G/c queue in an open network with Bernoulli
+rework feedback. The lots of an order arrive together and, with near-deterministic service times
+on parallel servers, move through the line together, so the unit of flow is the order batch: a
+station with c servers is taken to serve c/lots_per_order batches at a time. Lot-level queues
+with independent lots underestimate the simulated queues by an order of magnitude.
+
+The batch arrival rates of every station follow from the expected visits under the rework policy,
+the variability of the arrivals from the QNA traffic variability equations (Whitt 1983), and the
+mean wait at every station from Sakasegawa's G/G/c approximation, which also holds for the
+fractional batch servers (Kingman's formula for one server). Against simulation the waits come out
+somewhat high, so the estimates are on the conservative side.
+
+An order is filled when its slowest lot is done and it has been shipped. The order's waits are
+shared by its lots and fitted with a lognormal distribution (each wait is zero, or exponential
+with the probability of waiting), the processing of every lot with its rework is an independent
+lognormal, and the ship time is normal. From the resulting order fill time distribution come the
+mean and service level fill times, the on-time fill rate and the expected revenue per order with
+the late penalty, and with the COGS and wages the gross profit of a run.
+
+Only the standard library and NumPy are used and one estimate takes about a millisecond, so
+thousands of configurations can be screened before the promising ones are simulated (see the
+--screen option of Olympic_Sweep). The approximation describes the line in steady state, so it
+ignores the start-up transient and the scenario's interventions, and it reworks the replacement
+lots of the scrap policy like full.
+
+Example, the estimate of the base scenario next to its station table:
+    python Olympic_Queueing.py --scenario base
+"""
+
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+from Olympic_Analytics import STEPS, order_revenue
+from Olympic_Wages import ShiftCalendar, WageSchedule
+
+SQRT_2PI = math.sqrt(2*math.pi)
+SHIP_NODES, SHIP_WEIGHTS = np.polynomial.hermite_e.hermegauss(5)      #Gauss-Hermite rule for the normal ship time
+SHIP_WEIGHTS = SHIP_WEIGHTS/SHIP_WEIGHTS.sum()
+WAIT_POINTS = np.array([NormalDist().inv_cdf((k + 0.5)/8) for k in range(8)])   #Equally likely points of the order's total wait
+GRID_POINTS = 200       #Times the order fill time distribution is evaluated at
+
+
+def truncated_moments(mu, sigma):
+    """Function that returns the mean and second moment of max(0, N(mu, sigma)), the distribution the model samples."""
+
+    if sigma <= 0:
+        return max(0.0, mu), max(0.0, mu)**2
+    z = mu/sigma
+    cdf = 0.5*(1 + math.erf(z/math.sqrt(2)))
+    pdf = math.exp(-z*z/2)/SQRT_2PI
+    return mu*cdf + sigma*pdf, (mu*mu + sigma*sigma)*cdf + mu*sigma*pdf
+
+
+def normal_cdf(x):
+    """Function that returns the standard normal distribution function of an array (Abramowitz & Stegun 7.1.26 for erf,
+       absolute error below 1e-7)."""
+
+    x = np.asarray(x, dtype = float)/math.sqrt(2)
+    t = 1/(1 + 0.3275911*np.abs(x))
+    poly = t*(0.254829592 + t*(-0.284496736 + t*(1.421413741 + t*(-1.453152027 + t*1.061405429))))
+    erf = 1 - poly*np.exp(-x*x)
+    return 0.5*(1 + np.sign(x)*erf)
+
+
+def multi_server_wait(arrival_rate, mean_service, servers, arrival_scv, service_scv):
+    """Function that returns the mean wait in queue and the probability of waiting of a G/G/c station, inf when it is not
+       stable. The M/M/c queue length is Sakasegawa's approximation rho^sqrt(2(c + 1))/(1 - rho), which also holds for
+       a fractional number of servers, scaled by the mean of the squared coefficients of variation (Allen-Cunneen)."""
+
+    utilization = arrival_rate*mean_service/servers
+    if utilization >= 1:
+        return float("inf"), 1.0
+    p_wait = utilization**(math.sqrt(2*(servers + 1)) - 1)
+    return p_wait*utilization/(1 - utilization)*(arrival_scv + service_scv)/2/arrival_rate, p_wait
+
+
+def step_services(g):
+    """Function that returns the mean and second moment of the service time of one visit to every step, per lot."""
+
+    units = g.units_per_lot
+    scales = {"Etch": (g.mean_etching, g.std_etching, units), "Etch_Test": (g.mean_test1, g.std_test1, units),
+              "Assembly": (g.mean_assembly, g.std_assembly, units), "Assembly_Test": (g.mean_test2, g.std_test2, units),
+              "Finishing": (g.mean_finishing, g.std_finishing, units),
+              "Final_Test": (g.mean_test3, g.std_test3, units*units)}    #Scaled by units per lot twice, like the model
+    services = {}
+    for step, (mu, sigma, scale) in scales.items():
+        mean, second = truncated_moments(mu, sigma)
+        services[step] = (mean*scale, second*scale*scale)
+    #The etch time includes the lot set-up time
+    mean, second = services["Etch"]
+    services["Etch"] = (mean + g.lot_time1, second + 2*mean*g.lot_time1 + g.lot_time1**2)
+    return services
+
+
+def testers_on_shift(g, testers):
+    """Function that returns the mean number of a tester station's testers on shift, and so in service, under the
+       scenario's shift calendar (rounded at every shift like the model, see Olympic_Wages.staff_on_shift)."""
+
+    if g.tester_shifts is None:
+        return testers
+    calendar = ShiftCalendar(g.tester_shifts).rounded([testers])
+    return testers*calendar.paid_per_period/calendar.period
+
+
+def step_stations(g):
+    """Function that returns the station every step is served at, and the servers of every station in the order of the
+       model's station table. Assembly runs on the etch machines, like the model, so the assembly machines stay idle.
+       Tester stations have their mean number of testers on shift."""
+
+    if g.pooled_testers:
+        stations = {"Etch": g.machines1, "Assembly": g.machines2, "Finishing": g.machines3, "Testers": testers_on_shift(g, g.testers)}
+        tests = ["Testers"]*3
+    else:
+        stations = {"Etch": g.machines1, "Test1": testers_on_shift(g, g.testers1), "Assembly": g.machines2,
+                    "Test2": testers_on_shift(g, g.testers2), "Finishing": g.machines3, "Test3": testers_on_shift(g, g.testers3)}
+        tests = ["Test1", "Test2", "Test3"]
+    return dict(zip(STEPS, ["Etch", tests[0], "Etch", tests[1], "Finishing", tests[2]])), stations
+
+
+def step_flows(g):
+    """Function that returns the expected visits of one lot to every step and the expected moves between steps,
+       as {(from step, to step): moves per lot} with None for the arrival and the exit.
+       Under "full" (and "scrap") rework a failed test sends the lot back to the stage's machine, under "retest"
+       back to the test."""
+
+    p_fails = [g.p_fail_test1, g.p_fail_test2, g.p_fail_test3]
+    visits, moves = {}, {}
+    previous = None
+    for stage, p_fail in enumerate(p_fails):
+        machine, test = STEPS[2*stage], STEPS[2*stage + 1]
+        attempts = 1/(1 - p_fail)
+        moves[previous, machine] = 1.0
+        if g.rework_policy == "retest":
+            visits[machine], visits[test] = 1.0, attempts
+            moves[machine, test] = 1.0
+            moves[test, test] = attempts - 1
+        else:
+            visits[machine], visits[test] = attempts, attempts
+            moves[machine, test] = attempts
+            moves[test, machine] = attempts - 1
+        previous = test
+    moves[previous, None] = 1.0
+    return visits, moves
+
+
+def network(g, order_rate, arrival_scv):
+    """Function that returns the names, servers, batch arrival rate, mean and squared coefficient of variation (SCV) of
+       the service time and the SCV of the batch arrivals of every station, solving the QNA traffic variability equations
+       with the lots of an order as one batch that needs lots_per_order servers."""
+
+    step_station, servers = step_stations(g)
+    services = step_services(g)
+    visits, moves = step_flows(g)
+    names = list(servers)
+    index = {name: i for i, name in enumerate(names)}
+    n = len(names)
+    rates = np.zeros(n)
+    first, second = np.zeros(n), np.zeros(n)
+    for step, count in visits.items():
+        i = index[step_station[step]]
+        rates[i] += order_rate*count
+        first[i] += order_rate*count*services[step][0]
+        second[i] += order_rate*count*services[step][1]
+    active = rates > 0
+    mean_service = np.divide(first, rates, out = np.zeros(n), where = active)
+    service_scv = np.divide(second, rates, out = np.zeros(n), where = active)/np.where(active, mean_service**2, 1) - 1
+    service_scv = np.where(active, np.maximum(service_scv, 0), 0)      #Rounding can take deterministic service below 0
+
+    flows = np.zeros((n + 1, n + 1))       #Station to station batch flow rates, with the outside as index n
+    for (source, target), count in moves.items():
+        i = n if source is None else index[step_station[source]]
+        j = n if target is None else index[step_station[target]]
+        flows[i, j] += order_rate*count
+
+    batch_servers = np.array([servers[name] for name in names], dtype = float)/g.lots_per_order
+    utilization = np.minimum(rates*mean_service/batch_servers, 1)
+    departure_scv = 1 + (np.maximum(service_scv, 0.2) - 1)/np.sqrt(batch_servers)
+    #QNA: c_aj = a_j + sum_i c_ai b_ij over the stations with arrivals
+    matrix, constants = np.eye(n), np.ones(n)
+    for j in np.flatnonzero(active):
+        share = flows[:, j]/rates[j]                                                 #Share of j's arrivals from every source
+        routed = np.divide(flows[:n, j], rates, out = np.zeros(n), where = active)   #Share of every station's departures to j
+        mixing = 1/(1 + 4*(1 - utilization[j])**2*(1/np.sum(share**2) - 1))
+        constants[j] = 1 + mixing*(share[n]*arrival_scv - 1 + np.sum(share[:n]*((1 - routed) + routed*utilization**2*departure_scv)))
+        matrix[j, :] -= mixing*share[:n]*routed*(1 - utilization**2)
+    return names, batch_servers, rates, mean_service, service_scv, np.linalg.solve(matrix, constants)
+
+
+def lognormal_parameters(mean, variance):
+    """Function that returns mu and sigma of the lognormal distribution with the given (positive) mean and variance,
+       sigma 0 for a deterministic time."""
+
+    if variance <= 0:
+        return math.log(mean), 0.0
+    sigma2 = math.log(1 + variance/mean**2)
+    return math.log(mean) - sigma2/2, math.sqrt(sigma2)
+
+
+def lognormal_cdf(x, mu, sigma):
+    """Function that returns the lognormal distribution function of an array, a step at exp(mu) when sigma is 0."""
+
+    x = np.asarray(x, dtype = float)
+    if sigma <= 0:
+        return np.where(x >= math.exp(mu), 1.0, 0.0)
+    with np.errstate(divide = "ignore"):
+        return normal_cdf((np.log(np.maximum(x, 0)) - mu)/sigma)
+
+
+def estimate(scenario = None):
+    """Function that returns the analytic steady-state estimate of a scenario as a dict: the KPIs under the names of
+       Olympic_Report.summarize (On_Time_Fill_Rate, Mean_Fill_Time, Service_Level_Fill_Time, Gross_Profit), the mean
+       order wait and lot processing time, Stable (False when a station gets more work than it can do, in which case
+       fill times are infinite, no order is on time and revenue is taken as zero), and per-station and per-step tables
+       as dicts of rows (see frames)."""
+
+    from Olympic_Model import Scenario
+
+    g = Scenario() if scenario is None else scenario
+    interarrival, interarrival_second = truncated_moments(g.d_intarrival, g.d_int_std)
+    order_rate = 1/interarrival
+    names, batch_servers, rates, mean_service, service_scv, arrival_scv = network(g, order_rate, max(0.0, interarrival_second/interarrival**2 - 1))
+
+    stations, waits = {}, {}
+    for i, name in enumerate(names):
+        if rates[i] > 0:
+            wait, p_wait = multi_server_wait(rates[i], mean_service[i], batch_servers[i], arrival_scv[i], service_scv[i])
+        else:
+            wait, p_wait = 0.0, 0.0
+        waits[name] = wait, p_wait
+        stations[name] = {"Servers": round(batch_servers[i]*g.lots_per_order), "Arrival_Rate": rates[i]*g.lots_per_order,
+                          "Utilization": 100*rates[i]*mean_service[i]/batch_servers[i], "Arrival_SCV": arrival_scv[i],
+                          "Service_SCV": service_scv[i], "Wait_Probability": p_wait, "Mean_Wait": wait,
+                          "Mean_Queue": rates[i]*wait*g.lots_per_order}
+    stable = all(math.isfinite(wait) for wait, _ in waits.values())
+
+    step_station, _ = step_stations(g)
+    services = step_services(g)
+    visits, _ = step_flows(g)
+    steps = {}
+    wait_mean = wait_variance = process_mean = process_variance = 0.0
+    for stage, p_fail in enumerate([g.p_fail_test1, g.p_fail_test2, g.p_fail_test3]):
+        for step in STEPS[2*stage:2*stage + 2]:
+            wait, p_wait = waits[step_station[step]]
+            steps[step] = {"Station": step_station[step], "Visits": visits[step], "Mean_Wait": wait,
+                           "Mean_Service": services[step][0], "Mean_Time": visits[step]*(wait + services[step][0])}
+            if stable:
+                #Each wait is 0 or exponential, given the probability of waiting
+                wait_mean += visits[step]*wait
+                wait_variance += visits[step]*(2*wait*wait/p_wait - wait*wait if p_wait > 0 else 0.0)
+        #Processing time of one lot in the stage: the attempts of the reworked steps are geometric with mean 1/(1 - p)
+        #and variance p/(1 - p)^2
+        machine, test = services[STEPS[2*stage]], services[STEPS[2*stage + 1]]
+        attempts, attempts_variance = 1/(1 - p_fail), p_fail/(1 - p_fail)**2
+        once = machine if g.rework_policy == "retest" else (0.0, 0.0)
+        repeated = test if g.rework_policy == "retest" else (machine[0] + test[0], machine[1] + test[1] + 2*machine[0]*test[0])
+        process_mean += once[0] + attempts*repeated[0]
+        process_variance += (once[1] - once[0]**2) + attempts*(repeated[1] - repeated[0]**2) + attempts_variance*repeated[0]**2
+
+    orders = g.sim_duration*order_rate
+    cogs = orders*g.lots_per_order*g.units_per_lot*g.cogs
+    testers = [g.testers] if g.pooled_testers else [g.testers1, g.testers2, g.testers3]
+    calendar = None if g.tester_shifts is None else ShiftCalendar(g.tester_shifts).rounded(testers)
+    wages = WageSchedule(g.testers*g.tester_hr_wage, calendar).accrued(0, g.sim_duration)
+    result = {"Stable": stable, "Mean_Order_Wait": wait_mean if stable else float("inf"), "Mean_Lot_Processing": process_mean,
+              "stations": stations, "steps": steps}
+    if not stable:
+        return {**result, "On_Time_Fill_Rate": 0.0, "Mean_Fill_Time": float("inf"), "Service_Level_Fill_Time": float("inf"),
+                "Gross_Profit": -cogs - wages}
+
+    #Order fill time: the order's waits, plus the processing of the slowest of its lots, plus the ship time
+    delays = g.mean_ship + g.std_ship*SHIP_NODES[None, :] + np.zeros((len(WAIT_POINTS), 1))
+    if wait_mean > 0:
+        mu, sigma = lognormal_parameters(wait_mean, wait_variance)
+        delays = delays + np.exp(mu + sigma*WAIT_POINTS)[:, None]
+    weights = np.broadcast_to(SHIP_WEIGHTS/len(WAIT_POINTS), delays.shape).ravel()
+    upper = delays.max() + process_mean + 10*math.sqrt(max(process_variance, 0))
+    times = np.linspace(0, upper, GRID_POINTS)
+    processing = lognormal_cdf(times[:, None] - delays.ravel()[None, :], *lognormal_parameters(process_mean, process_variance))
+    cdf = processing**g.lots_per_order @ weights
+    mean_fill = float(np.sum(1 - cdf)*(times[1] - times[0]))
+    quantile = float(np.interp(g.order_service_level, cdf, times))
+    on_time = float(np.interp(g.quoted_lead, times, cdf))
+    revenue_per_order = float(order_revenue((times[1:] + times[:-1])/2, g) @ np.diff(cdf))
+    #Orders still in production at the end of the run bring no revenue yet (Little's law)
+    filled = max(0.0, g.sim_duration - mean_fill)*order_rate
+    return {**result, "On_Time_Fill_Rate": 100*on_time, "Mean_Fill_Time": mean_fill, "Service_Level_Fill_Time": quantile,
+            "Gross_Profit": filled*revenue_per_order - cogs - wages}
+
+
+def frames(result):
+    """Function that returns the station and step tables of an estimate as dataframes."""
+
+    import pandas as pd
+
+    return (pd.DataFrame.from_dict(result["stations"], orient = "index").rename_axis("Station"),
+            pd.DataFrame.from_dict(result["steps"], orient = "index").rename_axis("Step"))
+
+
+def screen(design, base = None, keep = 10, min_fill_rate = None):
+    """Function that ranks the cells of a design (parameter overrides of the base scenario) by their estimated gross profit,
+       leaving out cells with an estimated on-time fill rate below min_fill_rate, and returns the indices of the best keep
+       cells, best first."""
+
+    from Olympic_Model import Scenario
+
+    base = Scenario() if base is None else base
+    profits = []
+    for i, cell in enumerate(design):
+        result = estimate(base.replace(**cell))
+        if min_fill_rate is None or result["On_Time_Fill_Rate"] >= min_fill_rate:
+            profits.append((result["Gross_Profit"], i))
+    return [i for _, i in sorted(profits, key = lambda item: (-item[0], item[1]))[:keep]]
+
+
+if __name__ == "__main__":
+    import argparse
+    from Olympic_Model import SCENARIOS
+
+    parser = argparse.ArgumentParser(description = "Analytic queueing estimate of an Olympic scenario")
+    parser.add_argument("--scenario", default = "base", choices = SCENARIOS)
+    args = parser.parse_args()
+    result = estimate(SCENARIOS[args.scenario])
+    stations, steps = frames(result)
+    print(f"{args.scenario} scenario, analytic steady-state estimate{'' if result['Stable'] else ' (NOT STABLE)'}")
+    for kpi in ["On_Time_Fill_Rate", "Mean_Fill_Time", "Service_Level_Fill_Time", "Gross_Profit", "Mean_Order_Wait", "Mean_Lot_Processing"]:
+        print(f"    {kpi:<26}{result[kpi]:>14,.2f}")
+    print(stations.to_string(float_format = lambda x: f"{x:,.3f}"))
+    print(steps.to_string(float_format = lambda x: f"{x:,.3f}"))
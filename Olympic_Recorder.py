@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Columnar in-memory event recorder for the Olympic production models.
+
+Every table (cash, queue, lots, orders) is a set of preallocated NumPy column
+buffers that grow by doubling, so logging an event is a handful of array writes
+instead of building and appending a one-row DataFrame. The tables are turned into
+DataFrames once, when the run is complete.
+"""
+
+import numpy as np
+
+
+class Table:
+    """Class that holds one recorder table as a set of typed, growable column buffers.
+       Columns are given as a list of (name, dtype) pairs in the order rows are appended."""
+
+    def __init__(self, columns, index = None, capacity = 1024):
+        self.names = [name for name, dtype in columns]
+        self.dtypes = [np.dtype(dtype) for name, dtype in columns]
+        self.index = index
+        self.size = 0
+        self.data = [np.empty(capacity, dtype = dtype) for dtype in self.dtypes]
+
+    def __len__(self):
+        return self.size
+
+    def grow(self):
+        """Function that doubles the capacity of every column buffer in the table."""
+
+        for i, column in enumerate(self.data):
+            grown = np.empty(2*len(column), dtype = column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.data[i] = grown
+
+    def append(self, *row):
+        """Function that writes one row to the end of the table. Values must be given in column order."""
+
+        if self.size == len(self.data[0]):
+            self.grow()
+        i = self.size
+        for column, value in zip(self.data, row):
+            column[i] = value
+        self.size = i + 1
+
+    def extend(self, *columns):
+        """Function that writes many rows at once, given in column order.
+           Each value is an array with one entry per row, or a scalar shared by every row."""
+
+        rows = next(len(values) for values in columns if np.ndim(values) > 0)
+        while self.size + rows > len(self.data[0]):
+            self.grow()
+        for column, values in zip(self.data, columns):
+            column[self.size:self.size + rows] = values
+        self.size += rows
+
+    def column(self, name):
+        """Function that returns a read-only view of the filled part of one column."""
+
+        view = self.data[self.names.index(name)][:self.size]
+        view.flags.writeable = False
+        return view
+
+    def to_frame(self):
+        """Function that materializes the table into a pandas DataFrame."""
+
+        import pandas as pd
+
+        df = pd.DataFrame({name: column[:self.size].copy() for name, column in zip(self.names, self.data)})
+        if self.index is not None:
+            df.set_index(self.index, inplace=True)
+        return df
+
+
+class LotStore(Table):
+    """Class that stores the lots of a run as a struct of arrays, one growable NumPy column per lot attribute
+       (see Lot for the handle the model works with). Every lot gets a slot, the row it is stored in.
+       Without reuse the slot of a lot is its unique_id - 1, so the store is indexed by unique_id and keeps every lot
+       of the run; only finished lots are part of the lots table. With reuse, as in streaming runs, the slot of a
+       finished or scrapped lot is freed and given to the next new lot, so the store only grows with the work in process.
+       With trace = True the store also keeps a trace table with one row per machine or tester visit of a lot:
+       the stage (0 etch, 1 assembly, 2 finishing), the step (0 machine, 1 tester) and the times the server was
+       requested, granted and released. A lot that is reworked has a row for every pass."""
+
+    COLUMNS = [("Unique_ID", np.int64), ("Order_ID", np.int64), ("Lot_ID", np.int64),
+               ("Start_Time", float), ("End_Time", float), ("Etch_End", float), ("Assembly_End", float),
+               ("Reworks", np.int32), ("Finished", bool)]
+    STAGE_ENDS = ["Etch_End", "Assembly_End", "End_Time"]   #Time each stage's test is passed
+    TRACE_COLUMNS = [("Unique_ID", np.int64), ("Stage", np.int8), ("Step", np.int8),
+                     ("Requested", float), ("Granted", float), ("Released", float)]
+
+    def __init__(self, reuse = False, capacity = 1024, trace = False):
+        super().__init__(self.COLUMNS, "Unique_ID", capacity)
+        self.reuse = reuse
+        self.free_slots = []
+        self.trace = Table(self.TRACE_COLUMNS, capacity = 8*capacity) if trace else None
+
+    def add(self, unique_id, order_id, lot_id):
+        """Function that stores a new lot that has not started yet and returns its slot."""
+
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            for column, value in zip(self.data, (unique_id, order_id, lot_id, 0, 0, np.nan, np.nan, 0, False)):
+                column[slot] = value
+            return slot
+        self.append(unique_id, order_id, lot_id, 0, 0, np.nan, np.nan, 0, False)
+        return self.size - 1
+
+    def finish(self, slot):
+        """Function that marks the lot in a slot as finished, or frees the slot if the store reuses them."""
+
+        if self.reuse:
+            self.free_slots.append(slot)
+        else:
+            self.data[-1][slot] = True
+
+    def scrap(self, slot):
+        """Function that frees the slot of a scrapped lot if the store reuses them. Without reuse it stays unfinished."""
+
+        if self.reuse:
+            self.free_slots.append(slot)
+
+    def to_frame(self):
+        """Function that materializes the finished lots into a pandas DataFrame indexed by Unique_ID."""
+
+        import pandas as pd
+
+        finished = self.data[-1][:self.size]
+        df = pd.DataFrame({name: column[:self.size][finished] for name, column in zip(self.names[:-1], self.data)})
+        return df.set_index(self.index)
+
+
+def _lot_column(name):
+    """Function that returns a property reading and writing one LotStore column at the slot of a Lot."""
+
+    i = [column for column, dtype in LotStore.COLUMNS].index(name)
+    def get(lot):
+        return lot.store.data[i][lot.slot]
+    def set(lot, value):
+        lot.store.data[i][lot.slot] = value
+    return property(get, set)
+
+
+_STAGE_END_POSITIONS = [[column for column, dtype in LotStore.COLUMNS].index(name) for name in LotStore.STAGE_ENDS]
+
+
+class Lot:
+    """Class that is a handle to one lot in a LotStore. It only holds the store and the lot's slot, every attribute
+       is read from and written to the store's columns."""
+
+    __slots__ = ("store", "slot")
+
+    def __init__(self, store, unique_id, order_id, lot_id):
+        self.store = store
+        self.slot = store.add(unique_id, order_id, lot_id)
+
+    unique_id = _lot_column("Unique_ID")
+    order_id = _lot_column("Order_ID")
+    id = _lot_column("Lot_ID")
+    start_time = _lot_column("Start_Time")
+    end_time = _lot_column("End_Time")
+    failures = _lot_column("Reworks")       #Failed tests of this lot across all stages
+
+    def passed(self, stage, time):
+        """Function that records the time the lot passed the test of a stage (0 etch, 1 assembly, 2 finishing)."""
+
+        self.store.data[_STAGE_END_POSITIONS[stage]][self.slot] = time
+
+    def visited(self, stage, step, requested, granted, released):
+        """Function that records one visit of the lot to a machine (step 0) or tester (step 1) in the store's trace table."""
+
+        self.store.trace.append(self.store.data[0][self.slot], stage, step, requested, granted, released)
+
+
+class Recorder:
+    """Class that groups the tables written by one model run"""
+
+    def __init__(self):
+        self.tables = {}
+
+    def table(self, name, columns, index = None, capacity = 1024):
+        """Function that creates a new named table and returns it so the model can write into it directly."""
+
+        self.tables[name] = Table(columns, index, capacity)
+        return self.tables[name]
+
+    def add(self, name, table):
+        """Function that adds a table that was built elsewhere, like a LotStore, under the given name."""
+
+        self.tables[name] = table
+        return table
+
+    def to_frames(self):
+        """Function that materializes every table into a DataFrame, keyed by table name."""
+
+        return {name: table.to_frame() for name, table in self.tables.items()}
+
+
+class OrderRegistry:
+    """Class that keeps a running record of every open order: how many of its lots are still in production,
+       the earliest lot start and the latest lot end. Every update is constant time, and an order
+       leaves the registry as soon as its last lot finishes."""
+
+    def __init__(self):
+        self.open_orders = {}
+
+    def __len__(self):
+        return len(self.open_orders)
+
+    def open(self, order_id, lots):
+        """Function that registers a new order that has been split into the given number of lots."""
+
+        self.open_orders[order_id] = [lots, float("inf"), float("-inf")]
+
+    def lot_finished(self, order_id, start_time, end_time):
+        """Function that records one finished lot of an order.
+           Returns the (start_time, end_time) of the whole order if this was its last lot, otherwise None."""
+
+        order = self.open_orders[order_id]
+        order[0] -= 1
+        if start_time < order[1]:
+            order[1] = start_time
+        if end_time > order[2]:
+            order[2] = end_time
+        if order[0] == 0:
+            del self.open_orders[order_id]
+            return order[1], order[2]
+        return None
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multi-replication runner for the Olympic production models.
+
+Runs N independent replications of Olympic_Model across a process pool and aggregates the
+summary KPIs with confidence intervals. Every replication gets its own random stream spawned
+from one root seed (numpy SeedSequence), so a replication's result only depends on the root
+seed and its replication number, not on how the work was spread over the workers.
+
+Every purpose draws from its own stream of the replication seed (see Olympic_Streams), so replication
+i of two scenarios uses common random numbers. Replications can also be run in antithetic pairs.
+compare_scenarios runs two scenarios on the same seeds and reports confidence intervals on their
+paired KPI differences. run_until_precision keeps running replications of one or more scenarios
+until their KPIs reach a relative precision instead of a fixed number of replications.
+
+Example, 1000 replications of the 60 day base scenario on every core:
+    python Olympic_Replications.py --replications 1000 --scenario base
+
+Example, pooled testers against the base scenario with common random numbers:
+    python Olympic_Replications.py --replications 50 --scenario base --compare pooled_testers
+
+Example, replications of three scenarios until their KPIs are within 2%, at most 500 each:
+    python Olympic_Replications.py --precision 0.02 --replications 500 --scenario base lot_size pooled_testers
+"""
+
+import argparse
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from Olympic_Cache import CACHE_DIR, ResultCache
+from Olympic_Model import ENGINES, Scenario, SCENARIOS, make_model
+from Olympic_Report import summarize
+from Olympic_Results import SINKS
+from Olympic_Stats import mean_ci
+
+KPIS = ["On_Time_Fill_Rate", "Mean_Fill_Time", "Service_Level_Fill_Time", "Gross_Profit"]
+PRECISION_KPIS = ["On_Time_Fill_Rate", "Gross_Profit", "Service_Level_Fill_Time"]   #KPIs sequential stopping waits for by default
+
+
+def replication_seeds(seed, replications):
+    """Function that spawns one independent 128 bit seed per replication from the root seed."""
+
+    children = np.random.SeedSequence(seed).spawn(replications)
+    return [int.from_bytes(child.generate_state(4).tobytes(), "little") for child in children]
+
+
+def run_replication(job):
+    """Function that runs one replication in a worker process. The job is a (scenario, replication, seed, sink, options) tuple,
+       where options are extra make_model keyword arguments (engine, streaming, warmup, antithetic) and optionally
+       the ResultCache the KPIs are looked up in and stored to as "cache". The results are written by the sink if there
+       is one (which always runs the model) and only the KPIs are sent back."""
+
+    scenario, replication, seed, sink, options = job
+    cache = options.get("cache")
+    options = {name: value for name, value in options.items() if name != "cache"}
+    key = cache.key(scenario, seed, "kpis", **options) if cache is not None and sink is None else None
+    kpis = cache.get(key) if key is not None else None
+    if kpis is None:
+        results = make_model(replication, scenario, seed = seed, **options).run(sink)
+        kpis = {kpi: value for kpi, value in summarize(results).items() if kpi in KPIS}
+        if key is not None:
+            cache.put(key, kpis)
+    return {**kpis, "Replication": replication}
+
+
+def summarize_replications(results, confidence = 0.95):
+    """Function that aggregates per-replication KPIs into a table of means and confidence intervals, one row per KPI."""
+
+    rows = []
+    for kpi in KPIS:
+        values = results[kpi].dropna().to_numpy()
+        mean, half_width = mean_ci(values, confidence)
+        rows.append({"KPI": kpi, "Mean": mean, "Std": values.std(ddof = 1) if len(values) > 1 else float("nan"),
+                     "CI_Low": mean - half_width, "CI_High": mean + half_width,
+                     "Half_Width": half_width, "Replications": len(values)})
+    return pd.DataFrame(rows).set_index("KPI")
+
+
+def observations(results):
+    """Function that returns the independent observations in a per-replication KPI table:
+       the replications themselves, or the mean of every antithetic pair when the table has a Pair column."""
+
+    return results.groupby("Pair")[KPIS].mean() if "Pair" in results else results
+
+
+def replication_options(engine = "simpy", streaming = False, warmup = 0, cache = None):
+    """Function that returns the options replication jobs run with (see run_replication): the simulation engine,
+       streaming with the warm-up hours left out of the KPIs, and the results cache."""
+
+    return {"engine": engine, **({"streaming": True, "warmup": warmup} if streaming else {}), **({"cache": cache} if cache else {})}
+
+
+def add_run_arguments(parser):
+    """Function that adds the --streaming, --warmup, --engine and --cache options of the replication, sweep,
+       selection and optimizer commands to their parser."""
+
+    parser.add_argument("--streaming", action = "store_true", help = "accumulate the KPIs online instead of keeping every table")
+    parser.add_argument("--warmup", type = float, default = 0, help = "hours left out of the KPIs of streaming replications")
+    parser.add_argument("--engine", default = "simpy", choices = ENGINES, help = "simulation engine (kernel: about 3x faster, same results)")
+    parser.add_argument("--cache", nargs = "?", const = CACHE_DIR, default = None, metavar = "DIR",
+                        help = f"reuse the KPIs of replications run before from the results cache (default DIR: {CACHE_DIR})")
+
+
+def run_options(parser, args):
+    """Function that returns the replication options of the command line options added by add_run_arguments."""
+
+    if args.warmup and not args.streaming:
+        parser.error("--warmup only applies to --streaming replications")
+    return replication_options(args.engine, args.streaming, args.warmup, ResultCache(args.cache) if args.cache else None)
+
+
+def run_replications(replications, scenario = None, seed = 60, processes = None, confidence = 0.95, sink = None,
+                     streaming = False, warmup = 0, antithetic = False, engine = "simpy", cache = None):
+    """Function that runs independent replications of one scenario across a process pool.
+       Every replication is stored by the results sink if one is given (see Olympic_Results).
+       With streaming the replications accumulate their KPIs online, leaving out the first warmup hours.
+       With antithetic every seed is also run as its antithetic twin and the pair mean is one observation.
+       engine selects the simulation engine (see Olympic_Model.make_model). Replications found in the cache
+       (an Olympic_Cache.ResultCache) are not run again.
+       Returns the per-replication KPI table and the summary table from summarize_replications."""
+
+    scenario = Scenario() if scenario is None else scenario
+    options = replication_options(engine, streaming, warmup, cache)
+    seeds = replication_seeds(seed, replications)
+    if antithetic:
+        jobs = [(scenario, 2*i + 1 + twin, s, sink, {**options, "antithetic": bool(twin)}) for i, s in enumerate(seeds) for twin in (0, 1)]
+    else:
+        jobs = [(scenario, i + 1, s, sink, options) for i, s in enumerate(seeds)]
+    processes = processes or os.cpu_count()
+    if processes == 1:
+        results = list(map(run_replication, jobs))
+    else:
+        #A few chunks per worker keeps the pool balanced without paying inter-process overhead per replication
+        chunksize = max(1, len(jobs)//(4*processes))
+        with ProcessPoolExecutor(processes) as pool:
+            results = list(pool.map(run_replication, jobs, chunksize = chunksize))
+    results = pd.DataFrame(results).set_index("Replication")
+    if antithetic:
+        results["Pair"] = (results.index + 1)//2
+    return results, summarize_replications(observations(results), confidence)
+
+
+def reached_precision(results, precision, kpis = PRECISION_KPIS, confidence = 0.95):
+    """Function that checks whether the confidence interval of every KPI in a per-replication KPI table is at most
+       precision times the absolute mean wide on each side (relative half-width)."""
+
+    for kpi in kpis:
+        mean, half_width = mean_ci(results[kpi].dropna().to_numpy(), confidence)
+        if not half_width <= precision*abs(mean):
+            return False
+    return True
+
+
+def run_until_precision(scenarios, precision = 0.05, kpis = PRECISION_KPIS, seed = 60, processes = None, confidence = 0.95,
+                        min_replications = 10, max_replications = 1000, **options):
+    """Function that runs replications of every scenario (a dict of scenarios by name) across one process pool until
+       the confidence intervals of the given KPIs reach the relative precision (see reached_precision), with at least
+       min_replications and at most max_replications per scenario. Workers are kept busy with the scenarios that have not
+       converged, fewest replications first, and the outstanding replications of a scenario are cancelled once it has.
+       Convergence is only checked on replications 1..n that have all completed, so the stopping point and the
+       results only depend on the seed, not on which replications happened to finish first.
+       options are extra make_model keyword arguments (engine, streaming, warmup) and the cache (see run_replication).
+       Returns a dict of (per-replication KPI table, summary table, converged) by scenario name."""
+
+    seeds = replication_seeds(seed, max_replications)
+    completed = {name: {} for name in scenarios}     #KPIs of every completed replication by number
+    checked = {name: 0 for name in scenarios}        #Replications 1..n already checked for precision
+    dispatched = {name: 0 for name in scenarios}
+    stopped = {}                                     #Replications used by every scenario that stopped, by name
+
+    def table(name, n):
+        return pd.DataFrame([completed[name][r] for r in range(1, n + 1)]).set_index("Replication")
+
+    def record(name, row):
+        completed[name][row["Replication"]] = row
+        #Every replication count is checked in turn once replications 1..n have all completed
+        while name not in stopped and checked[name] + 1 in completed[name]:
+            checked[name] += 1
+            n = checked[name]
+            if n == max_replications or (n >= min_replications and reached_precision(table(name, n), precision, kpis, confidence)):
+                stopped[name] = n
+
+    def next_job():
+        running = [name for name in scenarios if name not in stopped and dispatched[name] < max_replications]
+        if not running:
+            return None
+        name = min(running, key = dispatched.get)
+        dispatched[name] += 1
+        return name, (scenarios[name], dispatched[name], seeds[dispatched[name] - 1], None, options)
+
+    processes = processes or os.cpu_count()
+    if processes == 1:
+        job = next_job()
+        while job is not None:
+            record(job[0], run_replication(job[1]))
+            job = next_job()
+    else:
+        pool = ProcessPoolExecutor(processes)
+        pending = {}
+        try:
+            while True:
+                #Two jobs per worker keeps the pool busy while results are being checked
+                while len(pending) < 2*processes and (job := next_job()) is not None:
+                    pending[pool.submit(run_replication, job[1])] = job[0]
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when = FIRST_COMPLETED)
+                for future in finished:
+                    record(pending.pop(future), future.result())
+                for future, name in list(pending.items()):
+                    if name in stopped:
+                        future.cancel()
+                        del pending[future]
+        finally:
+            pool.shutdown(cancel_futures = True)
+
+    runs = {}
+    for name in scenarios:
+        results = table(name, stopped[name])
+        summary = summarize_replications(results, confidence)
+        summary["Relative_Half_Width"] = summary["Half_Width"]/summary["Mean"].abs()
+        runs[name] = results, summary, reached_precision(results, precision, kpis, confidence)
+    return runs
+
+
+def compare_scenarios(scenario_a, scenario_b, replications, seed = 60, processes = None, confidence = 0.95,
+                      common_random_numbers = True, antithetic = False, **options):
+    """Function that runs replications of two scenarios on the same replication seeds and returns both per-replication
+       KPI tables and the summary of the paired differences (scenario_b - scenario_a). With common random numbers the
+       pairs share their demand, durations and test outcomes, which narrows the confidence interval of the difference;
+       without, scenario_b runs on the seeds of the next root seed, which makes the pairs independent."""
+
+    results_a, _ = run_replications(replications, scenario_a, seed, processes, confidence, antithetic = antithetic, **options)
+    results_b, _ = run_replications(replications, scenario_b, seed if common_random_numbers else seed + 1, processes, confidence,
+                                    antithetic = antithetic, **options)
+    differences = results_b[KPIS] - results_a[KPIS]
+    if antithetic:
+        differences["Pair"] = results_a["Pair"]
+    return results_a, results_b, summarize_replications(observations(differences), confidence)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Run independent replications of an Olympic model in parallel")
+    parser.add_argument("--replications", type = int, default = 100, help = "replications (with --precision: the most per scenario)")
+    parser.add_argument("--scenario", default = ["base"], nargs = "+", choices = SCENARIOS, help = "scenario (with --precision: scenarios)")
+    parser.add_argument("--seed", type = int, default = 60)
+    parser.add_argument("--processes", type = int, default = None, help = "worker processes (default: all cores)")
+    parser.add_argument("--confidence", type = float, default = 0.95)
+    parser.add_argument("--output", choices = SINKS, help = "store every replication under --output-dir in this format")
+    parser.add_argument("--output-dir", default = "results")
+    parser.add_argument("--antithetic", action = "store_true", help = "also run the antithetic twin of every replication")
+    parser.add_argument("--compare", choices = SCENARIOS, help = "report the paired differences of this scenario against --scenario")
+    parser.add_argument("--independent", action = "store_true", help = "compare on independent seeds instead of common random numbers")
+    parser.add_argument("--precision", type = float, help = "run until the confidence intervals of the fill rate, gross profit "
+                                                              "and service level fill time are within this share of their means")
+    parser.add_argument("--min-replications", type = int, default = 10, help = "replications before --precision is checked")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+    if args.streaming and args.output:
+        parser.error("--output needs the full tables, which --streaming does not keep")
+    options = run_options(parser, args)
+    if args.compare and args.output:
+        parser.error("--compare does not store replications, run each scenario with --output instead")
+    if args.precision is None and len(args.scenario) > 1:
+        parser.error("several scenarios can only be run with --precision")
+    if args.precision is not None and (args.compare or args.output or args.antithetic):
+        parser.error("--precision cannot be combined with --compare, --output or --antithetic")
+
+    runs = f"{args.replications} {'antithetic pairs' if args.antithetic else 'replications'}"
+    if args.precision is not None:
+        converged_runs = run_until_precision({name: SCENARIOS[name] for name in args.scenario}, args.precision, seed = args.seed,
+                                             processes = args.processes, confidence = args.confidence,
+                                             min_replications = args.min_replications, max_replications = args.replications, **options)
+        for name, (results, summary, converged) in converged_runs.items():
+            print(f"{len(results)} replications of the {name} scenario, {100*args.confidence:.0f}% confidence intervals "
+                  f"({'reached' if converged else 'did not reach'} {100*args.precision:g}% relative precision)")
+            print(summary.to_string(float_format = lambda x: f"{x:,.2f}"))
+    elif args.compare:
+        _, _, summary = compare_scenarios(SCENARIOS[args.scenario[0]], SCENARIOS[args.compare], args.replications, args.seed,
+                                          args.processes, args.confidence, not args.independent, args.antithetic, **options)
+        print(f"{args.compare} - {args.scenario[0]}, {runs}{' on independent seeds' if args.independent else ' with common random numbers'}, "
+              f"{100*args.confidence:.0f}% confidence intervals of the paired differences")
+        print(summary.to_string(float_format = lambda x: f"{x:,.2f}"))
+    else:
+        sink = SINKS[args.output](args.output_dir) if args.output else None
+        results, summary = run_replications(args.replications, SCENARIOS[args.scenario[0]], args.seed, args.processes, args.confidence, sink,
+                                            args.streaming, args.warmup, args.antithetic, args.engine, options.get("cache"))
+        print(f"{runs} of the {args.scenario[0]} scenario, {100*args.confidence:.0f}% confidence intervals")
+        print(summary.to_string(float_format = lambda x: f"{x:,.2f}"))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+End of run summary for the Olympic production model: KPI calculation and the printed report.
+Works on the DataFrames a completed Olympic_Model run holds in memory, or on the online
+accumulators of a streaming run, which keeps no per-lot, per-order or cash rows.
+"""
+
+from Olympic_Analytics import order_revenue
+from Olympic_Stats import RunningStats, P2Quantile
+
+
+class StreamingKpis:
+    """Class that accumulates the summary KPIs of a run while it executes, in memory independent of the run length.
+       Order fill times feed a running mean/variance and a P-square estimate of the order_service_level quantile,
+       cash is kept as running totals. Events before the warm-up time (hrs) are left out."""
+
+    def __init__(self, scenario, warmup = 0):
+        self.scenario = scenario
+        self.warmup = warmup
+        self.fill_time = RunningStats()
+        self.fill_time_quantile = P2Quantile(scenario.order_service_level)
+        self.on_time_orders = 0
+        self.late_orders = 0
+        self.revenue = 0.0
+        self.cogs = 0.0
+        self.wage_expense = 0.0
+        self.orders_before_warmup = 0   #Order and failed test counters at the end of the warm-up period
+        self.failed_before_warmup = 0
+
+    def log_cash(self, time, revenue, cogs, wages):
+        """Function that adds a cash event to the running totals."""
+
+        if time >= self.warmup:
+            self.revenue += revenue
+            self.cogs += cogs
+            self.wage_expense += wages
+
+    def order_filled(self, time, process_time):
+        """Function that records an order completed at the given time with its process time (production plus shipping)."""
+
+        if time < self.warmup:
+            return
+        self.fill_time.push(process_time)
+        self.fill_time_quantile.push(process_time)
+        if process_time <= self.scenario.quoted_lead:
+            self.on_time_orders += 1
+        else:
+            self.late_orders += 1
+        self.revenue += float(order_revenue(process_time, self.scenario))
+
+    def end_warmup(self, total_orders, failed_tests):
+        """Function that marks the end of the warm-up period with the model's order and failed test counters at that time."""
+
+        self.orders_before_warmup = total_orders
+        self.failed_before_warmup = failed_tests
+
+    def summary(self, q_df):
+        """Function that returns the summary KPIs under the same names as summarize.
+           Order and failed test counts come from the queue log, which stays at a fixed number of samples."""
+
+        g = self.scenario
+        total_orders = q_df["Total_Orders"].max() - self.orders_before_warmup
+        profit = self.revenue - self.cogs - self.wage_expense
+        return {"Sim_Days": (g.sim_duration - self.warmup)/24,
+                "Total_Orders": total_orders,
+                "On_Time_Orders": self.on_time_orders,
+                "Late_Orders": self.late_orders,
+                "On_Time_Fill_Rate": 100*self.on_time_orders/total_orders if total_orders else float("nan"),
+                "Failed_Tests": q_df["Failed_Tests"].iat[-1] - self.failed_before_warmup,
+                "Mean_Fill_Time": self.fill_time.mean,
+                "Service_Level_Fill_Time": self.fill_time_quantile.value(),
+                "Revenue": self.revenue,
+                "COGS": self.cogs,
+                "Wage_Expense": self.wage_expense,
+                "Gross_Profit": profit,
+                "Gross_Margin": 100*profit/self.revenue if self.revenue else float("nan")}
+
+
+def summarize(model):
+    """Function that computes the summary KPIs of a completed run.
+       Service_Level_Fill_Time is the order_service_level quantile of order fill time (95th percentile by default).
+       Streaming runs report from their accumulators (see StreamingKpis)."""
+
+    if getattr(model, "kpis", None) is not None:
+        return model.kpis.summary(model.q_df)
+    g = model.scenario
+    q_plot, profit_plot, order_plot = model.q_df, model.cash_df, model.orders_df
+
+    total_orders = q_plot["Total_Orders"].max()
+    total_filled_orders = (order_plot.Revenue_Generated == g.order_revenue).sum()
+    revenue_generated = profit_plot["Cumulative_Revenue"].iat[-1]
+    profit_generated = profit_plot["Cumulative_Profits"].iat[-1]
+    return {"Sim_Days": g.sim_duration/24,
+            "Total_Orders": total_orders,
+            "On_Time_Orders": total_filled_orders,
+            "Late_Orders": (order_plot.Revenue_Generated != g.order_revenue).sum(),
+            "On_Time_Fill_Rate": 100*total_filled_orders/total_orders,
+            "Failed_Tests": q_plot["Failed_Tests"].iat[-1],
+            "Mean_Fill_Time": order_plot["Order_Process_Time"].mean(),
+            "Service_Level_Fill_Time": order_plot["Order_Process_Time"].quantile(g.order_service_level),
+            "Revenue": revenue_generated,
+            "COGS": profit_plot["Cumulative_COGS"].iat[-1],
+            "Wage_Expense": profit_plot["Cumulative_Wage_Expense"].iat[-1],
+            "Gross_Profit": profit_generated,
+            "Gross_Margin": 100*profit_generated/revenue_generated}
+
+
+def print_report(model):
+    """Function that prints the end of run summary of a completed run."""
+
+    kpis = summarize(model)
+    print()
+    print("----------------------------------------------------------------")
+    print(f"                  After {kpis['Sim_Days']:.1f} simulated days")
+    print("----------------------------------------------------------------")
+    print(f"       Total Possible Orders:        {kpis['Total_Orders']}")
+    print(f"       Total On-Time Orders:         {kpis['On_Time_Orders']}")
+    print(f"       Total Late Orders:            {kpis['Late_Orders']}")
+    print(f"       On-Time Fill Rate:            {kpis['On_Time_Fill_Rate']:.2f}%")
+    print(f"       Failed Test Count:            {kpis['Failed_Tests']}")
+    print(f"       Average Order Fill Time:      {kpis['Mean_Fill_Time']:.2f} hours")
+    print(f"       {100*model.scenario.order_service_level:.0f}th percentile Fill Time:    {kpis['Service_Level_Fill_Time']:.2f} hours ")
+    print("----------------------------------------------------------------")
+    print(f"             Revenue:               ${kpis['Revenue']:,.2f}")
+    print(f"             COGS:                  -${kpis['COGS']:,.2f}")
+    print(f"             Wage Expenses:         -${kpis['Wage_Expense']:,.2f}")
+    print("                                    ---------------")
+    print(f"             Gross Profit:          ${kpis['Gross_Profit']:,.2f}")
+    print(f"             Gross Margin:          {kpis['Gross_Margin']:.2f}%")
+    print("----------------------------------------------------------------")
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Results of Olympic production model runs: the in-memory RunResults handed to the reporting layer,
+and pluggable sinks that store them on disk.
+
+Binary sinks (NPZ, Parquet, Feather) write typed columns, one set of files per run keyed by the
+scenario hash and replication id, with the scenario parameters embedded as metadata so a file can
+be reloaded into RunResults on its own. Every table of the run is written (cash, queue, lots and
+orders, the exact station statistics and step log, and the trace of a traced run), and the
+metadata lists them so the readers load exactly those. CSV remains available as an opt-in export, either keyed
+like the binary sinks or under the four legacy file names in one directory.
+
+Parquet and Feather need pyarrow, which is only imported when one of those sinks is used.
+"""
+
+import json
+import os
+
+import numpy as np
+
+TABLES = ["cash", "queue", "lots", "orders"]     #Tables of every full run, and of files written before the table list was stored
+INDEX = {"lots": "Unique_ID", "stations": "Station"}     #Tables that are indexed by one of their columns
+LEGACY_CSV = {"cash": "cash_data.csv", "queue": "queue_data.csv", "lots": "lot_data.csv", "orders": "orders_data.csv"}
+
+
+class RunResults:
+    """Class that holds the result tables of one run in memory together with the scenario and run metadata.
+       Exposes the same cash_df, q_df, lots_df and orders_df attributes as a completed Olympic_Model,
+       so the reporting and plotting functions accept either.
+       Streaming runs only hold the queue and station tables and carry their KPI accumulators as kpis."""
+
+    def __init__(self, scenario, tables, replication = 1, seed = None, kpis = None):
+        self.scenario = scenario
+        self.tables = tables
+        self.replication = replication
+        self.seed = seed
+        self.kpis = kpis
+
+    @property
+    def cash_df(self):
+        return self.tables["cash"]
+
+    @property
+    def q_df(self):
+        return self.tables["queue"]
+
+    @property
+    def lots_df(self):
+        return self.tables["lots"]
+
+    @property
+    def orders_df(self):
+        return self.tables["orders"]
+
+    @property
+    def stations_df(self):
+        """Exact time-weighted queue length and utilization statistics of every station"""
+        return self.tables.get("stations")
+
+    @property
+    def steps_df(self):
+        """Full queue length and busy server step log of every station, None for streaming runs"""
+        return self.tables.get("steps")
+
+    @property
+    def trace_df(self):
+        """Machine and tester visits of a traced run, None if the run was not traced"""
+        return self.tables.get("trace")
+
+    @property
+    def key(self):
+        """Scenario hash and replication id that name this run's files"""
+        return f"{self.scenario.digest()}/r{self.replication:05d}"
+
+    def metadata(self):
+        """Function that returns the metadata embedded in every file written for this run."""
+
+        return {"scenario": self.scenario.as_dict(), "scenario_hash": self.scenario.digest(),
+                "replication": self.replication, "seed": self.seed, "tables": list(self.tables)}
+
+    @classmethod
+    def from_metadata(cls, metadata, tables):
+        """Function that rebuilds RunResults from stored tables and their embedded metadata."""
+
+        from Olympic_Model import Scenario
+        return cls(Scenario(**metadata["scenario"]), tables, metadata["replication"], metadata["seed"])
+
+
+class ResultsSink:
+    """Base class of the results sinks. A sink writes every table of a run under directory/<scenario hash>/r<replication>."""
+
+    extension = None
+
+    def __init__(self, directory = "results"):
+        self.directory = directory
+
+    def base_path(self, scenario_hash, replication):
+        return os.path.join(self.directory, scenario_hash, f"r{replication:05d}")
+
+    @staticmethod
+    def frame(results, name):
+        """Function that returns a table of a run with its index as a column if it is indexed by one."""
+
+        return results.tables[name].reset_index() if name in INDEX else results.tables[name]
+
+    @staticmethod
+    def indexed(name, df):
+        """Function that restores the index of a table read back from disk."""
+
+        return df.set_index(INDEX[name]) if name in INDEX else df
+
+    def write(self, results):
+        """Function that writes one run to disk and returns the paths of the files written."""
+        raise NotImplementedError
+
+    def read(self, scenario_hash, replication):
+        """Function that loads one run back into RunResults."""
+        raise NotImplementedError
+
+
+class NpzSink(ResultsSink):
+    """Sink that writes every table of a run into one NumPy .npz archive, with the metadata stored as a JSON string.
+       Needs nothing beyond NumPy."""
+
+    extension = ".npz"
+
+    def write(self, results):
+        path = self.base_path(results.scenario.digest(), results.replication) + self.extension
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+        arrays = {"__metadata__": np.array(json.dumps(results.metadata()))}
+        for name in results.tables:
+            df = self.frame(results, name)
+            for column in df.columns:
+                values = df[column].to_numpy()
+                arrays[f"{name}/{column}"] = values.astype(str) if values.dtype == object else values
+        np.savez(path, **arrays)
+        return [path]
+
+    def read(self, scenario_hash, replication):
+        import pandas as pd
+
+        with np.load(self.base_path(scenario_hash, replication) + self.extension) as archive:
+            metadata = json.loads(str(archive["__metadata__"]))
+            columns = {name: {} for name in metadata.get("tables", TABLES)}
+            for key in archive.files:
+                if key != "__metadata__":
+                    name, column = key.split("/", 1)
+                    values = archive[key]
+                    columns[name][column] = values.astype(object) if values.dtype.kind == "U" else values
+        tables = {name: self.indexed(name, pd.DataFrame(table)) for name, table in columns.items()}
+        return RunResults.from_metadata(metadata, tables)
+
+
+class ArrowSink(ResultsSink):
+    """Base class of the pyarrow sinks: one file per table with the run metadata stored in the schema metadata."""
+
+    def write_table(self, table, path):
+        raise NotImplementedError
+
+    def read_table(self, path):
+        raise NotImplementedError
+
+    def write(self, results):
+        import pyarrow as pa
+
+        base = self.base_path(results.scenario.digest(), results.replication)
+        os.makedirs(os.path.dirname(base), exist_ok = True)
+        metadata = json.dumps(results.metadata()).encode()
+        paths = []
+        for name in results.tables:
+            table = pa.Table.from_pandas(self.frame(results, name), preserve_index = False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"olympic": metadata})
+            path = f"{base}_{name}{self.extension}"
+            self.write_table(table, path)
+            paths.append(path)
+        return paths
+
+    def read(self, scenario_hash, replication):
+        base = self.base_path(scenario_hash, replication)
+        #Every run has a queue table, whose metadata lists the other tables
+        metadata = json.loads(self.read_table(f"{base}_queue{self.extension}").schema.metadata[b"olympic"])
+        tables = {name: self.indexed(name, self.read_table(f"{base}_{name}{self.extension}").to_pandas())
+                  for name in metadata.get("tables", TABLES)}
+        return RunResults.from_metadata(metadata, tables)
+
+
+class ParquetSink(ArrowSink):
+    """Sink that writes one Parquet file per table."""
+
+    extension = ".parquet"
+
+    def write_table(self, table, path):
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)
+
+    def read_table(self, path):
+        import pyarrow.parquet as pq
+        return pq.read_table(path)
+
+
+class FeatherSink(ArrowSink):
+    """Sink that writes one Feather (Arrow IPC) file per table."""
+
+    extension = ".feather"
+
+    def write_table(self, table, path):
+        import pyarrow.feather as feather
+        feather.write_feather(table, path)
+
+    def read_table(self, path):
+        import pyarrow.feather as feather
+        return feather.read_table(path)
+
+
+class CsvSink(ResultsSink):
+    """Sink that exports the tables as .csv files. With legacy_names the four files are written straight into
+       the directory under their original names (cash_data.csv, queue_data.csv, lot_data.csv, orders_data.csv),
+       overwriting the previous run; otherwise every table is written keyed like the binary sinks, with the metadata
+       in a .json file."""
+
+    extension = ".csv"
+
+    def __init__(self, directory = "results", legacy_names = False):
+        super().__init__(directory)
+        self.legacy_names = legacy_names
+
+    def write(self, results):
+        if self.legacy_names:
+            names = TABLES
+            paths = [os.path.join(self.directory, LEGACY_CSV[name]) for name in names]
+        else:
+            names = list(results.tables)
+            base = self.base_path(results.scenario.digest(), results.replication)
+            paths = [f"{base}_{name}{self.extension}" for name in names]
+        os.makedirs(os.path.dirname(paths[0]) or ".", exist_ok = True)
+        for name, path in zip(names, paths):
+            results.tables[name].to_csv(path)
+        if not self.legacy_names:
+            with open(f"{base}_metadata.json", "w") as file:
+                json.dump(results.metadata(), file)
+            paths.append(f"{base}_metadata.json")
+        return paths
+
+    def read(self, scenario_hash, replication):
+        import pandas as pd
+
+        base = self.base_path(scenario_hash, replication)
+        with open(f"{base}_metadata.json") as file:
+            metadata = json.load(file)
+        tables = {name: pd.read_csv(f"{base}_{name}{self.extension}", index_col = INDEX.get(name, 0))
+                  for name in metadata.get("tables", TABLES)}
+        return RunResults.from_metadata(metadata, tables)
+
+
+SINKS = {"npz": NpzSink, "parquet": ParquetSink, "feather": FeatherSink, "csv": CsvSink}
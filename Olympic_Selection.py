@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ranking and selection of the best configuration among many Olympic scenario variants.
+
+Running every configuration for the same number of replications spends most of the budget on
+configurations that are clearly worse than the best. select_best runs the fully sequential KN
+procedure (Kim & Nelson 2001): after n0 replications of every configuration, one more replication
+of every surviving configuration is added at a time and a configuration is eliminated as soon as
+its mean falls far enough behind another survivor's. The elimination bound shrinks with the
+variance of the paired differences, so configurations that are close or noisy are run longer.
+The last survivor is the best configuration with probability at least 1 - alpha whenever the best
+is at least delta better than the second best (the indifference zone).
+
+Replication r of every configuration runs on the same seed, so the configurations are compared on
+common random numbers, which KN allows and which shrinks the variance of their differences.
+Survivors are run a few replications ahead so the process pool stays busy; the screening still
+steps through the replications one at a time, so the result does not depend on the pool size.
+
+Example, the most profitable combination of tester pool size and lot size:
+    python Olympic_Selection.py --param tester_pool=30,40,50,60 --param lots_per_order=5,10 \
+        --base pooled_testers --delta 20000 --engine kernel
+"""
+
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from Olympic_Model import Scenario, SCENARIOS
+from Olympic_Replications import KPIS, add_run_arguments, replication_seeds, run_options, run_replication
+from Olympic_Sweep import grid, parse_param
+
+
+def kn_h2(systems, alpha, n0):
+    """Function that returns the squared KN screening constant h^2 = 2*eta*(n0 - 1) for the given number of systems,
+       error probability alpha and first stage replications n0."""
+
+    eta = ((2*alpha/(systems - 1))**(-2/(n0 - 1)) - 1)/2
+    return 2*eta*(n0 - 1)
+
+
+def select_best(design, base = None, kpi = "Gross_Profit", delta = 10000, alpha = 0.05, n0 = 10, max_replications = 500,
+                seed = 60, processes = None, minimize = False, **options):
+    """Function that selects the configuration with the largest mean KPI (smallest with minimize) among the cells of
+       a design (parameter overrides of the base scenario) with the KN procedure, for indifference zone delta and
+       probability of correct selection 1 - alpha. Every survivor is stopped at max_replications, in which case the
+       survivor with the best mean is returned without the guarantee.
+       options are extra make_model keyword arguments (engine, streaming, warmup) and the results cache
+       (see Olympic_Replications.run_replication).
+       Returns the index of the selected cell and a table with one row per cell: its parameters, replications run,
+       mean KPI, the replication it was eliminated at and whether it was selected."""
+
+    if n0 < 2:
+        raise ValueError(f"KN needs at least 2 first stage replications, got {n0}")
+    base = Scenario() if base is None else base
+    scenarios = [base.replace(**cell) for cell in design]
+    seeds = replication_seeds(seed, max(max_replications, n0))
+    sign = -1 if minimize else 1
+    k = len(scenarios)
+    values = [[] for _ in range(k)]                 #KPI of every replication of every cell, as a value to maximize
+    eliminated = {}                                 #Replication every eliminated cell was screened out at, by cell
+    h2 = kn_h2(k, alpha, n0) if k > 1 else 0.0
+    processes = processes or os.cpu_count()
+    pool = ProcessPoolExecutor(processes) if processes > 1 else None
+
+    def run(jobs):
+        """Function that runs (cell, replication) jobs and appends their KPI values in replication order."""
+
+        work = [(scenarios[cell], r, seeds[r - 1], None, options) for cell, r in jobs]
+        results = pool.map(run_replication, work) if pool is not None else map(run_replication, work)
+        for (cell, r), kpis in zip(jobs, results):
+            values[cell].append(sign*kpis[kpi])
+
+    try:
+        run([(cell, r) for cell in range(k) for r in range(1, n0 + 1)])
+        first = np.array([values[cell][:n0] for cell in range(k)])
+        #Variance of the paired differences over the first stage, for every pair of cells
+        variances = np.array([[np.var(first[i] - first[l], ddof = 1) for l in range(k)] for i in range(k)])
+        r = n0
+        survivors = list(range(k))
+        while len(survivors) > 1:
+            means = {cell: np.mean(values[cell][:r]) for cell in survivors}
+            for i in survivors:
+                for l in survivors:
+                    bound = max(0.0, delta/(2*r)*(h2*variances[i, l]/delta**2 - r))
+                    if l != i and means[i] < means[l] - bound:
+                        eliminated[i] = r
+                        break
+            survivors = [cell for cell in survivors if cell not in eliminated]
+            if len(survivors) <= 1 or r >= max_replications:
+                break
+            r += 1
+            if len(values[survivors[0]]) < r:
+                #Run the survivors ahead by enough replications to fill the pool, screening still goes one at a time
+                ahead = min(max(1, math.ceil(2*processes/len(survivors))), max_replications - r + 1)
+                run([(cell, r + step) for cell in survivors for step in range(ahead)])
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures = True)
+
+    best = max(survivors, key = lambda cell: np.mean(values[cell][:r]))
+    rows = []
+    for cell, params in enumerate(design):
+        used = eliminated.get(cell, r)
+        rows.append({**params, "Replications": used, f"Mean_{kpi}": sign*np.mean(values[cell][:used]),
+                     "Eliminated_At": eliminated.get(cell), "Selected": cell == best})
+    table = pd.DataFrame(rows)
+    table["Eliminated_At"] = table["Eliminated_At"].astype("Int64")
+    return best, table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Select the best Olympic configuration with the KN ranking and selection procedure")
+    parser.add_argument("--param", type = parse_param, action = "append", required = True, help = "name=v1,v2,... levels of the grid")
+    parser.add_argument("--base", default = "base", choices = SCENARIOS, help = "scenario the configurations override")
+    parser.add_argument("--kpi", default = "Gross_Profit", choices = KPIS)
+    parser.add_argument("--minimize", action = "store_true", help = "select the smallest KPI, e.g. Mean_Fill_Time")
+    parser.add_argument("--delta", type = float, default = 10000, help = "indifference zone: smallest KPI difference worth detecting")
+    parser.add_argument("--alpha", type = float, default = 0.05, help = "1 - probability of correct selection")
+    parser.add_argument("--n0", type = int, default = 10, help = "first stage replications of every configuration")
+    parser.add_argument("--max-replications", type = int, default = 500)
+    parser.add_argument("--seed", type = int, default = 60)
+    parser.add_argument("--processes", type = int, default = None, help = "worker processes (default: all cores)")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+
+    design = grid(dict(args.param))
+    options = run_options(parser, args)
+    best, table = select_best(design, SCENARIOS[args.base], args.kpi, args.delta, args.alpha, args.n0, args.max_replications,
+                              args.seed, args.processes, args.minimize, **options)
+    print(f"{len(design)} configurations, {table['Replications'].sum()} replications, "
+          f"P(correct selection) >= {1 - args.alpha:.2f} for {args.kpi} differences of at least {args.delta:g}")
+    print(table.to_string(index = False, float_format = lambda x: f"{x:,.2f}"))
+    print(f"Selected: {design[best]}")
+    if table["Eliminated_At"].isna().sum() > 1:
+        print("Stopped at --max-replications with several configurations left, the selection has no guarantee")
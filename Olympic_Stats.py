@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Output-analysis statistics shared by the Olympic replication, sweep and analysis tools.
+Only the standard library and NumPy are used so the helpers are cheap to import in worker processes.
+"""
+
+import bisect
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+
+def t_quantile(p, df):
+    """Function that returns the p quantile of Student's t distribution with df degrees of freedom.
+       Exact for 1 and 2 degrees of freedom, Cornish-Fisher expansion (Abramowitz & Stegun 26.7.5) above that."""
+
+    if df == 1:
+        return math.tan(math.pi*(p - 0.5))
+    if df == 2:
+        return (2*p - 1)/math.sqrt(2*p*(1 - p))
+    z = NormalDist().inv_cdf(p)
+    g1 = (z**3 + z)/4
+    g2 = (5*z**5 + 16*z**3 + 3*z)/96
+    g3 = (3*z**7 + 19*z**5 + 17*z**3 - 15*z)/384
+    g4 = (79*z**9 + 776*z**7 + 1482*z**5 - 1920*z**3 - 945*z)/92160
+    return z + g1/df + g2/df**2 + g3/df**3 + g4/df**4
+
+
+def mean_ci(values, confidence = 0.95):
+    """Function that returns the sample mean of the values and the half-width of its t confidence interval.
+       The half-width is NaN when there are fewer than two values."""
+
+    values = np.asarray(values, dtype = float)
+    mean = values.mean() if len(values) else float("nan")
+    if len(values) < 2:
+        return mean, float("nan")
+    std_error = values.std(ddof = 1)/math.sqrt(len(values))
+    return mean, t_quantile(0.5 + confidence/2, len(values) - 1)*std_error
+
+
+class RunningStats:
+    """Class that keeps the count, mean and variance of a stream of values in constant memory (Welford's algorithm)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = float("nan")
+        self.m2 = 0.0       #Sum of squared deviations from the running mean
+
+    def push(self, x):
+        """Function that adds one value to the running statistics."""
+
+        self.n += 1
+        if self.n == 1:
+            self.mean = float(x)
+            return
+        delta = x - self.mean
+        self.mean += delta/self.n
+        self.m2 += delta*(x - self.mean)
+
+    @property
+    def variance(self):
+        """Sample variance (ddof = 1), NaN when there are fewer than two values"""
+        return self.m2/(self.n - 1) if self.n > 1 else float("nan")
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class P2Quantile:
+    """Class that estimates the p quantile of a stream of values in constant memory with the P-square algorithm
+       (Jain & Chlamtac 1985): five markers whose heights are adjusted with piecewise-parabolic interpolation.
+       The quantile is exact (linear interpolation, like pandas) for the first five values."""
+
+    def __init__(self, p):
+        if not 0 < p < 1:
+            raise ValueError(f"Quantile probability must be between 0 and 1, got {p}")
+        self.p = p
+        self.n = 0
+        self.heights = []                                       #Marker heights, the first five values until the markers are set
+        self.positions = [1, 2, 3, 4, 5]                        #Actual marker positions
+        self.desired = [1, 1 + 2*p, 1 + 4*p, 3 + 2*p, 5]        #Desired marker positions
+        self.increments = [0, p/2, p, (1 + p)/2, 1]             #Change of the desired positions per value
+
+    def push(self, x):
+        """Function that adds one value to the quantile estimate."""
+
+        self.n += 1
+        q, n = self.heights, self.positions
+        if self.n <= 5:
+            bisect.insort(q, x)
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect.bisect_right(q, x) - 1      #Cell q[k] <= x < q[k + 1]
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d/(n[i + 1] - n[i - 1])*((n[i] - n[i - 1] + d)*(q[i + 1] - q[i])/(n[i + 1] - n[i])
+                                                         + (n[i + 1] - n[i] - d)*(q[i] - q[i - 1])/(n[i] - n[i - 1]))
+                if not q[i - 1] < height < q[i + 1]:
+                    #Parabolic prediction out of order, fall back to linear interpolation towards the neighbour
+                    height = q[i] + d*(q[i + d] - q[i])/(n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def value(self):
+        """Function that returns the current quantile estimate, NaN before any value has been seen."""
+
+        if self.n == 0:
+            return float("nan")
+        if self.n <= 5:
+            return float(np.quantile(self.heights, self.p))
+        return self.heights[2]
+
+
+def mser(values, batch_size = 5):
+    """Function that returns the warm-up truncation point of an output series with the MSER-m rule (White 1997), MSER-5 by default.
+       The series is averaged in batches of batch_size and the number of leading batches d that minimizes the standard error
+       of the remaining batches, sum((z_i - mean)^2)/(k - d)^2, is chosen among the first half of the k batches.
+       Returns the number of leading values to delete, a multiple of batch_size."""
+
+    values = np.asarray(values, dtype = float)
+    k = len(values)//batch_size
+    if k < 2:
+        return 0
+    z = values[:k*batch_size].reshape(k, batch_size).mean(axis = 1)
+    #Sums of the batch means and their squares from every truncation point to the end
+    sums = np.cumsum(z[::-1])[::-1]
+    squares = np.cumsum((z*z)[::-1])[::-1]
+    remaining = np.arange(k, 0, -1)
+    statistic = (squares - sums*sums/remaining)/remaining**2
+    return int(np.argmin(statistic[:k//2 + 1]))*batch_size
+
+
+def batch_means(values, batches = 20, confidence = 0.95, statistic = np.mean):
+    """Function that splits a (warm-up truncated) output series into equal consecutive batches and returns the mean,
+       the half-width of the t confidence interval from the batch means and the lag 1 autocorrelation of the batch means.
+       Values that do not fill a whole batch are left out at the start. An autocorrelation well above zero
+       means the batches are too short to be treated as independent. statistic is applied to every batch along axis 1,
+       e.g. a quantile instead of the mean."""
+
+    values = np.asarray(values, dtype = float)
+    size = len(values)//batches
+    if size == 0:
+        return float("nan"), float("nan"), float("nan")
+    means = statistic(values[len(values) - batches*size:].reshape(batches, size), axis = 1)
+    mean, half_width = mean_ci(means, confidence)
+    return mean, half_width, lag1_autocorrelation(means)
+
+
+def lag1_autocorrelation(values):
+    """Function that returns the lag 1 autocorrelation of a series, NaN for fewer than three values or a constant series."""
+
+    values = np.asarray(values, dtype = float)
+    deviations = values - values.mean()
+    denominator = deviations @ deviations
+    if len(values) < 3 or denominator == 0:
+        return float("nan")
+    return float(deviations[:-1] @ deviations[1:]/denominator)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Steady-state analysis of the Olympic production models from one long replication.
+
+Every run starts with an empty factory, so the first orders are filled faster than they would be
+in a loaded line and short runs underestimate fill time. Instead of averaging many short
+replications that all pay for this start-up transient, steady_state runs one long replication,
+detects the end of the warm-up period with MSER-5 on the order fill times (in order of arrival)
+and estimates the steady-state KPIs with batch means confidence intervals on the rest of the run.
+
+Orders are only kept up to the first order that is unfinished at the end of the run, so the last
+batches are not biased towards orders that happened to be filled quickly. The detected warm-up
+time can be passed as --warmup to streaming replications (see Olympic_Replications).
+
+Example, two simulated years of the base scenario on the fast kernel:
+    python Olympic_SteadyState.py --scenario base --days 730 --engine kernel
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from Olympic_Model import ENGINES, SCENARIOS, Scenario, make_model
+from Olympic_Stats import batch_means, lag1_autocorrelation, mean_ci, mser
+
+
+def completed_orders(orders):
+    """Function that returns the orders in order of arrival up to the first order that did not finish during the run."""
+
+    orders = orders.sort_values("Order_ID")
+    finished = orders["Order_ID"].to_numpy() == np.arange(1, len(orders) + 1)
+    return orders.iloc[:len(orders) if finished.all() else int(np.argmin(finished))]
+
+
+def profit_per_day(cash, start, end, batches, confidence = 0.95):
+    """Function that splits the time from start to end into equal time batches and returns the mean gross profit
+       per day, the half-width of its batch means confidence interval and the lag 1 autocorrelation of the batches."""
+
+    times = cash["Time"].to_numpy()
+    profit = cash["Revenue"].to_numpy() - cash["COGS_Expense"].to_numpy() - cash["Wage_Expense"].to_numpy()
+    kept = (times >= start) & (times < end)
+    per_batch, _ = np.histogram(times[kept], bins = np.linspace(start, end, batches + 1), weights = profit[kept])
+    per_day = 24*per_batch/((end - start)/batches)
+    mean, half_width = mean_ci(per_day, confidence)
+    return mean, half_width, lag1_autocorrelation(per_day)
+
+
+def steady_state(scenario = None, days = 730, seed = 60, batches = 20, confidence = 0.95, engine = "simpy"):
+    """Function that runs one long replication of the scenario over the given number of simulated days and returns
+       (warm-up hours, warm-up orders, KPI table). The warm-up period is detected with MSER-5 on the order fill times and
+       every KPI is estimated from the rest of the run with batch means: one row per KPI with its mean, confidence
+       interval, the number of batches and the lag 1 autocorrelation of the batch values.
+       On_Time_Fill_Rate is the share of completed orders filled on time and Gross_Profit_Per_Day comes from
+       equal time batches after the warm-up."""
+
+    scenario = (Scenario() if scenario is None else scenario).replace(sim_duration = days*24)
+    results = make_model(1, scenario, seed = seed, engine = engine).run()
+    orders = completed_orders(results.orders_df)
+    fill_times = orders["Order_Process_Time"].to_numpy()
+    truncation = mser(fill_times)
+    warmup = float(orders["Start_Time"].iat[truncation]) if truncation < len(orders) else float(scenario.sim_duration)
+    fill_times = fill_times[truncation:]
+
+    estimates = {"Mean_Fill_Time": batch_means(fill_times, batches, confidence),
+                 "On_Time_Fill_Rate": batch_means(100*(fill_times <= scenario.quoted_lead), batches, confidence),
+                 "Service_Level_Fill_Time": batch_means(fill_times, batches, confidence,
+                                                        lambda batch, axis: np.quantile(batch, scenario.order_service_level, axis = axis)),
+                 "Gross_Profit_Per_Day": profit_per_day(results.cash_df, warmup, scenario.sim_duration, batches, confidence)}
+    rows = []
+    for kpi, (mean, half_width, autocorrelation) in estimates.items():
+        rows.append({"KPI": kpi, "Mean": mean, "CI_Low": mean - half_width, "CI_High": mean + half_width,
+                     "Half_Width": half_width, "Batches": batches, "Lag1_Autocorrelation": autocorrelation})
+    return warmup, truncation, pd.DataFrame(rows).set_index("KPI")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Estimate steady-state KPIs of an Olympic model from one long replication")
+    parser.add_argument("--scenario", default = "base", choices = SCENARIOS)
+    parser.add_argument("--days", type = float, default = 730, help = "simulated days of the long replication")
+    parser.add_argument("--seed", type = int, default = 60)
+    parser.add_argument("--batches", type = int, default = 20)
+    parser.add_argument("--confidence", type = float, default = 0.95)
+    parser.add_argument("--engine", default = "simpy", choices = ENGINES, help = "simulation engine (kernel: fast, same results)")
+    args = parser.parse_args()
+
+    warmup, orders, summary = steady_state(SCENARIOS[args.scenario], args.days, args.seed, args.batches, args.confidence, args.engine)
+    print(f"{args.scenario} scenario, one replication of {args.days:g} days, seed {args.seed}")
+    print(f"MSER-5 warm-up: first {orders} orders, {warmup:,.1f} hours ({warmup/24:.1f} days)")
+    print(f"{100*args.confidence:.0f}% batch means confidence intervals of the steady-state KPIs")
+    print(summary.to_string(float_format = lambda x: f"{x:,.2f}"))
+    if (summary["Lag1_Autocorrelation"] > 0.2).any():
+        print("Batch means are autocorrelated: run longer or use fewer batches")
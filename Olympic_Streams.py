@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Random number streams of the Olympic production model.
+
+The original model draws every random quantity from one generator one value at a time, so
+changing anything about the factory (pooling testers, lot sizes) also changes which random
+numbers every later order and test receives. RandomStreams gives each purpose (order
+interarrivals, each stage's process and test times, each stage's test outcomes, shipping times)
+its own NumPy generator spawned from the run seed, so two scenarios run with the same seed see
+the same demand, durations and test outcomes as far as their structure allows (common random
+numbers).
+
+Values are drawn in large NumPy blocks per stream and handed out one at a time; the next block
+is only drawn when a stream runs out. A sampler is bound to its distribution parameters once,
+with the truncation at zero of the original max(0, random.gauss(...)) and the per-lot scaling
+applied to the whole block. Samplers are copied and pickled with their generator state and the
+rest of their block, so a run can be snapshotted part way through (see Olympic_Kernel.Snapshot).
+
+Antithetic runs negate every standard normal and replace every uniform u by 1 - u.
+"""
+
+from functools import partial
+from itertools import chain
+
+import numpy as np
+
+STREAMS = ["interarrival",
+           "etch_process", "etch_test", "etch_failure",
+           "assembly_process", "assembly_test", "assembly_failure",
+           "finishing_process", "finishing_test", "finishing_failure",
+           "ship"]
+
+BLOCK_SIZE = 4096       #Values drawn per refill of a stream
+
+
+def _blocks(source):
+    """Generator of the blocks of a source as list iterators: the rest of its current block, then successive blocks
+       drawn only when the previous block is used up. The source keeps the block being handed out."""
+
+    yield source.block
+    while True:
+        source.block = iter(source.draw(source.block_size).tolist())
+        yield source.block
+
+
+class Sampler(partial):
+    """Class of a sampler: called without arguments it returns the next value of its source's stream.
+       Calls run in C (next() over a chain of the source's blocks), and copying or pickling a sampler copies its source,
+       whose generator and rest of the current block are plain data, so a sampler is copied with the run it belongs to."""
+
+    def __new__(cls, source):
+        sampler = super().__new__(cls, next, chain.from_iterable(_blocks(source)))
+        sampler.source = source
+        return sampler
+
+    def __reduce__(self):
+        return Sampler, (self.source,)
+
+
+class NormalSource:
+    """Class of the blocks of max(0, N(mu, sigma))*scale + shift values of a stream (without the max when truncate is
+       False), with every standard normal negated when antithetic is True."""
+
+    def __init__(self, generator, block_size, mu, sigma, truncate, scale, shift, antithetic):
+        self.generator = generator
+        self.block_size = block_size
+        self.block = iter([])       #Values of the current block not handed out yet
+        self.mu = mu
+        self.sigma = -sigma if antithetic else sigma
+        self.truncate = truncate
+        self.scale = scale
+        self.shift = shift
+
+    def draw(self, n):
+        values = self.mu + self.sigma*self.generator.standard_normal(n)
+        if self.truncate:
+            np.maximum(values, 0, out = values)
+        return values*self.scale + self.shift
+
+
+class UniformSource:
+    """Class of the blocks of U(0, 1) values of a stream, 1 - u instead of every u when antithetic is True."""
+
+    def __init__(self, generator, block_size, antithetic):
+        self.generator = generator
+        self.block_size = block_size
+        self.block = iter([])
+        self.antithetic = antithetic
+
+    def draw(self, n):
+        if self.antithetic:
+            return 1 - self.generator.random(n)
+        return self.generator.random(n)
+
+
+class RandomStreams:
+    """Class that holds one independent NumPy generator per purpose, spawned from the run seed with SeedSequence.
+       The stream of a purpose only depends on the seed and its name, so it is synchronized across scenarios.
+       normal and uniform return samplers, objects called without arguments that return the next value of the stream."""
+
+    def __init__(self, seed = None, antithetic = False, block_size = BLOCK_SIZE):
+        self.seed = seed
+        self.antithetic = antithetic
+        self.block_size = block_size
+        children = np.random.SeedSequence(seed).spawn(len(STREAMS))
+        self.generators = {name: np.random.Generator(np.random.PCG64(child)) for name, child in zip(STREAMS, children)}
+
+    def normal(self, stream, mu, sigma, truncate = True, scale = 1, shift = 0):
+        """Function that returns a sampler of max(0, N(mu, sigma))*scale + shift values from the named stream
+           (without the max when truncate is False)."""
+
+        return Sampler(NormalSource(self.generators[stream], self.block_size, mu, sigma, truncate, scale, shift, self.antithetic))
+
+    def uniform(self, stream):
+        """Function that returns a sampler of U(0, 1) values from the named stream."""
+
+        return Sampler(UniformSource(self.generators[stream], self.block_size, self.antithetic))
+
+
+class SharedStream:
+    """Class that serves every purpose from a single random.Random-like generator one value at a time, like the original
+       model did. Used when a model is given an rng, e.g. to reproduce runs of earlier versions."""
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def normal(self, stream, mu, sigma, truncate = True, scale = 1, shift = 0):
+        rng = self.rng
+        if truncate:
+            return lambda: max(0, rng.gauss(mu, sigma))*scale + shift
+        return lambda: rng.gauss(mu, sigma)*scale + shift
+
+    def uniform(self, stream):
+        rng = self.rng
+        return lambda: rng.uniform(0, 1)
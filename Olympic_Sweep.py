@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parameter sweeps and designed experiments over the Olympic scenario parameters.
+
+A design is a list of cells, each a dict of Scenario parameter overrides, built as a full grid,
+a Latin hypercube or a two-level fractional factorial. Every (cell, replication) pair is one
+job for the worker pool, run with the per-replication seeds of Olympic_Replications so every
+cell sees the same seeds, and with them the same random streams (common random numbers). Completed jobs are appended to a JSONL checkpoint as they finish, and
+a sweep given the same checkpoint again only runs the jobs that are missing (jobs checkpointed
+with other streaming or warm-up options count as missing). With --screen, the cells
+are first ranked by the gross profit of the analytic queueing estimate (see Olympic_Queueing) and
+only the best ones are simulated.
+
+Example, demand against etch testers and machines, 5 replications per cell:
+    python Olympic_Sweep.py --design grid --param d_arr=8,10,12 --param testers1=10,15,20 \
+        --param machines1=15,20 --replications 5 --checkpoint sweep.jsonl --output sweep.csv
+
+Example, screening 2,000 staffing cells analytically and simulating the best 20:
+    python Olympic_Sweep.py --param testers1=10:30 --param testers2=10:30 --param testers3=20:50 \
+        --param lots_per_order=1:10 --design lhs --samples 2000 --screen 20 --min-fill-rate 90 \
+        --replications 10 --engine kernel
+"""
+
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from Olympic_Cache import RUN_OPTIONS
+from Olympic_Model import Scenario, SCENARIOS
+from Olympic_Queueing import screen
+from Olympic_Replications import (KPIS, add_run_arguments, replication_options, replication_seeds, run_options, run_replication,
+                                  summarize_replications)
+
+DESIGNS = ["grid", "lhs", "fractional"]
+
+
+def grid(levels):
+    """Function that returns the full factorial design of the given levels, e.g. grid({"d_arr": [8, 10], "testers1": [10, 15]})."""
+
+    names = list(levels)
+    return [dict(zip(names, values)) for values in itertools.product(*(levels[name] for name in names))]
+
+
+def latin_hypercube(ranges, samples, seed = 60):
+    """Function that returns a Latin hypercube design of the given number of cells over (low, high) ranges.
+       Every range is split into samples equal strata and each stratum is used exactly once per parameter.
+       Parameters whose bounds are both integers get integer values."""
+
+    rng = np.random.default_rng(seed)
+    cells = [{} for _ in range(samples)]
+    for name, (low, high) in ranges.items():
+        points = low + (rng.permutation(samples) + rng.uniform(size = samples))/samples*(high - low)
+        integer = isinstance(low, (int, np.integer)) and isinstance(high, (int, np.integer))
+        for cell, point in zip(cells, points):
+            cell[name] = int(min(high, max(low, round(point)))) if integer else float(point)
+    return cells
+
+
+def fractional_factorial(levels, runs = None):
+    """Function that returns a two-level fractional factorial design over (low, high) levels in the given number of runs
+       (a power of two, default the full 2^k factorial). The first log2(runs) parameters form a full factorial and every
+       other parameter is aliased with an interaction of those, highest-order interactions first, which keeps main
+       effects clear of each other (resolution III or better)."""
+
+    names = list(levels)
+    runs = 2**len(names) if runs is None else runs
+    base = int(runs).bit_length() - 1
+    if 2**base != runs or base > len(names):
+        raise ValueError(f"runs must be a power of two no larger than 2^{len(names)}, got {runs}")
+    interactions = [combo for size in range(base, 1, -1) for combo in itertools.combinations(range(base), size)]
+    if len(names) - base > len(interactions):
+        raise ValueError(f"{len(names)} parameters need more than {runs} runs to keep main effects unaliased")
+    signs = np.array(list(itertools.product([-1, 1], repeat = base)))
+    columns = [signs[:, i] for i in range(base)] + [signs[:, list(combo)].prod(axis = 1) for combo in interactions[:len(names) - base]]
+    return [{name: levels[name][0] if sign < 0 else levels[name][1] for name, sign in zip(names, row)}
+            for row in np.array(columns).T]
+
+
+def checkpoint_options(options):
+    """Function that returns the run options of a job that change its KPIs (those of Olympic_Cache.RUN_OPTIONS, with
+       their defaults when not given), as they are written to the checkpoint."""
+
+    return {name: options.get(name, default) for name, default in RUN_OPTIONS.items()}
+
+
+def read_checkpoint(path, options = None):
+    """Function that returns the completed jobs in a checkpoint file, keyed by (scenario hash, replication, seed).
+       Only jobs run with the same KPI-changing options are returned (see checkpoint_options): jobs run with other
+       options, or written without them, are run again."""
+
+    options = checkpoint_options(options or {})
+    done = {}
+    if path is not None and os.path.exists(path):
+        with open(path) as file:
+            for line in file:
+                if line.strip():
+                    record = json.loads(line)
+                    if record.get("options") == options:
+                        done[record["scenario_hash"], record["replication"], record["seed"]] = record["kpis"]
+    return done
+
+
+def run_sweep(design, base = None, replications = 1, seed = 60, processes = None, checkpoint = None, streaming = False, warmup = 0,
+              engine = "simpy", cache = None):
+    """Function that runs every cell of a design for the given number of replications across a process pool.
+       Cells are parameter overrides of the base scenario. Jobs already in the checkpoint file with the same
+       streaming and warm-up options are not run again, every newly completed job is appended to it with its options. Returns the per-replication KPI table and the tidy summary table,
+       with one row per cell and KPI holding the cell's parameters, mean and confidence interval.
+       Both engines give the same results, so a checkpoint can be resumed on either. Replications found in the cache
+       (an Olympic_Cache.ResultCache) are not run again, whichever sweep ran them."""
+
+    base = Scenario() if base is None else base
+    scenarios = [base.replace(**cell) for cell in design]
+    seeds = replication_seeds(seed, replications)
+    options = replication_options(engine, streaming, warmup, cache)
+    done = read_checkpoint(checkpoint, options)
+    #Cells that end up with identical parameters are run once
+    unique = {scenario.digest(): scenario for scenario in scenarios}
+    jobs = [(scenario, r + 1, s, None, options) for key, scenario in unique.items()
+            for r, s in enumerate(seeds) if (key, r + 1, s) not in done]
+
+    processes = processes or os.cpu_count()
+    with open(checkpoint, "a") if checkpoint else open(os.devnull, "w") as file:
+        if processes == 1 or len(jobs) <= 1:
+            completed = zip(jobs, map(run_replication, jobs))
+            pool = None
+        else:
+            #Jobs are checkpointed as they finish, in whatever order, so an interrupted sweep keeps every finished job
+            pool = ProcessPoolExecutor(processes)
+            futures = {pool.submit(run_replication, job): job for job in jobs}
+            completed = ((futures[future], future.result()) for future in as_completed(futures))
+        try:
+            for job, kpis in completed:
+                scenario, replication, job_seed = job[:3]
+                kpis = {kpi: float(kpis[kpi]) for kpi in KPIS}
+                done[scenario.digest(), replication, job_seed] = kpis
+                file.write(json.dumps({"scenario_hash": scenario.digest(), "replication": replication, "seed": job_seed,
+                                       "options": checkpoint_options(options),
+                                       "params": {name: getattr(scenario, name) for name in design[0]} if design else {},
+                                       "kpis": kpis}) + "\n")
+                file.flush()
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures = True)
+
+    runs, summaries = [], []
+    for cell_id, (cell, scenario) in enumerate(zip(design, scenarios)):
+        key = scenario.digest()
+        cell_runs = pd.DataFrame([{"Cell": cell_id, **cell, "Scenario_Hash": key, "Replication": r + 1, **done[key, r + 1, s]}
+                                  for r, s in enumerate(seeds)])
+        runs.append(cell_runs)
+        summary = summarize_replications(cell_runs).reset_index()
+        summaries.append(summary.assign(Cell = cell_id, Scenario_Hash = key, **cell))
+    columns = ["Cell", *(design[0] if design else []), "Scenario_Hash"]
+    runs = pd.concat(runs, ignore_index = True) if runs else pd.DataFrame(columns = columns)
+    summary = pd.concat(summaries, ignore_index = True) if summaries else pd.DataFrame(columns = columns)
+    summary = summary[columns + [c for c in summary.columns if c not in columns]]
+    return runs, summary
+
+
+def parse_value(text):
+    """Function that reads a command line parameter value as an int, a float or a boolean."""
+
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    if text.lower() in ("true", "false"):
+        return text.lower() == "true"
+    raise ValueError(f"Cannot read parameter value '{text}'")
+
+
+def parse_param(text):
+    """Function that reads name=v1,v2,... (levels) or name=low:high (range) into (name, values)."""
+
+    name, _, values = text.partition("=")
+    if name not in Scenario().as_dict():
+        raise argparse.ArgumentTypeError(f"Unknown scenario parameter '{name}'")
+    separator = ":" if ":" in values else ","
+    return name, [parse_value(value) for value in values.split(separator)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Sweep Olympic scenario parameters over a designed experiment")
+    parser.add_argument("--design", default = "grid", choices = DESIGNS)
+    parser.add_argument("--param", type = parse_param, action = "append", required = True,
+                        help = "name=v1,v2,... levels for grid, name=low:high for lhs and fractional")
+    parser.add_argument("--samples", type = int, default = 20, help = "cells of a Latin hypercube design")
+    parser.add_argument("--runs", type = int, default = None, help = "runs of a fractional factorial design (power of two)")
+    parser.add_argument("--base", default = "base", choices = SCENARIOS, help = "scenario the cells override")
+    parser.add_argument("--replications", type = int, default = 1)
+    parser.add_argument("--seed", type = int, default = 60)
+    parser.add_argument("--processes", type = int, default = None, help = "worker processes (default: all cores)")
+    parser.add_argument("--checkpoint", default = None, help = "JSONL file of completed jobs, resumed if it exists")
+    parser.add_argument("--output", default = "sweep.csv", help = "tidy summary table (.csv or .parquet)")
+    parser.add_argument("--screen", type = int, default = None, metavar = "N",
+                        help = "only simulate the N cells with the best analytic gross profit estimate")
+    parser.add_argument("--min-fill-rate", type = float, default = None,
+                        help = "with --screen, leave out cells with a lower analytic on-time fill rate (%%)")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+    options = run_options(parser, args)
+
+    params = dict(args.param)
+    if args.design == "grid":
+        design = grid(params)
+    elif args.design == "lhs":
+        design = latin_hypercube({name: tuple(values) for name, values in params.items()}, args.samples, args.seed)
+    else:
+        design = fractional_factorial({name: tuple(values) for name, values in params.items()}, args.runs)
+    if args.screen is not None:
+        screened = len(design)
+        design = [design[i] for i in screen(design, SCENARIOS[args.base], args.screen, args.min_fill_rate)]
+        print(f"{len(design)} of {screened} cells kept by the analytic screen")
+        if not design:
+            parser.exit(1, "No cell reaches --min-fill-rate in the analytic estimate\n")
+    runs, summary = run_sweep(design, SCENARIOS[args.base], args.replications, args.seed, args.processes,
+                              args.checkpoint, args.streaming, args.warmup, args.engine, options.get("cache"))
+    if args.output.endswith(".parquet"):
+        summary.to_parquet(args.output, index = False)
+    else:
+        summary.to_csv(args.output, index = False)
+    print(f"{len(design)} cells x {args.replications} replications, summary written to {args.output}")
+    print(summary[summary.KPI == "On_Time_Fill_Rate"].to_string(index = False, float_format = lambda x: f"{x:,.2f}"))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Wage expense of the Olympic production model as a continuous rate.
+
+Wages carry no information the event loop needs, so instead of a process that wakes up every
+simulated hour to book a constant expense, the wage bill is a piecewise-constant rate
+(staffing level x hourly wage, optionally scaled by a repeating shift calendar) that is
+integrated in closed form. Rows for the cash ledger are only generated when the run is
+reported, at whatever resolution is requested.
+"""
+
+import math
+
+import numpy as np
+
+
+def staff_on_shift(staff, fraction):
+    """Function that returns how many of a staff are on shift when the given fraction is, rounded half up to whole people."""
+
+    return math.floor(staff*fraction + 0.5)
+
+
+class ShiftCalendar:
+    """Class that describes which fraction of the staff is on shift over a repeating period (a day by default).
+       Shifts are (start hour, end hour, fraction on shift) tuples within the period; hours not covered by a shift are
+       unpaid, and nobody is on shift then."""
+
+    def __init__(self, shifts, period = 24):
+        self.period = period
+        self.starts, self.ends, self.fractions = [], [], []
+        for start, end, fraction in sorted(shifts):
+            if not 0 <= start < end <= period:
+                raise ValueError(f"Shift ({start}, {end}) does not fit in a period of {period} hours")
+            if self.ends and start < self.ends[-1]:
+                raise ValueError(f"Shift ({start}, {end}) overlaps the previous shift")
+            self.starts.append(start)
+            self.ends.append(end)
+            self.fractions.append(fraction)
+        self.paid_per_period = self.paid_within_period(period)
+        self.changes = sorted(set(self.starts + self.ends))     #Hours into the period at which a shift starts or ends
+
+    def rounded(self, staffs):
+        """Function that returns the calendar of the share of the staff on shift when every group in staffs (the staff of
+           every station) has its own whole number of people on shift (see staff_on_shift), so the wages pay exactly
+           the people on shift."""
+
+        total = sum(staffs)
+        if total == 0:
+            return self
+        return ShiftCalendar([(start, end, sum(staff_on_shift(staff, fraction) for staff in staffs)/total)
+                              for start, end, fraction in zip(self.starts, self.ends, self.fractions)], self.period)
+
+    def on_shift(self, t):
+        """Function that returns the fraction of the staff on shift at time t."""
+
+        x = t % self.period
+        for start, end, fraction in zip(self.starts, self.ends, self.fractions):
+            if start <= x < end:
+                return fraction
+        return 0.0
+
+    def next_change(self, t):
+        """Function that returns the first time after t at which a shift starts or ends."""
+
+        if not self.changes:
+            return float("inf")
+        periods, x = divmod(t, self.period)
+        for change in self.changes:
+            if change > x:
+                return periods*self.period + change
+        return (periods + 1)*self.period + self.changes[0]
+
+    def paid_within_period(self, x):
+        """Function that returns the staffed hours from the start of a period to x hours into it. x may be an array."""
+
+        return sum(fraction*np.clip(x - start, 0, end - start) for start, end, fraction in zip(self.starts, self.ends, self.fractions))
+
+    def cumulative(self, t):
+        """Function that returns the staffed hours (hours x fraction on shift) from time 0 to time t. t may be an array."""
+
+        periods, x = np.divmod(t, self.period)
+        return periods*self.paid_per_period + self.paid_within_period(x)
+
+
+class WageSchedule:
+    """Class that holds the wage bill as a piecewise-constant hourly rate, changed when staffing changes, and the shift
+       calendar of every segment. Accrued wages between any two times are computed analytically from the rate segments
+       and the shift calendars."""
+
+    def __init__(self, hourly_rate, calendar = None):
+        self.times = [0.0]              #Start time of every rate segment
+        self.rates = [hourly_rate]      #Wage bill in $/hr while the whole staff is on shift
+        self.calendars = [calendar]     #Shift calendar of every segment, None = paid around the clock
+
+    def change_rate(self, time, hourly_rate):
+        """Function that changes the wage bill from the given time on, e.g. when testers are hired or let go."""
+
+        self.change(time, hourly_rate, self.calendars[-1])
+
+    def change_calendar(self, time, calendar):
+        """Function that changes the shift calendar from the given time on."""
+
+        self.change(time, self.rates[-1], calendar)
+
+    def change(self, time, hourly_rate, calendar):
+        if time < self.times[-1]:
+            raise ValueError(f"Wage rate changes must be made in time order ({time} < {self.times[-1]})")
+        if time == self.times[-1]:
+            self.rates[-1] = hourly_rate
+            self.calendars[-1] = calendar
+        else:
+            self.times.append(time)
+            self.rates.append(hourly_rate)
+            self.calendars.append(calendar)
+
+    @staticmethod
+    def staffed_hours(t, calendar):
+        """Function that returns the staffed hours from time 0 to time t under a shift calendar. t may be an array."""
+
+        return t if calendar is None else calendar.cumulative(t)
+
+    def accrued_to(self, t):
+        """Function that returns the wage expense accrued from time 0 to time t. t may be an array."""
+
+        t = np.asarray(t, dtype = float)
+        ends = self.times[1:] + [np.inf]
+        total = np.zeros_like(t)
+        for start, end, rate, calendar in zip(self.times, ends, self.rates, self.calendars):
+            total += rate*(self.staffed_hours(np.clip(t, start, end), calendar) - self.staffed_hours(start, calendar))
+        return total
+
+    def accrued(self, t0, t1):
+        """Function that returns the wage expense accrued between times t0 and t1."""
+
+        return float(self.accrued_to(t1) - self.accrued_to(t0))
+
+    def ledger(self, until, resolution = 1):
+        """Function that materializes the wage expense into cash ledger rows, one per resolution hours.
+           Every row is booked at the start of its interval, like the hourly wage process it replaces.
+           Returns the booking times and the amounts as arrays."""
+
+        times = np.arange(0, until, resolution, dtype = float)
+        return times, np.diff(self.accrued_to(np.append(times, until)))
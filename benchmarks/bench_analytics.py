@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the post-run analytics: row-wise DataFrame.apply (the previous Olympic_Model code)
+vs the vectorized functions in Olympic_Analytics, on synthetic 1 million row tables.
+
+Checks that both produce the same cumulative P&L, lot/order process times and late-penalty
+revenue, then reports the time taken by each.
+
+Run from the repository root:  python -m benchmarks.bench_analytics [rows]
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from Olympic_Model import Scenario
+from Olympic_Analytics import add_cumulative_pnl, add_lot_columns, add_order_columns
+
+
+def legacy_profit_cumsum(data):
+    data["Cumulative_Revenue"] = data["Revenue"].cumsum()
+    data["Cumulative_COGS"] = data["COGS_Expense"].cumsum()
+    data["Cumulative_Wage_Expense"]=data["Wage_Expense"].cumsum()
+    data["Cumulative_Profits"] = data.apply(lambda row: row["Cumulative_Revenue"] - row["Cumulative_COGS"] - row["Cumulative_Wage_Expense"], axis=1)
+    return data
+
+
+def legacy_lot_columns(lots):
+    lots["Lot_Process_Time"] = lots.apply(lambda row: row["End_Time"] - row["Start_Time"], axis=1)
+    return lots
+
+
+def legacy_order_columns(orders, g):
+    orders["Order_Process_Time"] = orders.apply(lambda row: row["End_Time"] - row["Start_Time"] + row["Ship_Time"], axis=1)
+    orders["Revenue_Generated"] = orders.apply(lambda row: g.order_revenue if row["Order_Process_Time"] <= g.quoted_lead else max(0,g.order_revenue - ((row["Order_Process_Time"]-g.quoted_lead)*g.hourly_penalty)), axis=1)
+    return orders
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(60)
+    g = Scenario()
+
+    kind = rng.integers(0, 3, rows)
+    cash = pd.DataFrame({"Time": np.sort(rng.uniform(0, rows/60, rows)),
+                         "Revenue": np.where(kind == 0, rng.uniform(0, g.order_revenue, rows), 0),
+                         "COGS_Expense": np.where(kind == 1, g.units_per_lot*g.cogs, 0),
+                         "Wage_Expense": np.where(kind == 2, 1020.0, 0)})
+    start_times = rng.uniform(0, rows/60, rows)
+    lots = pd.DataFrame({"Start_Time": start_times, "End_Time": start_times + rng.gamma(9, 5, rows)})
+    orders = pd.DataFrame({"Start_Time": start_times, "End_Time": start_times + rng.gamma(9, 5, rows),
+                           "Ship_Time": rng.normal(g.mean_ship, g.std_ship, rows)})
+
+    print(f"{rows:,} rows per table")
+    print(f"{'table':<8} {'apply (s)':>10} {'vectorized (s)':>15} {'speedup':>9}  equal")
+    for name, legacy, vectorized, frame, columns in [
+            ("cash", legacy_profit_cumsum, add_cumulative_pnl, cash, ["Cumulative_Revenue", "Cumulative_COGS", "Cumulative_Wage_Expense", "Cumulative_Profits"]),
+            ("lots", legacy_lot_columns, add_lot_columns, lots, ["Lot_Process_Time"]),
+            ("orders", lambda df: legacy_order_columns(df, g), lambda df: add_order_columns(df, g), orders, ["Order_Process_Time", "Revenue_Generated"])]:
+        old, old_time = timed(legacy, frame.copy())
+        new, new_time = timed(vectorized, frame.copy())
+        equal = all(np.allclose(old[c].to_numpy(dtype = float), new[c].to_numpy(dtype = float), rtol = 1e-12, atol = 1e-6) for c in columns)
+        print(f"{name:<8} {old_time:>10.2f} {new_time:>15.4f} {old_time/new_time:>8,.0f}x  {equal}")
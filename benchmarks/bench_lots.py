@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory benchmark of lot records: the previous Lot class, a plain object with a per-instance
+__dict__ kept alive per lot, vs the LotStore columns of Olympic_Recorder that Lot handles
+point into.
+
+Creates the given number of lots with every attribute set, then reports the bytes allocated per
+lot (tracemalloc) and the time to build the lot table as NumPy arrays.
+
+Run from the repository root:  python -m benchmarks.bench_lots [lots]
+"""
+
+import sys
+import time
+import tracemalloc
+import numpy as np
+from Olympic_Recorder import Lot, LotStore
+
+
+class DictLot:
+    """The Lot class of the model before the lot store"""
+
+    def __init__(self, unique_id, order_id, lot_id):
+        self.unique_id = unique_id
+        self.order_id = order_id
+        self.id = lot_id
+        self.start_time = 0
+        self.end_time = 0
+        self.failures = 0
+
+
+def dict_lots(lots):
+    """Every lot as its own object, with the stage ends it would need for the new columns"""
+
+    records = []
+    for i in range(lots):
+        lot = DictLot(i + 1, i//8 + 1, i % 8 + 1)
+        lot.start_time, lot.end_time, lot.etch_end, lot.assembly_end = i*0.1, i*0.1 + 40.0, i*0.1 + 12.5, i*0.1 + 25.0
+        records.append(lot)
+    return records
+
+
+def stored_lots(lots):
+    """Every lot as a row of the store, written through a handle that is dropped once the lot is finished"""
+
+    store = LotStore()
+    for i in range(lots):
+        lot = Lot(store, i + 1, i//8 + 1, i % 8 + 1)
+        lot.start_time = i*0.1
+        lot.passed(0, i*0.1 + 12.5)
+        lot.passed(1, i*0.1 + 25.0)
+        lot.passed(2, i*0.1 + 40.0)
+        store.finish(lot.slot)
+    return store
+
+
+def measure(build, to_arrays, lots):
+    """Function that returns (bytes per lot, seconds to build, seconds to get the lot times as arrays)"""
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = build(lots)
+    built = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    to_arrays(records)
+    return size/lots, built, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    lots = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"{lots:,} lots")
+    print(f"{'lots as':<12} {'bytes/lot':>10} {'build (s)':>10} {'to NumPy (s)':>13}")
+    for name, build, to_arrays in [
+            ("objects", dict_lots, lambda records: (np.array([lot.start_time for lot in records]), np.array([lot.end_time for lot in records]))),
+            ("LotStore", stored_lots, lambda store: (store.column("Start_Time"), store.column("End_Time")))]:
+        per_lot, built, converted = measure(build, to_arrays, lots)
+        print(f"{name:<12} {per_lot:>10.0f} {built:>10.2f} {converted:>13.4f}")
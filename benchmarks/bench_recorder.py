@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of event logging throughput: one-row DataFrame appends vs the columnar recorder.
+
+Replays the event stream the Olympic model logs over 60, 365 and 1825 simulated days
+(COGS and revenue cash rows, hourly wage rows, lot and order rows, 100 queue samples)
+into both recorders and reports events/second. The per-event DataFrame path is what
+Olympic_Model did before the recorder (pd.concat is what DataFrame.append did internally);
+it is quadratic, so it is stopped after a time budget and its rate is reported up to that point.
+
+Run from the repository root:  python -m benchmarks.bench_recorder
+"""
+
+import time
+import numpy as np
+import pandas as pd
+from Olympic_Recorder import Recorder
+
+DURATIONS = [60, 365, 1825]     #Simulated days
+ORDERS_PER_DAY = 10             #g.d_arr
+LOTS_PER_ORDER = 5              #g.lots_per_order
+LEGACY_BUDGET = 30              #Seconds the DataFrame append path is allowed per duration
+
+
+def event_stream(days):
+    """Generator of (table, row) pairs in roughly the order the model logs them"""
+
+    q_interval = days*24/100
+    next_q = 0
+    unique_id = 1
+    orders_due = 0
+    for hour in range(days*24):
+        if hour >= next_q:
+            yield "queue", (hour, hour, 1, 2, 3, 4, 5, 6, 50.0, 60.0, 70.0, 80.0, 90.0, 95.0, 7)
+            next_q += q_interval
+        yield "cash", (hour, 0, 0, 1020, "Wage_Expense")
+        orders_due += ORDERS_PER_DAY/24
+        while orders_due >= 1:
+            orders_due -= 1
+            order_id = unique_id
+            for lot in range(LOTS_PER_ORDER):
+                yield "cash", (hour, 0, 750.0, 0, "COGS")
+                yield "lots", (unique_id, order_id, lot + 1, hour, hour + 40.0, 40.0)
+                unique_id += 1
+            yield "orders", (order_id, hour, hour + 40.0, 47.0, 9000.0)
+            yield "cash", (hour, 9000.0, 0, 0, "Order Revenue")
+
+
+COLUMNS = {"cash": ["Time", "Revenue", "COGS_Expense", "Wage_Expense", "Note"],
+           "queue": ["Time", "Total_Orders", "Etch_Q_Length", "Test1_Q_Length", "Assembly_Q_Length", "Test2_Q_Length",
+                     "Finishing_Q_Length", "Test3_Q_Length", "Etch_Utilization", "Test1_Utilization",
+                     "Assembly_Utilization", "Test2_Utilization", "Finishing_Utilization", "Test3_Utilization", "Failed_Tests"],
+           "lots": ["Unique_ID", "Order_ID", "Lot_ID", "Start_Time", "End_Time", "Lot_Process_Time"],
+           "orders": ["Order_ID", "Start_Time", "End_Time", "Order_Process_Time", "Revenue_Generated"]}
+
+
+def legacy(days):
+    """Function that logs every event as a one-row DataFrame appended to the table, stopping at the time budget"""
+
+    frames = {name: pd.DataFrame() for name in COLUMNS}
+    start = time.perf_counter()
+    events = 0
+    for name, row in event_stream(days):
+        frames[name] = pd.concat([frames[name], pd.DataFrame({c: [v] for c, v in zip(COLUMNS[name], row)})])
+        events += 1
+        if events % 500 == 0 and time.perf_counter() - start > LEGACY_BUDGET:
+            return events, time.perf_counter() - start, False
+    return events, time.perf_counter() - start, True
+
+
+def columnar(days):
+    """Function that logs every event into the columnar recorder and materializes the DataFrames once at the end"""
+
+    recorder = Recorder()
+    tables = {"cash": recorder.table("cash", [("Time", float), ("Revenue", float), ("COGS_Expense", float),
+                                              ("Wage_Expense", float), ("Note", object)]),
+              "queue": recorder.table("queue", [("Time", float), ("Total_Orders", np.int64)] + [(c, np.int64) for c in COLUMNS["queue"][2:8]]
+                                      + [(c, float) for c in COLUMNS["queue"][8:14]] + [("Failed_Tests", np.int64)]),
+              "lots": recorder.table("lots", [("Unique_ID", np.int64), ("Order_ID", np.int64), ("Lot_ID", np.int64),
+                                              ("Start_Time", float), ("End_Time", float), ("Lot_Process_Time", float)], index = "Unique_ID"),
+              "orders": recorder.table("orders", [("Order_ID", np.int64), ("Start_Time", float), ("End_Time", float),
+                                                  ("Order_Process_Time", float), ("Revenue_Generated", float)])}
+    start = time.perf_counter()
+    events = 0
+    for name, row in event_stream(days):
+        tables[name].append(*row)
+        events += 1
+    recorder.to_frames()
+    return events, time.perf_counter() - start, True
+
+
+if __name__ == "__main__":
+    print(f"{'days':>6} {'events':>9} {'DataFrame.append ev/s':>24} {'recorder ev/s':>15} {'speedup':>9}")
+    for days in DURATIONS:
+        old_events, old_time, finished = legacy(days)
+        new_events, new_time, _ = columnar(days)
+        old_rate = old_events/old_time
+        new_rate = new_events/new_time
+        note = "" if finished else f" (stopped after {old_events} events)"
+        print(f"{days:>6} {new_events:>9} {old_rate:>24,.0f} {new_rate:>15,.0f} {new_rate/old_rate:>8,.0f}x{note}")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of test failure handling: the previous recursive rework (a nested env.process per failed test,
+started while the lot still holds its tester) vs the rework loop within each lot's own process.
+
+Runs the base scenario with every p_fail_test* set to the same value and reports the SimPy
+events scheduled, the processes started, lots completed and wall time for each. The recursive
+variant is reproduced below as a subclass of the current model. Both draw from one random.Random,
+as the recursive code did.
+
+Run from the repository root:  python -m benchmarks.bench_rework [days]
+"""
+
+import random
+import sys
+import time
+from Olympic_Model import Olympic_Model, Scenario
+
+P_FAILS = [0.015, 0.1, 0.25, 0.4]
+
+
+class RecursiveReworkModel(Olympic_Model):
+    """The stage functions and lot flow of the model before the rework loop"""
+
+    def etch_and_test(self,lot):
+        g = self.scenario
+        with self.etch_machine.request() as req:
+            yield req
+            sampled_etch_duration = max(0,self.rng.gauss(g.mean_etching, g.std_etching))
+            yield self.env.timeout((sampled_etch_duration*g.units_per_lot)+g.lot_time1)
+        with self.etch_tester.request() as req:
+            yield req
+            sampled_test1_duration = max(0,self.rng.gauss(g.mean_test1, g.std_test1))
+            yield self.env.timeout(sampled_test1_duration*g.units_per_lot)
+            fail_test = self.rng.uniform(0,1)
+            if fail_test < g.p_fail_test1:
+                self.failed_tests +=1
+                yield self.env.process(self.etch_and_test(lot))
+
+    def assembly_and_test(self,lot):
+        g = self.scenario
+        with self.etch_machine.request() as req:
+            yield req
+            sampled_assembly_duration = max(0,self.rng.gauss(g.mean_assembly, g.std_assembly))
+            yield self.env.timeout(sampled_assembly_duration*g.units_per_lot)
+        with self.assembly_tester.request() as req:
+            yield req
+            sampled_test2_duration = max(0,self.rng.gauss(g.mean_test2, g.std_test2))
+            yield self.env.timeout(sampled_test2_duration*g.units_per_lot)
+            fail_test = self.rng.uniform(0,1)
+            if fail_test < g.p_fail_test2:
+                self.failed_tests +=1
+                yield self.env.process(self.assembly_and_test(lot))
+
+    def finishing_and_test(self,lot):
+        g = self.scenario
+        with self.finishing_machine.request() as req:
+            yield req
+            sampled_finishing_duration = max(0,self.rng.gauss(g.mean_finishing, g.std_finishing))
+            yield self.env.timeout(sampled_finishing_duration*g.units_per_lot)
+        with self.finishing_tester.request() as req:
+            yield req
+            sampled_test3_duration = max(0,self.rng.gauss(g.mean_test3, g.std_test3))
+            yield self.env.timeout(sampled_test3_duration*g.units_per_lot*g.units_per_lot)
+            fail_test = self.rng.uniform(0,1)
+            if fail_test < g.p_fail_test3:
+                self.failed_tests +=1
+                yield self.env.process(self.finishing_and_test(lot))
+
+    def lot_flow(self,lot):
+        lot.start_time = self.env.now
+        yield self.env.process(self.etch_and_test(lot))
+        yield self.env.process(self.assembly_and_test(lot))
+        yield self.env.process(self.finishing_and_test(lot))
+        lot.end_time = self.env.now
+        self.store_lot_results(lot)
+        order_times = self.open_orders.lot_finished(lot.order_id, lot.start_time, lot.end_time)
+        if order_times is not None:
+            self.store_order_results(lot.order_id, *order_times)
+
+
+def measure(model_class, scenario):
+    """Function that runs one model and returns (events scheduled, processes started, lots completed, failed tests, seconds)"""
+
+    model = model_class(1, scenario, rng = random.Random(60))
+    started = [0]
+    process = model.env.process
+    def counting_process(generator):
+        started[0] += 1
+        return process(generator)
+    model.env.process = counting_process
+    start = time.perf_counter()
+    results = model.run()
+    elapsed = time.perf_counter() - start
+    return next(model.env._eid), started[0], len(results.lots_df), model.failed_tests, elapsed
+
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    print(f"base scenario, {days} simulated days, seed 60")
+    print(f"{'p_fail':>6} {'model':<10} {'events':>10} {'processes':>10} {'lots done':>10} {'failed':>8} {'seconds':>8} {'events/lot':>11}")
+    for p_fail in P_FAILS:
+        scenario = Scenario(sim_duration = days*24, p_fail_test1 = p_fail, p_fail_test2 = p_fail, p_fail_test3 = p_fail)
+        for name, model_class in [("recursive", RecursiveReworkModel), ("loop", Olympic_Model)]:
+            events, processes, lots, failed, elapsed = measure(model_class, scenario)
+            print(f"{p_fail:>6} {name:<10} {events:>10,} {processes:>10,} {lots:>10,} {failed:>8,} {elapsed:>8.2f} {events/max(lots, 1):>11.1f}")
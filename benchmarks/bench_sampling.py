@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Microbenchmark of the random draws one lot needs: one value at a time from random.gauss and
+random.uniform (the model before the sampler layer) vs the block-sampled NumPy streams of
+Olympic_Streams.
+
+A lot draws a process time, a test time and a test outcome at each of the three stages, plus
+its share of one order interarrival time and one ship time. Both paths apply the truncation at
+zero and the per-lot scaling. Reports the sampling cost per lot and checks that both paths
+draw from the same distributions.
+
+Run from the repository root:  python -m benchmarks.bench_sampling [lots]
+"""
+
+import random
+import sys
+import time
+import numpy as np
+from Olympic_Model import Scenario
+from Olympic_Streams import RandomStreams
+
+
+def legacy_lots(lots, g, rng):
+    """The draws of the stage functions, generate_orders and store_order_results before the sampler layer"""
+
+    values = []
+    for i in range(lots):
+        etch = max(0,rng.gauss(g.mean_etching, g.std_etching))*g.units_per_lot + g.lot_time1
+        test1 = max(0,rng.gauss(g.mean_test1, g.std_test1))*g.units_per_lot
+        fail1 = rng.uniform(0,1)
+        assembly = max(0,rng.gauss(g.mean_assembly, g.std_assembly))*g.units_per_lot
+        test2 = max(0,rng.gauss(g.mean_test2, g.std_test2))*g.units_per_lot
+        fail2 = rng.uniform(0,1)
+        finishing = max(0,rng.gauss(g.mean_finishing, g.std_finishing))*g.units_per_lot
+        test3 = max(0,rng.gauss(g.mean_test3, g.std_test3))*g.units_per_lot*g.units_per_lot
+        fail3 = rng.uniform(0,1)
+        if i % g.lots_per_order == 0:
+            interarrival = max(0,rng.gauss(g.d_intarrival, g.d_int_std))
+            ship = rng.gauss(g.mean_ship, g.std_ship)
+        values.append(test3)
+    return values
+
+
+def sampled_lots(lots, g, streams):
+    """The same draws through samplers bound once per run, like Olympic_Model.bind_samplers"""
+
+    etch_time = streams.normal("etch_process", g.mean_etching, g.std_etching, scale = g.units_per_lot, shift = g.lot_time1)
+    etch_test_time = streams.normal("etch_test", g.mean_test1, g.std_test1, scale = g.units_per_lot)
+    etch_failure = streams.uniform("etch_failure")
+    assembly_time = streams.normal("assembly_process", g.mean_assembly, g.std_assembly, scale = g.units_per_lot)
+    assembly_test_time = streams.normal("assembly_test", g.mean_test2, g.std_test2, scale = g.units_per_lot)
+    assembly_failure = streams.uniform("assembly_failure")
+    finishing_time = streams.normal("finishing_process", g.mean_finishing, g.std_finishing, scale = g.units_per_lot)
+    finishing_test_time = streams.normal("finishing_test", g.mean_test3, g.std_test3, scale = g.units_per_lot*g.units_per_lot)
+    finishing_failure = streams.uniform("finishing_failure")
+    sample_interarrival = streams.normal("interarrival", g.d_intarrival, g.d_int_std)
+    sample_ship = streams.normal("ship", g.mean_ship, g.std_ship, truncate = False)
+
+    values = []
+    for i in range(lots):
+        etch = etch_time()
+        test1 = etch_test_time()
+        fail1 = etch_failure()
+        assembly = assembly_time()
+        test2 = assembly_test_time()
+        fail2 = assembly_failure()
+        finishing = finishing_time()
+        test3 = finishing_test_time()
+        fail3 = finishing_failure()
+        if i % g.lots_per_order == 0:
+            interarrival = sample_interarrival()
+            ship = sample_ship()
+        values.append(test3)
+    return values
+
+
+if __name__ == "__main__":
+    lots = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    g = Scenario()
+    start = time.perf_counter()
+    old = legacy_lots(lots, g, random.Random(60))
+    old_time = time.perf_counter() - start
+    start = time.perf_counter()
+    new = sampled_lots(lots, g, RandomStreams(60))
+    new_time = time.perf_counter() - start
+
+    print(f"{lots:,} lots, 11 draws per lot")
+    print(f"{'sampler':<22} {'ns/lot':>8} {'speedup':>8}  final test time mean/std/share truncated")
+    for name, elapsed, values in [("random, one at a time", old_time, old), ("NumPy blocks", new_time, new)]:
+        values = np.array(values)
+        print(f"{name:<22} {1e9*elapsed/lots:>8.0f} {old_time/elapsed:>7.1f}x  "
+              f"{values.mean():.3f} / {values.std():.3f} / {(values == 0).mean():.4f}")
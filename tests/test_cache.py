@@ -0,0 +1,45 @@
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from Olympic_Cache import ResultCache
+
+
+def keys(cache):
+    return {os.path.basename(path)[:-4] for _, _, path in cache.entries()}
+
+
+def test_eviction_deletes_least_recently_used_entries(tmp_path):
+    size = len(pickle.dumps(list(range(100)), protocol = pickle.HIGHEST_PROTOCOL))
+    cache = ResultCache(str(tmp_path), max_bytes = int(5.5*size))
+    names = [f"{i:064x}" for i in range(6)]
+    for i, name in enumerate(names[:5]):
+        cache.put(name, list(range(100)))
+        os.utime(cache.path(name), (i, i))
+    cache.get(names[0])             #Entry 0 becomes the most recently used
+    cache.put(names[5], list(range(100)))
+    #Over the limit: evicted down to 90% of it, least recently used first
+    assert keys(cache) == {names[0], names[3], names[4], names[5]}
+    assert cache.size() <= 0.9*cache.max_bytes
+
+
+def test_caches_share_a_directory(tmp_path):
+    writer, other = ResultCache(str(tmp_path)), ResultCache(str(tmp_path))
+    writer.put("a"*64, 1)
+    other.put("b"*64, 2)
+    assert other.get("a"*64) == 1 and writer.get("b"*64) == 2
+    writer.clear()
+    assert writer.size() == 0 and other.get("a"*64) is None
+
+
+def fill(directory, worker, max_bytes):
+    cache = ResultCache(directory, max_bytes = max_bytes)
+    for i in range(15):
+        cache.put(f"{worker:032x}{i:032x}", os.urandom(10_000))
+
+
+def test_processes_sharing_a_cache_keep_it_under_the_limit(tmp_path):
+    with ProcessPoolExecutor(8) as pool:
+        list(pool.map(fill, [str(tmp_path)]*8, range(8), [200_000]*8))
+    cache = ResultCache(str(tmp_path), max_bytes = 200_000)
+    assert 0 < cache.size() <= cache.max_bytes
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from Olympic_Kernel import cross_validate
+from Olympic_Model import Scenario, make_model
+
+SCENARIO = Scenario(sim_duration = 20*24)
+
+
+@pytest.mark.parametrize("engine", ["simpy", "kernel"])
+def test_breakdowns_do_not_change_the_staff(engine):
+    scenario = SCENARIO.replace(interventions = [(100, "breakdown", "Test3", 5), (200, "capacity", "Test3", 40)])
+    model = make_model(1, scenario, seed = 60, engine = engine)
+    model.run()
+    assert model.staffed["Test3"] == 40 and model.resources["Test3"].capacity == 35
+    assert model.testers == 70
+    assert model.wages.rates[-1] == 70*scenario.tester_hr_wage
+
+
+def test_repairs_cannot_exceed_the_breakdowns():
+    scenario = SCENARIO.replace(interventions = [(100, "breakdown", "Etch", 2), (200, "repair", "Etch", 3)])
+    with pytest.raises(ValueError):
+        make_model(1, scenario, seed = 60).run()
+
+
+def test_interventions_on_both_engines_agree():
+    scenario = SCENARIO.replace(interventions = [(100, "breakdown", "Test3", 5), (200, "capacity", "Test3", 40),
+                                                 (300, "repair", "Test3", 5), (250, "demand", 12, 5)])
+    differences, _ = cross_validate(scenario)
+    assert differences == {}
+
+
+def test_testers_are_only_in_service_on_shift():
+    scenario = SCENARIO.replace(tester_shifts = [(6, 14, 1), (14, 22, 0.5)])
+    model = make_model(1, scenario, seed = 60, engine = "kernel")
+    model.run()
+    monitor = model.monitors["Test3"]
+    assert list(monitor.capacity_at([24*5 + 7, 24*5 + 15, 24*5 + 23])) == [30, 15, 0]
+    assert model.staffed["Test3"] == 30 and model.testers == 60
+
+
+def test_shift_calendars_on_both_engines_agree():
+    scenario = SCENARIO.replace(tester_shifts = [(6, 14, 1), (14, 22, 1), (22, 24, 0.5), (0, 6, 0.5)],
+                                interventions = [(100.5, "shifts", [(6, 18, 1), (18, 24, 0.5)]), (100.5, "breakdown", "Test3", 3),
+                                                 (300, "shifts", None), (400, "shifts", [(0, 12, 1), (12, 24, 0.75)])])
+    differences, _ = cross_validate(scenario)
+    assert differences == {}
+
+
+@pytest.mark.parametrize("at", [0, 100])
+def test_whole_station_broken_down(at):
+    scenario = SCENARIO.replace(interventions = [(at, "breakdown", "Finishing", 7)])
+    differences, _ = cross_validate(scenario)
+    assert differences == {}
+    model = make_model(1, scenario, seed = 60, engine = "kernel")
+    results = model.run()
+    utilization = results.tables["queue"]["Finishing_Utilization"]
+    assert not np.isinf(utilization).any()
+    assert utilization[results.tables["queue"]["Time"] > at].isna().all()
+    station = results.tables["stations"].loc["Finishing", "Utilization"]
+    assert np.isnan(station) if at == 0 else 0 < station < 100
+    steps = results.tables["steps"]
+    assert not np.isinf(steps["Utilization"]).any()
+
+
+def test_wages_pay_the_testers_in_service():
+    scenario = SCENARIO.replace(tester_shifts = [(6, 14, 1), (14, 22, 0.5)], interventions = [(100, "capacity", "Test1", 25)])
+    model = make_model(1, scenario, seed = 60, engine = "kernel")
+    results = model.run()
+    #Half of 15 and of 25 testers are rounded up, like half of 5 and of 7 would be
+    assert list(model.monitors["Test1"].capacity_at([24*5 + 7, 24*5 + 15])) == [25, 13]
+    assert model.monitors["Test2"].capacity_at([15])[0] == 8
+    times = np.linspace(0, scenario.sim_duration, 20*24*60 + 1)[:-1] + 1/120
+    served = sum(model.monitors[name].capacity_at(times).sum()/60 for name in ["Test1", "Test2", "Test3"])
+    assert np.isclose(results.tables["cash"]["Wage_Expense"].sum(), served*scenario.tester_hr_wage)
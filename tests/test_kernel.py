@@ -0,0 +1,33 @@
+import pytest
+
+from Olympic_Kernel import Olympic_Kernel, compare
+from Olympic_Model import Olympic_Model, Scenario
+from Olympic_Report import summarize
+
+SCENARIO = Scenario().replace(sim_duration = 20*24)
+
+
+def test_snapshot_restores_exact_copies_unless_reseeded():
+    reference = Olympic_Kernel(1, SCENARIO, seed = 60).run()
+    snapshot = Olympic_Kernel(1, SCENARIO, seed = 60).run_until(10*24).snapshot()
+    assert compare(reference, snapshot.restore().run()) == {}
+    reseeded = snapshot.restore(run_number = 2, seed = 61).run()
+    assert compare(reference, reseeded) != {}
+    assert compare(reseeded, snapshot.restore(run_number = 2, seed = 61).run()) == {}
+    #The lots finished before the snapshot are shared
+    lots = reference.tables["lots"]
+    finished = lots[lots["End_Time"] < 10*24]
+    assert reseeded.tables["lots"].loc[finished.index].equals(finished)
+
+
+def test_what_if_fork_from_a_snapshot():
+    snapshot = Olympic_Kernel(1, SCENARIO, seed = 60).run_until(10*24).snapshot()
+    what_if = snapshot.restore(run_number = 2)
+    what_if.intervene(what_if.now, "capacity", "Test3", 40)
+    base, what_if = snapshot.restore().run(), what_if.run()
+    assert summarize(what_if)["Mean_Fill_Time"] < summarize(base)["Mean_Fill_Time"]
+
+
+def test_simpy_runs_cannot_be_snapshotted():
+    with pytest.raises(ValueError):
+        Olympic_Model(1, SCENARIO, seed = 60).snapshot()
@@ -0,0 +1,27 @@
+import math
+import warnings
+
+import numpy as np
+
+from Olympic_Model import Scenario
+from Olympic_Queueing import estimate, lognormal_cdf, lognormal_parameters
+
+KPIS = ["On_Time_Fill_Rate", "Mean_Fill_Time", "Service_Level_Fill_Time", "Gross_Profit", "Mean_Order_Wait"]
+
+
+def test_deterministic_time_is_a_step():
+    mu, sigma = lognormal_parameters(2.0, 0.0)
+    assert sigma == 0 and math.exp(mu) == 2.0
+    assert list(lognormal_cdf([0.0, 1.9, 2.0, 3.0], mu, sigma)) == [0, 0, 1, 1]
+
+
+def test_deterministic_stations_give_finite_estimates():
+    deterministic = {name: 0 for name in ["std_etching", "std_test1", "std_assembly", "std_test2", "std_finishing", "std_test3"]}
+    no_rework = {"p_fail_test1": 0, "p_fail_test2": 0, "p_fail_test3": 0}
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = estimate(Scenario().replace(**deterministic, **no_rework))
+    assert result["Stable"]
+    assert all(math.isfinite(result[kpi]) for kpi in KPIS)
+    assert result["Mean_Lot_Processing"] > 0
+    assert np.allclose([station["Service_SCV"] for name, station in result["stations"].items() if name != "Etch"], 0)
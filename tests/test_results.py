@@ -0,0 +1,23 @@
+import pandas as pd
+import pytest
+
+from Olympic_Model import Scenario, make_model
+from Olympic_Results import SINKS
+
+
+@pytest.fixture(scope = "module")
+def results():
+    return make_model(3, Scenario(sim_duration = 5*24), "kernel", seed = 60, trace = True).run()
+
+
+@pytest.mark.parametrize("sink", ["npz", "parquet", "feather", "csv"])
+def test_round_trip_keeps_every_table(tmp_path, results, sink):
+    if sink in ("parquet", "feather"):
+        pytest.importorskip("pyarrow")
+    store = SINKS[sink](str(tmp_path))
+    store.write(results)
+    loaded = store.read(results.scenario.digest(), results.replication)
+    assert list(loaded.tables) == ["cash", "queue", "lots", "orders", "stations", "steps", "trace"]
+    assert loaded.scenario == results.scenario and loaded.replication == 3 and loaded.seed == 60
+    for name, table in results.tables.items():
+        pd.testing.assert_frame_equal(loaded.tables[name], table, check_dtype = False, check_index_type = False)
@@ -0,0 +1,22 @@
+import json
+
+from Olympic_Model import Scenario
+from Olympic_Sweep import read_checkpoint, run_sweep
+
+BASE = Scenario(sim_duration = 5*24)
+DESIGN = [{"testers1": 10}, {"testers1": 20}]
+
+
+def test_checkpoint_is_only_resumed_with_the_same_options(tmp_path):
+    checkpoint = str(tmp_path/"sweep.jsonl")
+    runs, _ = run_sweep(DESIGN, BASE, 2, processes = 1, checkpoint = checkpoint)
+    assert len(read_checkpoint(checkpoint)) == 4
+    assert read_checkpoint(checkpoint, {"streaming": True, "warmup": 24}) == {}
+    #Resumed with the same options nothing runs again, with other options every job does
+    resumed, _ = run_sweep(DESIGN, BASE, 2, processes = 1, checkpoint = checkpoint)
+    assert resumed.equals(runs)
+    run_sweep(DESIGN, BASE, 2, processes = 1, checkpoint = checkpoint, streaming = True, warmup = 24)
+    with open(checkpoint) as file:
+        records = [json.loads(line) for line in file]
+    assert len(records) == 8
+    assert [record["options"]["warmup"] for record in records] == [0]*4 + [24]*4